@@ -0,0 +1,83 @@
+"""Размер объекта Connection и скорость попарной проверки пересечения.
+
+Запуск: python -m benchmarks.bench_connection [--objects 100000] [--rows 2000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.bench_merge import synthetic_cabinet
+from core.connection import Connection
+from core.functions import sorting_key
+
+
+class LegacyConnection:
+    """прежний Connection: __dict__, сортировка на каждой итерации, & через новый объект"""
+    def __init__(self, cabinet: str, signal: str = '', *terms):
+        self.cabinet = cabinet
+        self.signal = signal
+        self.terms = set(i for i in terms if i)
+
+    def __iter__(self):
+        return iter(sorted(self.terms, key=sorting_key))
+
+    def __and__(self, other):
+        return LegacyConnection(self.cabinet, self.signal, *(self.terms & other.terms))
+
+    def __bool__(self):
+        return bool(len(self.terms))
+
+
+def object_size(cls, count: int) -> float:
+    # строки клемм создаются заранее, считается только сам объект и его set
+    terms = [f'XT{i}-b9' for i in range(count + 1)]
+    tracemalloc.start()
+    objects = [cls('1HV19', '0501', terms[i], terms[i + 1]) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def pairwise(jumpers, check) -> float:
+    start = time.perf_counter()
+    hits = 0
+    for a in jumpers:
+        for b in jumpers:
+            if check(a, b):
+                hits += 1
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=100_000)
+    parser.add_argument('--rows', type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f'LegacyConnection: {object_size(LegacyConnection, args.objects):.0f} байт/объект')
+    print(f'Connection:       {object_size(Connection, args.objects):.0f} байт/объект')
+
+    jumpers = synthetic_cabinet('1HV1', args.rows)
+    legacy = [LegacyConnection(j.cabinet, j.signal, *j.terms) for j in jumpers]
+    old_time = pairwise(legacy, lambda a, b: bool(a & b))
+    new_time = pairwise(jumpers, Connection.overlaps)
+    pairs = args.rows ** 2
+    print(f'a & b:          {pairs / old_time:>12.0f} пар/с')
+    print(f'a.overlaps(b):  {pairs / new_time:>12.0f} пар/с')
+
+    start = time.perf_counter()
+    for _ in range(10):
+        for jumper in legacy:
+            list(jumper)
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        for jumper in jumpers:
+            list(jumper)
+    new_time = time.perf_counter() - start
+    print(f'iter (10 проходов): прежний {old_time:.3f} s, с кэшем {new_time:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Сравнение union-find слияния с прежним попарным циклом.
+
+Запуск: python -m benchmarks.bench_merge [--source ./data/data.txt] [--rows 100000]
+"""
+import argparse
+import copy
+import random
+import time
+from typing import Dict, List
+
+from core.connection import Connection
+from core.data_merger import DataMerging
+from core.data_parser import DataParser
+
+
+def legacy_process(cabinet_jumpers: Dict[str, List[Connection]]):
+    """прежний попарный алгоритм DataMerging.process (для сравнения)"""
+    for cabinet, jumpers in cabinet_jumpers.items():
+        a = 0
+        while a < len(jumpers):
+            b = a + 1
+            while b < len(jumpers):
+                if jumpers[a] & jumpers[b]:
+                    jumpers[a] |= jumpers.pop(b)
+                    b = a + 1
+                else:
+                    b += 1
+            a += 1
+
+
+def synthetic_cabinet(cabinet: str, rows: int, chain: int = 6, seed: int = 0) -> List[Connection]:
+    """шкаф из цепочек длиной `chain` перемычек, строки перемешаны"""
+    rnd = random.Random(seed)
+    jumpers = []
+    for i in range(rows):
+        group, pos = divmod(i, chain)
+        jumpers.append(Connection(cabinet, str(group), f'XT{group}-a{pos}', f'XT{group}-a{pos + 1}'))
+    rnd.shuffle(jumpers)
+    return jumpers
+
+
+def timed(func, data) -> float:
+    start = time.perf_counter()
+    func(data)
+    return time.perf_counter() - start
+
+
+def union_find_process(cabinet_jumpers):
+    for jumpers in cabinet_jumpers.values():
+        jumpers[:] = DataMerging.merge_cabinet(jumpers)
+
+
+def compare(title: str, cabinet_jumpers: Dict[str, List[Connection]], legacy_limit: int):
+    rows = sum(len(j) for j in cabinet_jumpers.values())
+    biggest = max(len(j) for j in cabinet_jumpers.values())
+    new = copy.deepcopy(cabinet_jumpers)
+    new_time = timed(union_find_process, new)
+    line = f'{title}: {rows} строк, union-find {new_time:.3f} s'
+    if biggest <= legacy_limit:
+        old = copy.deepcopy(cabinet_jumpers)
+        old_time = timed(legacy_process, old)
+        assert old == new, 'результаты слияния расходятся'
+        line += f', попарно {old_time:.3f} s (x{old_time / new_time:.1f})'
+    else:
+        line += f', попарно пропущено (шкаф > {legacy_limit} строк)'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--source', default='./data/data.txt')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--legacy-limit', type=int, default=5_000,
+                        help='максимальный размер шкафа для прогона старого цикла')
+    args = parser.parse_args()
+
+    data = DataParser(args.source)
+    data.parse_data()
+    compare(args.source, dict(data.cabinets_connections), args.legacy_limit)
+
+    for rows in sorted({2_000, args.legacy_limit, args.rows}):
+        compare(f'synthetic {rows}', {'1HV1': synthetic_cabinet('1HV1', rows)}, args.legacy_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Слияние в пуле процессов (-w N) против последовательного.
+
+Кроме полного прогона с пулом печатается то, что пул стоит основному
+процессу: pickle пачек клемм, разбор ответов и сборка Connection
+(как в DataMerging._process_parallel - без сборщика мусора). Эта часть
+не делится между процессами - ускорение на N ядрах не больше
+serial / (накладные + serial / N).
+
+Запуск: python -m benchmarks.bench_parallel_merge [--source ./data/data.txt] [--rows 1000000] [--workers 2 4 8]
+"""
+import argparse
+import copy
+import gc
+import os
+import pickle
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.generator import generate_file
+from core.connection import Connection
+from core.data_merger import DataMerging, _connections, _merge_batch
+from core.data_parser import DataParser
+
+
+def load(args) -> Dict[str, List[Connection]]:
+    if args.source:
+        parser = DataParser(args.source)
+        parser.parse_data()
+        return parser.cabinets_connections
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'synthetic.txt')
+        generate_file(source, args.rows, cabinets=args.cabinets)
+        parser = DataParser(source)
+        parser.parse_data()
+        return parser.cabinets_connections
+
+
+def merged_with(cabinet_jumpers: Dict[str, List[Connection]], workers: int) -> float:
+    merger = DataMerging(cabinet_jumpers, workers=workers)
+    start = time.perf_counter()
+    merger.process()
+    return time.perf_counter() - start
+
+
+def pool_overhead(cabinet_jumpers: Dict[str, List[Connection]]) -> Tuple[float, float, int, int]:
+    """работа основного процесса при слиянии в пуле, без самого слияния:
+    секунды на отправку и прием, байты туда и обратно"""
+    merger = DataMerging(cabinet_jumpers)
+    start = time.perf_counter()
+    batches = [pickle.dumps(batch, pickle.HIGHEST_PROTOCOL) for batch in merger._batches(cabinet_jumpers)]
+    send = time.perf_counter() - start
+    # ответы процессов готовим заранее - их разбор и есть работа основного процесса
+    answers = [pickle.dumps(_merge_batch(pickle.loads(batch)), pickle.HIGHEST_PROTOCOL) for batch in batches]
+    gc.disable()
+    start = time.perf_counter()
+    for answer in answers:
+        for cabinet, groups, _ in pickle.loads(answer):
+            _connections(cabinet_jumpers[cabinet], groups)
+    receive = time.perf_counter() - start
+    gc.enable()
+    return send, receive, sum(map(len, batches)), sum(map(len, answers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--source', help='выгрузка; без нее - синтетическая из --rows строк')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cabinets', type=int, default=400)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args()
+
+    cabinet_jumpers = load(args)
+    rows = sum(len(jumpers) for jumpers in cabinet_jumpers.values())
+    print(f'{rows} строк, {len(cabinet_jumpers)} шкафов, ядер: {os.cpu_count()}')
+
+    serial = merged_with(copy.deepcopy(cabinet_jumpers), 0)
+    print(f'последовательно: {serial:.2f} s')
+
+    send, receive, sent, received = pool_overhead(cabinet_jumpers)
+    parent = send + receive
+    print(f'накладные основного процесса: {parent:.2f} s (отправка {send:.2f} s, {sent / 2 ** 20:.1f} МБ; '
+          f'прием {receive:.2f} s, {received / 2 ** 20:.1f} МБ)')
+
+    expected = None
+    for workers in args.workers:
+        data = copy.deepcopy(cabinet_jumpers)
+        seconds = merged_with(data, workers)
+        if expected is None:
+            expected = copy.deepcopy(cabinet_jumpers)
+            DataMerging(expected).process()
+        assert data == expected, 'результат пула расходится с последовательным'
+        bound = serial / (parent + serial / workers)
+        print(f'-w {workers}: {seconds:.2f} s (x{serial / seconds:.2f}; предел при {workers} ядрах x{bound:.2f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Скорость и память разбора выгрузки: прежний readlines() против потокового DataParser.
+
+Запуск: python -m benchmarks.bench_parse [--source ./data/data.txt] [--copies 20]
+Выгрузка склеивается `copies` раз во временный файл, чтобы получить крупный файл.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from core.connection import Connection
+from core.data_parser import DataParser
+
+
+def legacy_parse(source: str) -> int:
+    """прежний DataParser.parse_data: readlines() и двойной split на строку"""
+    num_file = num_line = rows = 0
+    cabinets_connections = defaultdict(list)
+    jumpers_to_lines = defaultdict(lambda: defaultdict(list))
+    with open(source, encoding='utf-8') as rf:
+        for line in rf.readlines():
+            line = line.strip()
+            if not line.strip():
+                continue
+            if 'Откуда' in line:
+                num_line = 0
+                num_file += 1
+                continue
+            num_line += 1
+            if len(line.split('\t')) > 3:
+                cabinet, signal, fr, to = line.split('\t')
+            else:
+                cabinet, signal, fr = line.split('\t')
+                to = None
+            source_info = f'{num_file}_{num_line}'
+            cabinets_connections[cabinet].append(Connection(cabinet, signal, fr, to))
+            for term in (fr, to):
+                if term:
+                    jumpers_to_lines[cabinet][term].append(source_info)
+            rows += 1
+    return rows
+
+
+def streaming_parse(source: str) -> int:
+    parser = DataParser(source)
+    parser.parse_data()
+    return sum(len(c) for c in parser.cabinets_connections.values())
+
+
+def streaming_rows(source: str) -> int:
+    """только iter_rows(): строки потребляются сразу, память не растет"""
+    return sum(1 for _ in DataParser(source).iter_rows())
+
+
+def measure(title: str, func, source: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = func(source)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{title:<14} {rows:>9} строк  {rows / elapsed:>10.0f} строк/с  пик {peak / 2**20:8.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--source', default='./data/data.txt')
+    parser.add_argument('--copies', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.source, encoding='utf-8') as rf:
+        chunk = rf.read()
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as wf:
+            for _ in range(args.copies):
+                wf.write(chunk)
+        print(f'{path}: {os.path.getsize(path) / 2**20:.1f} МБ')
+        measure('readlines', legacy_parse, path)
+        measure('parse_data', streaming_parse, path)
+        measure('iter_rows', streaming_rows, path)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Память провенанса: словари со строками 'файл_строка' против ProvenanceStore.
+
+Запуск: python -m benchmarks.bench_provenance [--rows 1000000]
+"""
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+
+from benchmarks.generator import generate_rows
+from core.provenance import ProvenanceStore, pack_ref
+
+
+def legacy_store(rows):
+    store = defaultdict(lambda: defaultdict(list))
+    for num_line, (cabinet, _, *terms) in enumerate(rows, 1):
+        source_info = f'1_{num_line}'
+        for term in terms:
+            store[cabinet][term].append(source_info)
+    return store
+
+
+def compact_store(rows):
+    store = ProvenanceStore()
+    for num_line, (cabinet, _, *terms) in enumerate(rows, 1):
+        cabinet_store = store.cabinet(cabinet)
+        packed = pack_ref(1, num_line)
+        for term in terms:
+            cabinet_store.add(term, packed)
+    return store
+
+
+def measure(title: str, build, rows):
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build(rows)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    print(f'{title:<16} {size / 2**20:8.1f} МБ  {elapsed:.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    cabinets = max(1, args.rows // 500)
+    # строки клемм создаются заранее: меряется только сама структура провенанса
+    rows = list(generate_rows(cabinets, args.rows // cabinets))
+    measure('dict of lists', legacy_store, rows)
+    measure('ProvenanceStore', compact_store, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Микро-замер sorting_key: сортировка 1M имен клемм прежним и кэшированным ключом.
+
+Запуск: python -m benchmarks.bench_sort_key [--names 1000000] [--distinct 20000]
+"""
+import argparse
+import random
+import time
+
+from core.functions import sorting_key, terminal_key
+
+
+def legacy_sorting_key(item):
+    """прежний ключ: import re и некомпилированный шаблон на каждый вызов"""
+    item = ''.join(item)
+    if item.startswith('XTK'):
+        group_priority = 0
+    elif item.startswith('XT') and not item.startswith('XTN'):
+        group_priority = 1
+    elif item.startswith('XTN'):
+        group_priority = 2
+    else:
+        group_priority = 3
+    import re
+    numbers = re.findall(r'\d+', item)
+    number_one = int(numbers[0]) if numbers and len(numbers) >= 1 else 0
+    number_two = int(numbers[1]) if numbers and len(numbers) >= 2 else 0
+    return (group_priority, number_one, number_two, item)
+
+
+def terminal_names(count: int, distinct: int, seed: int = 0):
+    rnd = random.Random(seed)
+    prefixes = ('XTK', 'XT', 'XTN', 'X', 'K')
+    pool = [f'{rnd.choice(prefixes)}{rnd.randint(1, 99)}-{rnd.choice("ab")}{rnd.randint(1, 40)}'
+            for _ in range(distinct)]
+    return [rnd.choice(pool) for _ in range(count)]
+
+
+def measure(title: str, names, key) -> list:
+    start = time.perf_counter()
+    result = sorted(names, key=key)
+    print(f'{title:<8} {time.perf_counter() - start:.3f} s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=20_000)
+    args = parser.parse_args()
+
+    names = terminal_names(args.names, args.distinct)
+    old = measure('legacy', names, legacy_sorting_key)
+    terminal_key.cache_clear()
+    new = measure('cold', names, sorting_key)
+    measure('warm', names, sorting_key)
+    assert old == new, 'порядок сортировки изменился'
+    print(terminal_key.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Скорость записи результата: прежний open() на каждую строку против одного буферизованного файла и .xlsx;
+три формата (txt, csv, jsonl) одним проходом против трех отдельных записей.
+
+Запуск: python -m benchmarks.bench_write [--source ./data/data.txt]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from core.data_merger import DataMerging
+from core.data_parser import DataParser
+from core.data_writer import DataWriter
+from core.functions import sorting_key
+
+
+class LegacyDataWriter(DataWriter):
+    """прежнее поведение: файл открывается в режиме 'a' на каждую строку"""
+
+    def process(self):
+        with open(self.target, 'w', encoding='utf-8'):
+            pass
+        for cabinet, jumpers in sorted(self.cabinet_jumpers.items(), key=lambda x: int(''.join(i for i in x[0] if i.isdigit()))):
+            self.print(cabinet)
+            for jumper in sorted(jumpers, key=sorting_key):
+                lines = [', '.join(self.jumpers_to_lines[cabinet][wire]) for wire in jumper]
+                ending = '\tЗамечание 3 на 2' if any(k.count(',') > 1 for k in lines) else ''
+                self.print(f'\t{jumper.tabulated_term()}')
+                self.print('\t' + '\t'.join(lines) + ending)
+
+    def print(self, *line):
+        with open(self.target, 'a', encoding='utf-8') as f:
+            f.write(f'{line[0]}\n')
+
+
+def measure(title: str, writer: DataWriter):
+    start = time.perf_counter()
+    writer.process()
+    elapsed = time.perf_counter() - start
+    if writer.fmt == 'xlsx':
+        lines = sum(len(groups) * 2 + 1 for groups in writer.cabinet_jumpers.values())
+    else:
+        with open(writer.target, encoding='utf-8') as f:
+            lines = sum(1 for _ in f)
+    print(f'{title:<10} {lines:>7} строк  {elapsed:.3f} s  {lines / elapsed:>10.0f} строк/с')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--source', default='./data/data.txt')
+    args = parser.parse_args()
+
+    data = DataParser(args.source)
+    data.parse_data()
+    DataMerging(data.cabinets_connections).process()
+
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, 'result.txt')
+        jumpers, lines = data.cabinets_connections, data.jumpers_to_lines
+        measure('open/line', LegacyDataWriter(target, jumpers, lines))
+        measure('buffered', DataWriter(target, jumpers, lines))
+        measure('atomic', DataWriter(target, jumpers, lines, atomic=True))
+        measure('xlsx', DataWriter(os.path.join(directory, 'result.xlsx'), jumpers, lines))
+
+        others = [os.path.join(directory, f'result.{fmt}') for fmt in ('csv', 'jsonl')]
+        start = time.perf_counter()
+        for output in [target] + others:
+            DataWriter(output, jumpers, lines).process()
+        print(f'{"3 прохода":<10} {time.perf_counter() - start:.3f} s')
+        start = time.perf_counter()
+        DataWriter(target, jumpers, lines, outputs=others).process()
+        print(f'{"1 проход":<10} {time.perf_counter() - start:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Разбор .xlsx напрямую против той же выгрузки в TSV.
+
+Запуск: python -m benchmarks.bench_xlsx_read [--rows 200000]
+Синтетическая выгрузка пишется в оба формата (в .xlsx - через sharedStrings, как у Excel).
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generator import generate_file
+from core.data_parser import DataParser
+
+
+def count_rows(source: str) -> int:
+    return sum(1 for _ in DataParser(source).iter_rows())
+
+
+def measure(title: str, source: str):
+    start = time.perf_counter()
+    rows = count_rows(source)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    count_rows(source)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = os.path.getsize(source) / 2**20
+    print(f'{title:<5} {size:6.1f} МБ  {rows:>9} строк  {elapsed:.3f} s  {rows / elapsed:>10.0f} строк/с'
+          f'  пик {peak / 2**20:6.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('txt', 'xlsx'):
+            source = os.path.join(directory, f'synthetic.{extension}')
+            generate_file(source, args.rows)
+            measure(extension, source)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Генератор синтетических выгрузок в формате DataParser (TSV: Шкаф / Сигнал / Откуда / Куда).
+
+Запуск: python -m benchmarks.generator --rows 100000 --cabinets 50 -o ./data/synthetic.txt
+        python -m benchmarks.generator --rows 100000 -o ./data/synthetic.xlsx   # книга Excel
+"""
+import argparse
+import random
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from core.xlsx_writer import column_letter
+
+HEADER = 'Шкаф\tОбозначение провода\tОткуда идет\tКуда поступает'
+
+# пары (сторона, номер клеммы) на одной рейке: a1..a20, b1..b20
+PINS_PER_STRIP = 40
+
+
+def generate_rows(cabinets: int, rows_per_cabinet: int, chain: int = 4, fan_out: float = 0.05,
+                  single: float = 0.01, seed: int = 0) -> Iterator[Tuple[str, ...]]:
+    """строки выгрузки, сгруппированные по шкафам
+
+    chain - средняя длина цепочки перемычек (клеммы одной группы на соседних рейках),
+    fan_out - доля групп с третьей перемычкой от средней клеммы ("Замечание 3 на 2"),
+    single - доля строк с одной клеммой (формат из 3 колонок).
+    Внутри шкафа строки перемешаны, чтобы слияние не получало готовый порядок.
+    """
+    rnd = random.Random(seed)
+    for number in range(1, cabinets + 1):
+        cabinet = f'1HV{number}'
+        rows = []
+        group = 0
+        while len(rows) < rows_per_cabinet:
+            signal = f'{group:04d}'
+            pin = group % PINS_PER_STRIP
+            side = 'ab'[pin // (PINS_PER_STRIP // 2)]
+            pin = pin % (PINS_PER_STRIP // 2) + 1
+            base = group // PINS_PER_STRIP * (2 * chain + 1) + 1
+            if rnd.random() < single:
+                rows.append((cabinet, 'out', f'XT{base}-{side}{pin}'))
+            else:
+                length = rnd.randint(1, 2 * chain - 1)
+                terms = [f'XT{base + i}-{side}{pin}' for i in range(length + 1)]
+                rows.extend((cabinet, signal, fr, to) for fr, to in zip(terms, terms[1:]))
+                if rnd.random() < fan_out:
+                    rows.append((cabinet, signal, terms[len(terms) // 2], f'XTN{group}-a1'))
+            group += 1
+        del rows[rows_per_cabinet:]
+        rnd.shuffle(rows)
+        yield from rows
+
+
+def write_export(out: TextIO, cabinets: int, rows_per_cabinet: int, exports: int = 1, **options) -> int:
+    """записать выгрузку; exports > 1 - несколько склеенных выгрузок со своими заголовками"""
+    total = cabinets * rows_per_cabinet
+    per_export = -(-total // exports)
+    written = 0
+    for row in generate_rows(cabinets, rows_per_cabinet, **options):
+        if written % per_export == 0:
+            out.write(f'{HEADER}\n')
+        out.write('\t'.join(row))
+        out.write('\n')
+        written += 1
+    return written
+
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+def write_xlsx_export(path: str, sheets: List[Iterable[Tuple[str, ...]]]) -> int:
+    """книга как у реальных выгрузок: лист на выгрузку, заголовок и строки через sharedStrings"""
+    strings: Dict[str, int] = {}
+    written = 0
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as book:
+        for number, rows in enumerate(sheets, 1):
+            with book.open(f'xl/worksheets/sheet{number}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{_MAIN_NS}"><sheetData>'.encode())
+                chunk = []
+                for row_number, row in enumerate(_with_header(rows), 1):
+                    cells = ''.join(
+                        f'<c r="{column_letter(column)}{row_number}" t="s"><v>{strings.setdefault(value, len(strings))}</v></c>'
+                        for column, value in enumerate(row, 1)
+                    )
+                    chunk.append(f'<row r="{row_number}">{cells}</row>')
+                    if len(chunk) >= 1000:
+                        sheet.write(''.join(chunk).encode())
+                        chunk.clear()
+                    written += row_number > 1
+                sheet.write((''.join(chunk) + '</sheetData></worksheet>').encode())
+        book.writestr('xl/sharedStrings.xml', f'<?xml version="1.0" encoding="UTF-8"?><sst xmlns="{_MAIN_NS}">'
+                      + ''.join(f'<si><t>{escape(value)}</t></si>' for value in strings) + '</sst>')
+        sheet_list = ''.join(f'<sheet name="export{i}" sheetId="{i}" r:id="rId{i}"/>' for i in range(1, len(sheets) + 1))
+        book.writestr('xl/workbook.xml', f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{_MAIN_NS}" '
+                      f'xmlns:r="{_REL_NS}"><sheets>{sheet_list}</sheets></workbook>')
+        rels = ''.join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                       for i in range(1, len(sheets) + 1))
+        book.writestr('xl/_rels/workbook.xml.rels', '<?xml version="1.0" encoding="UTF-8"?><Relationships '
+                      f'xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+    return written
+
+
+def _with_header(rows: Iterable[Tuple[str, ...]]) -> Iterator[Tuple[str, ...]]:
+    yield tuple(HEADER.split('\t'))
+    yield from rows
+
+
+def generate_file(path: str, rows: int, cabinets: Optional[int] = None, exports: int = 1, **options) -> int:
+    """выгрузка примерно из `rows` строк; по умолчанию ~500 строк на шкаф, как в реальных данных
+
+    Путь .xlsx - книга Excel, каждая из `exports` выгрузок на своем листе.
+    """
+    if cabinets is None:
+        cabinets = max(1, rows // 500)
+    rows_per_cabinet = max(1, rows // cabinets)
+    if path.lower().endswith('.xlsx'):
+        generated = list(generate_rows(cabinets, rows_per_cabinet, **options))
+        per_export = -(-len(generated) // exports)
+        return write_xlsx_export(path, [generated[i:i + per_export] for i in range(0, len(generated), per_export)])
+    with open(path, 'w', encoding='utf-8') as out:
+        return write_export(out, cabinets, rows_per_cabinet, exports=exports, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--cabinets', type=int)
+    parser.add_argument('--chain', type=int, default=4, help='средняя длина цепочки перемычек')
+    parser.add_argument('--fan-out', type=float, default=0.05, help='доля групп "3 на 2"')
+    parser.add_argument('--single', type=float, default=0.01, help='доля строк с одной клеммой')
+    parser.add_argument('--exports', type=int, default=1, help='сколько склеенных выгрузок с заголовками')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rows = generate_file(args.output, args.rows, args.cabinets, chain=args.chain, fan_out=args.fan_out,
+                         single=args.single, exports=args.exports, seed=args.seed)
+    print(f'{args.output}: {rows} строк')
+
+
+if __name__ == '__main__':
+    main()
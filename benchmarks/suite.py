@@ -0,0 +1,131 @@
+"""Набор замеров конвейера parse / merge / write / Application на синтетических выгрузках.
+
+Запуск:
+    python -m benchmarks.suite                          # 10k и 100k, сравнение с baseline.json
+    python -m benchmarks.suite --scales 10k 100k 1M --save
+    python -m benchmarks.suite --tolerance 0.3          # регрессия - медленнее baseline более чем на 30%
+
+Код возврата 1, если какой-то замер вышел за допуск.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.generator import generate_file
+from core.application import Application
+from core.data_merger import DataMerging
+from core.data_parser import DataParser
+from core.data_writer import DataWriter
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+STAGES = ('parse', 'merge', 'write', 'application')
+
+
+def parse_scale(scale: str) -> int:
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    suffix = scale[-1].lower()
+    if suffix in multipliers:
+        return int(float(scale[:-1]) * multipliers[suffix])
+    return int(scale)
+
+
+def run_once(source: str, target: str) -> Dict[str, float]:
+    times = {}
+    start = time.perf_counter()
+    parser = DataParser(source)
+    parser.parse_data()
+    times['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataMerging(parser.cabinets_connections).process()
+    times['merge'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataWriter(target, parser.cabinets_connections, parser.jumpers_to_lines).process()
+    times['write'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Application(source, target).run()
+    times['application'] = time.perf_counter() - start
+    return times
+
+
+def run_scale(rows: int, repeat: int, directory: str) -> Dict[str, float]:
+    """лучшее время каждого этапа из `repeat` прогонов"""
+    source = os.path.join(directory, f'synthetic_{rows}.txt')
+    target = os.path.join(directory, f'result_{rows}.txt')
+    generate_file(source, rows)
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        for stage, seconds in run_once(source, target).items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    best['rows_per_sec'] = rows / best['application']
+    return best
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(scale: str, result: Dict[str, float], baseline: dict, tolerance: float) -> bool:
+    """печать строки замера; False - есть регрессия относительно baseline"""
+    reference = baseline.get('results', {}).get(scale, {})
+    ok = True
+    cells = []
+    for stage in STAGES:
+        cell = f'{stage} {result[stage]:.3f} s'
+        if stage in reference:
+            ratio = result[stage] / reference[stage]
+            cell += f' ({ratio:.2f}x)'
+            if ratio > 1 + tolerance:
+                cell += ' REGRESSION'
+                ok = False
+        cells.append(cell)
+    print(f'{scale:>6}: ' + '  '.join(cells) + f'  {result["rows_per_sec"]:.0f} строк/с')
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', default=['10k', '100k'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save', action='store_true', help='записать результаты как новый baseline')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    if baseline and not args.save:
+        print(f'baseline: {baseline.get("machine")}, Python {baseline.get("python")}')
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            results[scale] = run_scale(parse_scale(scale), args.repeat, directory)
+            ok = compare(scale, results[scale], baseline, args.tolerance) and ok
+
+    if args.save:
+        saved = dict(baseline.get('results', {}), **results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': f'{platform.system()} {platform.machine()}',
+                'results': saved,
+            }, f, indent=2)
+            f.write('\n')
+        print(f'baseline сохранен: {args.baseline}')
+        return 0
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
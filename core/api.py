@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from core.data_merger import DataMerging
+from core.data_parser import DataParser, Row
+from core.data_writer import DataWriter, cabinet_number, render_groups
+from core.query_index import GroupRecord, QueryIndex
+from core.rendering import format_cabinet
+from core.xlsx_writer import Group
+
+# строка для merge_rows: Row или (шкаф, сигнал, откуда[, куда[, файл, строка]])
+RowLike = Union[Row, Sequence]
+
+
+class MergeResult:
+    """итог merge_lines / merge_rows: группы шкафов в порядке result.txt
+
+    Группы (GroupRecord: клеммы, их ссылки 'файл_строка', замечание)
+    собираются сразу, после создания результат не меняется - его можно
+    читать и записывать из любых потоков одновременно.
+    """
+
+    def __init__(self, groups: Iterable[GroupRecord], rows: int = 0, duplicates: int = 0):
+        self.records: Tuple[GroupRecord, ...] = tuple(groups)
+        self.rows = rows
+        self.duplicates = duplicates
+        cabinets: Dict[str, List[GroupRecord]] = {}
+        for record in self.records:
+            cabinets.setdefault(record.cabinet, []).append(record)
+        self._cabinets: Dict[str, Tuple[GroupRecord, ...]] = {
+            cabinet: tuple(records) for cabinet, records in cabinets.items()}
+
+    def __len__(self):
+        return len(self.records)
+
+    def cabinets(self) -> List[str]:
+        """шкафы в порядке вывода"""
+        return list(self._cabinets)
+
+    def groups(self, cabinet: str) -> Tuple[GroupRecord, ...]:
+        return self._cabinets.get(cabinet, ())
+
+    def refs(self, cabinet: str, term: str) -> Tuple[str, ...]:
+        """происхождение клеммы шкафа: ссылки 'файл_строка' ее строк"""
+        for record in self.groups(cabinet):
+            if term in record.terms:
+                return record.refs[record.terms.index(term)]
+        raise KeyError((cabinet, term))
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        """шкафы и их группы, как DataWriter.iter_cabinets()"""
+        for cabinet, records in self._cabinets.items():
+            yield cabinet, ((record.terms, record.refs, record.remark) for record in records)
+
+    def index(self) -> QueryIndex:
+        """QueryIndex по группам результата"""
+        return QueryIndex(self.records)
+
+    def text(self) -> str:
+        """результат в виде текста result.txt"""
+        return ''.join(format_cabinet(cabinet, groups) for cabinet, groups in self.iter_cabinets())
+
+    def write(self, sink, fmt: Optional[str] = None, atomic: bool = False, outputs: Sequence = ()):
+        """записать результат: sink - путь или открытый файл (бинарный для xlsx);
+        outputs - еще пути (формат по расширению), тем же проходом"""
+        ResultWriter(sink, self, atomic=atomic, fmt=fmt, outputs=outputs).process()
+
+
+class ResultWriter(DataWriter):
+    """DataWriter, который берет группы из MergeResult"""
+
+    def __init__(self, target, result: MergeResult, atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = ()):
+        super().__init__(target, {}, {}, atomic=atomic, fmt=fmt, outputs=outputs)
+        self.result = result
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        return self.result.iter_cabinets()
+
+
+def merge_lines(lines: Iterable[str], dedup: bool = False, sink=None, fmt: Optional[str] = None) -> MergeResult:
+    """слить выгрузку из любого итерируемого строк (файл, список, StringIO)
+
+    Каждый вызов работает только со своими объектами, поэтому функцию можно
+    вызывать из многих потоков сразу. Файлы не открываются; результат
+    пишется, только если передан sink (путь или открытый файл).
+    """
+    parser = DataParser(dedup=dedup)
+    return _merge(parser, parser.iter_lines(lines), sink, fmt)
+
+
+def merge_rows(rows: Iterable[RowLike], dedup: bool = False, sink=None, fmt: Optional[str] = None) -> MergeResult:
+    """слить уже разобранные строки: Row или (шкаф, сигнал, откуда[, куда[, файл, строка]])
+
+    Без номера файла и строки ссылка строки - '1_<порядковый номер>'.
+    """
+    return _merge(DataParser(dedup=dedup), _as_rows(rows), sink, fmt)
+
+
+def _as_rows(rows: Iterable[RowLike]) -> Iterator[Row]:
+    for number, row in enumerate(rows, 1):
+        if isinstance(row, Row):
+            yield row
+        elif 3 <= len(row) <= 4:
+            cabinet, signal, fr, *to = row
+            yield Row(cabinet, signal, fr, to[0] if to and to[0] else None, 1, number)
+        elif len(row) == 6:
+            yield Row._make(row)
+        else:
+            raise ValueError(f'строка {number}: ожидается 3, 4 или 6 полей, а не {len(row)}')
+
+
+def _merge(parser: DataParser, rows: Iterable[Row], sink, fmt: Optional[str]) -> MergeResult:
+    count = 0
+    for row in rows:
+        parser.add_row(row)
+        count += 1
+    records = []
+    for cabinet in sorted(parser.cabinets_connections, key=cabinet_number):
+        merged = DataMerging.merge_cabinet(parser.cabinets_connections[cabinet])
+        terms_lines = parser.jumpers_to_lines[cabinet]
+        for terms, refs, remark in render_groups(merged, terms_lines):
+            records.append(GroupRecord(cabinet, tuple(terms), tuple(tuple(wire_refs) for wire_refs in refs), remark))
+    result = MergeResult(records, rows=count, duplicates=parser.duplicates)
+    if sink is not None:
+        result.write(sink, fmt=fmt)
+    return result
@@ -1,17 +1,216 @@
+from typing import Dict, Optional, Sequence
+
+from core.columnar import ColumnarDataset, ColumnarWriter, is_snapshot
 from core.data_parser import DataParser
 from core.data_writer import DataWriter
 from core.data_merger import DataMerging
+from core.merge_cache import MergeCache
+from core.query_index import QueryIndex
+from core.rendering import format_of
+from core.sharding import ShardReport, ShardedWriter
+from core.sqlite_store import SqliteStore, SqliteWriter
+from core.stats import RunStats, ProgressCallback, profiling
+from core.streaming import StreamingPipeline
+from core.validator import WiringValidator
 
 class Application:
-    def __init__(self, source: str, target: str):
+    def __init__(self, source, target: str, workers: int = 0, atomic: bool = False, incremental: bool = False,
+                 dedup: bool = False, validate: bool = False, progress: Optional[ProgressCallback] = None, profile: Optional[str] = None,
+                 report: Optional[str] = None, fmt: Optional[str] = None, stream: bool = False,
+                 index: bool = False, snapshot: Optional[str] = None, columnar: bool = False,
+                 save_columns: Optional[str] = None, sqlite: bool = False, sqlite_path: Optional[str] = None,
+                 outputs: Sequence[str] = (), shards: int = 0):
+        # columnar: весь набор - колонки целых чисел (core/columnar.py); источник .cols - его снимок
+        columnar = columnar or save_columns is not None or is_snapshot(source)
+        if stream and (incremental or validate):
+            raise ValueError('потоковый режим не поддерживает incremental и validate')
+        if columnar and (stream or incremental or validate):
+            raise ValueError('колоночный режим не поддерживает stream, incremental и validate')
+        # sqlite: строки в базе sqlite на диске (core/sqlite_store.py), слияние по одному шкафу
+        sqlite = sqlite or sqlite_path is not None
+        if sqlite and (stream or incremental or validate or columnar):
+            raise ValueError('режим sqlite не поддерживает stream, incremental, validate и columnar')
+        if shards and outputs:
+            raise ValueError('результат по шардам пишется в одном формате, outputs не поддерживаются')
         self.source = source
         self.target = target
-        self.parser = DataParser(source)
-        self.merger = DataMerging(self.parser.cabinets_connections)
-        self.writer = DataWriter(target, self.merger.cabinet_jumpers, self.parser.jumpers_to_lines)
-        
+        self.incremental = incremental
+        # stream: шкаф сливается сразу после своей секции, память - по самому большому шкафу
+        self.stream = stream
+        # profile: None, 'cprofile' или 'tracemalloc'; report - путь JSON-отчета со статистикой
+        self.profile = profile
+        self.report = report
+        # index: после слияния строится QueryIndex (self.query_index); snapshot - путь его снимка
+        self.index = index or snapshot is not None
+        self.snapshot = snapshot
+        self.query_index: Optional[QueryIndex] = None
+        # save_columns - путь снимка колонок; self.dataset - набор последнего run()
+        # (загруженный снимок после run() закрыт - его колонки были на mmap)
+        self.columnar = columnar
+        self.save_columns = save_columns
+        self.dataset: Optional[ColumnarDataset] = None
+        # sqlite_path - файл базы (остается после run); по умолчанию временный
+        self.sqlite = sqlite
+        self.sqlite_path = sqlite_path
+        self.dedup = dedup
+        self.atomic = atomic
+        self.fmt = fmt
+        # outputs: еще результаты (формат по расширению: .csv, .jsonl, .xlsx, .txt), тем же проходом записи
+        self.outputs = outputs
+        # shards: target - каталог, файл на каждые shards шкафов и manifest.json (core/sharding.py)
+        self.shards = shards
+        self.shard_report: Optional[ShardReport] = None
+        # validate: проверка монтажа, замечания пишутся в <target>.findings.json
+        self.validator = WiringValidator() if validate else None
+        self.parser = DataParser(source, hash_cabinets=incremental, dedup=dedup, validator=self.validator)
+        self.merger = DataMerging(self.parser.cabinets_connections, workers=workers, progress=progress)
+        # fmt: 'txt' или 'xlsx', по умолчанию по расширению target
+        if stream:
+            self.pipeline = StreamingPipeline(self.parser, target, atomic=atomic, fmt=fmt, outputs=outputs)
+            self.writer = None
+        elif columnar or sqlite:
+            # ColumnarWriter / SqliteWriter создается в run(), когда строки уже прочитаны
+            self.pipeline = None
+            self.writer = None
+        else:
+            self.pipeline = None
+            self.writer = DataWriter(target, self.merger.cabinet_jumpers, self.parser.jumpers_to_lines,
+                                     atomic=atomic, fmt=fmt, outputs=outputs)
+        self.stats = RunStats()
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """время этапов последнего run(), секунды"""
+        return self.stats.timings
+
     def run(self):
-        self.parser.parse_data()
-        self.merger.process()
-        self.writer.process()
-        pass
\ No newline at end of file
+        stats = self.stats = RunStats()
+        with profiling(self.profile, stats):
+            if self.columnar:
+                self._run_columnar(stats)
+            elif self.sqlite:
+                self._run_sqlite(stats)
+            elif self.pipeline is not None:
+                self._run_stream(stats)
+            else:
+                self._run_staged(stats)
+        if self.report:
+            stats.write_json(self.report)
+
+    def _run_stream(self, stats: RunStats):
+        pipeline = self.pipeline
+        # разбор и слияние чередуются по шкафам - один этап
+        with stats.stage('parse+merge'):
+            pipeline.process()
+        stats.rows = pipeline.rows
+        stats.cabinets = pipeline.cabinets
+        stats.groups = pipeline.groups
+        stats.duplicates = self.parser.duplicates
+        stats.reappeared = pipeline.reappeared
+        stats.cabinet_merge_times = pipeline.cabinet_times
+        if self.index:
+            self._build_index(stats, pipeline.iter_cabinets())
+        with stats.stage('write'):
+            if self.shards:
+                try:
+                    self._write_shards(pipeline.iter_cabinets())
+                finally:
+                    pipeline.close()
+            else:
+                pipeline.write()
+
+    def _run_columnar(self, stats: RunStats):
+        with stats.stage('parse'):
+            if is_snapshot(self.source):
+                dataset = ColumnarDataset.load(self.source)
+            else:
+                dataset = ColumnarDataset.from_rows(self.parser.iter_rows(), dedup=self.dedup)
+        self.dataset = dataset
+        # mmap снимка отпускается и при ошибке записи
+        with dataset:
+            stats.rows = len(dataset)
+            stats.cabinets = len(dataset.cabinets)
+            stats.duplicates = dataset.duplicates
+            with stats.stage('merge'):
+                stats.groups = dataset.merge() if dataset.labels is None else dataset.group_count()
+            if self.save_columns:
+                dataset.save(self.save_columns)
+            self.writer = ColumnarWriter(self.target, dataset, atomic=self.atomic, fmt=self.fmt,
+                                         outputs=self.outputs)
+            if self.index:
+                self._build_index(stats, self.writer.iter_cabinets())
+            with stats.stage('write'):
+                self._write()
+
+    def _run_sqlite(self, stats: RunStats):
+        store = SqliteStore(self.sqlite_path)
+        try:
+            with stats.stage('parse'):
+                stats.rows = store.load(self.parser.iter_rows())
+            stats.cabinets = len(store.cabinets())
+            if self.dedup:
+                stats.duplicates = store.duplicates()
+            # шкаф сливается, когда до него доходит запись, и тогда же попадает в индекс - один этап
+            index = QueryIndex() if self.index else None
+            self.writer = SqliteWriter(self.target, store, atomic=self.atomic, fmt=self.fmt, outputs=self.outputs,
+                                       index=index)
+            with stats.stage('merge+write'):
+                self._write()
+            if index is not None:
+                with stats.stage('index'):
+                    self._keep_index(index)
+            stats.groups = store.groups
+            stats.cabinet_merge_times = store.cabinet_times
+        finally:
+            store.close()
+
+    def _run_staged(self, stats: RunStats):
+        with stats.stage('parse'):
+            self.parser.parse_data()
+        jumpers = self.parser.cabinets_connections
+        stats.duplicates = self.parser.duplicates
+        stats.rows = sum(len(connections) for connections in jumpers.values()) + stats.duplicates
+        stats.cabinets = len(jumpers)
+        if self.validator is not None:
+            with stats.stage('validate'):
+                self.validator.finish(self.parser.jumpers_to_lines)
+                self.validator.write_json(f'{self.target}.findings.json')
+            stats.findings = self.validator.summary()
+
+        if self.incremental:
+            # хэши шкафов известны только после разбора
+            self.merger.cache = MergeCache.for_target(self.target)
+            self.merger.digests = self.parser.cabinet_digests()
+        with stats.stage('merge'):
+            self.merger.process()
+        stats.groups = sum(len(groups) for groups in jumpers.values())
+        stats.cabinet_merge_times = self.merger.cabinet_times
+        if self.merger.cache is not None:
+            stats.cache_hits = self.merger.cache.hits
+            stats.cache_misses = self.merger.cache.misses
+        if self.index:
+            self._build_index(stats, self.writer.iter_cabinets())
+
+        with stats.stage('write'):
+            self._write()
+
+    def _write(self):
+        if self.shards:
+            self._write_shards(self.writer.iter_cabinets())
+        else:
+            self.writer.process()
+
+    def _write_shards(self, cabinets):
+        writer = ShardedWriter(self.target, self.fmt or format_of(self.target), batch=self.shards)
+        self.shard_report = writer.write(cabinets)
+        self.stats.shards_written = self.shard_report.written
+        self.stats.shards_skipped = self.shard_report.skipped
+
+    def _build_index(self, stats: RunStats, cabinets):
+        with stats.stage('index'):
+            self._keep_index(QueryIndex.from_cabinets(cabinets))
+
+    def _keep_index(self, index: QueryIndex):
+        self.query_index = index
+        if self.snapshot:
+            index.save(self.snapshot)
@@ -0,0 +1,333 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from core.application import Application
+from core.columnar import SNAPSHOT_SUFFIX
+from core.data_writer import FORMATS
+from core.diff import ExportDiff
+from core.query_index import QueryIndex, QueryServer
+from core.rendering import format_of
+from core.stats import PROFILE_MODES, RunStats, print_progress
+from core.svo import NetIndex, split_device
+from core.watcher import ExportWatcher, WatchUpdate
+
+DEFAULT_SOURCE = './data/data.txt'
+DEFAULT_TARGET = './output/result.txt'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description='Объединение перемычек шкафов по выгрузкам "Шкаф / Сигнал / Откуда / Куда"',
+    )
+    parser.add_argument('-s', '--source', nargs='+', default=[DEFAULT_SOURCE],
+                        help='файлы выгрузки или шаблоны glob (по умолчанию %(default)s)')
+    parser.add_argument('-t', '--target', default=DEFAULT_TARGET,
+                        help='файл результата для одного входа или --combine (по умолчанию %(default)s)')
+    parser.add_argument('-o', '--output-dir',
+                        help='каталог для результатов по каждому входу (<имя>_result.txt); '
+                             'по умолчанию каталог --target')
+    parser.add_argument('-f', '--format', choices=FORMATS,
+                        help='формат результата; по умолчанию по расширению --target '
+                             '(xlsx - книга со скрытым листом связей для макроса подсветки)')
+    parser.add_argument('--also', nargs='+', choices=FORMATS, default=[], metavar='FORMAT',
+                        help='еще форматы результата рядом с ним (<результат>.csv, .jsonl, ...), '
+                             'тем же проходом записи: ' + ', '.join(FORMATS))
+    parser.add_argument('--shards', type=int, nargs='?', const=1, default=0, metavar='CABINETS',
+                        help='результат - каталог <результат без расширения>/: файл на шкаф (или на CABINETS '
+                             'шкафов подряд), пишутся параллельно, manifest.json с хэшами; '
+                             'неизменившиеся шкафы не переписываются')
+    parser.add_argument('-c', '--combine', action='store_true',
+                        help='все входы - одна склеенная выгрузка и один результат')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='сколько входов обрабатывать одновременно (процессы)')
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                        help='процессы для слияния шкафов внутри одного входа')
+    parser.add_argument('--atomic', action='store_true',
+                        help='писать результат через временный файл и rename')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='не пересчитывать шкафы, чьи строки не изменились (кэш <результат>.merge-cache)')
+    parser.add_argument('--stream', action='store_true',
+                        help='сливать каждый шкаф сразу после его секции в выгрузке; '
+                             'память - по самому большому шкафу (без --incremental и --validate)')
+    parser.add_argument('-d', '--dedup', action='store_true',
+                        help='схлопнуть одинаковые строки выгрузки при разборе')
+    parser.add_argument('-v', '--validate', action='store_true',
+                        help='проверка монтажа, замечания в <результат>.findings.json')
+    parser.add_argument('--progress', action='store_true',
+                        help='показывать ход слияния по шкафам')
+    parser.add_argument('--report', action='store_true',
+                        help='сохранить статистику запуска в <результат>.stats.json')
+    parser.add_argument('--slowest', type=int, default=0, metavar='N',
+                        help='напечатать N шкафов с самым долгим слиянием')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                        help='сравнить две выгрузки по группам перемычек вместо записи результата '
+                             '(с --report - JSON в <результат>.diff.json)')
+    parser.add_argument('--columnar', action='store_true',
+                        help='весь набор - колонки целых чисел, слияние одним проходом по всем шкафам '
+                             '(без --stream, --incremental и --validate); вход .cols - снимок колонок')
+    parser.add_argument('--save-columns', action='store_true',
+                        help='с --columnar: сохранить снимок колонок в <результат>.cols')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='строки - во временной базе sqlite на диске, слияние по одному шкафу: '
+                             'для выгрузок больше памяти (без --stream, --incremental, --validate и --columnar)')
+    parser.add_argument('--watch', action='store_true',
+                        help='демон: следить за выгрузкой и пересчитывать только изменившиеся шкафы (Ctrl+C - выход)')
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help='с --watch: как часто проверять выгрузку (по умолчанию %(default)s с)')
+    parser.add_argument('--index', action='store_true',
+                        help='после слияния построить индекс групп и сохранить снимок в <результат>.index')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='после запуска отвечать на запросы к индексу по HTTP/JSON на 127.0.0.1:PORT')
+    parser.add_argument('--from-index', metavar='SNAPSHOT',
+                        help='с --serve: загрузить снимок индекса вместо разбора выгрузки')
+    parser.add_argument('--svo', action='store_true',
+                        help='входы - выгрузки СВО (Откуда / Куда между выводами устройств): '
+                             'цепи всех выводов в --target')
+    parser.add_argument('--trace', nargs='+', metavar='PIN',
+                        help='с --svo: вместо записи цепей напечатать, куда ведут выводы '
+                             '(вывод "XA009:A", разъем "XM1-001.XT2" или устройство "XA009")')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='cprofile - топ функций, tracemalloc - точный пик памяти по этапам')
+    return parser
+
+
+def expand_sources(patterns: Sequence[str]) -> List[str]:
+    """раскрыть шаблоны glob, сохранив порядок и убрав повторы"""
+    sources: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for source in matches:
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+def plan_targets(sources: List[str], args: argparse.Namespace) -> List[Tuple[object, str]]:
+    """пары (вход, результат) для запуска Application"""
+    if args.combine:
+        return [(sources, args.target)]
+    if len(sources) == 1 and args.output_dir is None:
+        return [(sources[0], args.target)]
+    output_dir = args.output_dir or os.path.dirname(args.target) or '.'
+    extension = args.format or format_of(args.target)
+    plan = []
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        plan.append((source, os.path.join(output_dir, f'{stem}_result.{extension}')))
+    return plan
+
+
+def shard_targets(plan: List[Tuple[object, str]]) -> List[Tuple[object, str]]:
+    """--shards: результат - каталог с именем результата без расширения"""
+    return [(source, os.path.splitext(target)[0]) for source, target in plan]
+
+
+def run_one(source, target: str, **options) -> RunStats:
+    """один запуск Application; options передаются в его конструктор"""
+    app = Application(source, target, **options)
+    app.run()
+    return app.stats
+
+
+def application_options(args: argparse.Namespace, target: str) -> dict:
+    return dict(
+        workers=args.workers,
+        atomic=args.atomic,
+        incremental=args.incremental,
+        dedup=args.dedup,
+        validate=args.validate,
+        progress=print_progress if args.progress else None,
+        profile=args.profile,
+        report=f'{target}.stats.json' if args.report else None,
+        # у каталога шардов нет расширения - формат берется из --target
+        fmt=args.format or (format_of(args.target) if args.shards else None),
+        stream=args.stream,
+        index=args.serve is not None,
+        snapshot=f'{target}.index' if args.index else None,
+        columnar=args.columnar,
+        save_columns=f'{target}{SNAPSHOT_SUFFIX}' if args.save_columns else None,
+        sqlite=args.sqlite,
+        outputs=extra_outputs(target, args.also),
+        shards=args.shards,
+    )
+
+
+def extra_outputs(target: str, formats: Sequence[str]) -> List[str]:
+    """пути результатов --also: имя результата с расширением формата (сам результат не повторяется)"""
+    stem = os.path.splitext(target)[0]
+    outputs = []
+    for fmt in formats:
+        output = f'{stem}.{fmt}'
+        if output != target and output not in outputs:
+            outputs.append(output)
+    return outputs
+
+
+def format_timings(source, target: str, stats: RunStats) -> str:
+    if not isinstance(source, str):
+        source = ', '.join(source)
+    timings = stats.timings
+    stages = '  '.join(f'{stage} {seconds:.3f} s' for stage, seconds in timings.items())
+    line = (f'{source} -> {target}  {stages}  total {sum(timings.values()):.3f} s'
+            f'  ({stats.rows} строк, {stats.cabinets} шкафов, {stats.groups} групп)')
+    if stats.duplicates:
+        line += f'  дубликатов: {stats.duplicates}'
+    if stats.reappeared:
+        line += f'  повторных секций шкафов: {stats.reappeared}'
+    if stats.findings is not None:
+        found = ', '.join(f'{check} {count}' for check, count in stats.findings.items() if count)
+        line += f'  замечания: {found or "нет"}'
+    if stats.cache_hits is not None:
+        line += f'  cache: {stats.cache_hits} из кэша, {stats.cache_misses} пересчитано'
+    if stats.shards_written is not None:
+        line += f'  шарды: {stats.shards_written} записано, {stats.shards_skipped} без изменений'
+    return line
+
+
+def run_diff(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    missing = [source for source in args.diff if not os.path.isfile(source)]
+    if missing:
+        parser.error(f'нет файлов: {", ".join(missing)}')
+    diff = ExportDiff(*args.diff)
+    diff.compare()
+    report = diff.format()
+    if report:
+        print(report)
+    summary = diff.summary()
+    print(f'{args.diff[0]} -> {args.diff[1]}  групп: +{summary["added"]} -{summary["removed"]} '
+          f'~{summary["changed"]}  шкафов без изменений: {diff.unchanged_cabinets}, '
+          f'сравнено: {diff.compared_cabinets}')
+    if args.report:
+        os.makedirs(os.path.dirname(args.target) or '.', exist_ok=True)
+        diff.write_json(f'{args.target}.diff.json')
+    return 0
+
+
+def trace_nodes(index: NetIndex, query: str) -> List[str]:
+    """выводы запроса --trace: сам вывод, все выводы разъема или устройства"""
+    if query in index:
+        return [query]
+    device, connector = split_device(query)
+    return index.device_pins(device, connector or None)
+
+
+def run_svo(sources: List[str], args: argparse.Namespace) -> int:
+    index = NetIndex.from_source(sources)
+    if args.trace:
+        for query in args.trace:
+            nodes = trace_nodes(index, query)
+            if not nodes:
+                print(f'{query}\tнет в выгрузке')
+            for node in nodes:
+                print(f'{node}\t' + '\t'.join(index.trace(node)))
+        return 0
+    os.makedirs(os.path.dirname(args.target) or '.', exist_ok=True)
+    with open(args.target, 'w', encoding='utf-8') as out:
+        nets = index.write_nets(out)
+    print(f'{", ".join(sources)} -> {args.target}  ({len(index)} проводов, '
+          f'{len(index.pins.names)} выводов, {nets} цепей)')
+    return 0
+
+
+def serve_index(index: QueryIndex, port: int):
+    server = QueryServer(index, ('127.0.0.1', port))
+    print(f'индекс: {index.summary()}  http://127.0.0.1:{port}/term?cabinet=&term=  (Ctrl+C - выход)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def print_update(update: WatchUpdate):
+    cabinets = ', '.join(update.cabinets[:10]) + (' ...' if len(update.cabinets) > 10 else '')
+    print(f'{time.strftime("%H:%M:%S")}  шкафов пересчитано: {len(update.cabinets)} ({cabinets})  '
+          f'сдвиг ссылок: {len(update.shifted)}  '
+          f'перемычек +{update.added} -{update.removed}  {update.seconds:.3f} s', flush=True)
+
+
+def run_watch(source, target: str, args: argparse.Namespace) -> int:
+    watcher = ExportWatcher(source, target, interval=args.interval)
+    try:
+        watcher.watch(print_update)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        return run_diff(parser, args)
+    if args.from_index:
+        if args.serve is None:
+            parser.error('--from-index работает только с --serve')
+        serve_index(QueryIndex.load(args.from_index), args.serve)
+        return 0
+    if args.stream and (args.incremental or args.validate):
+        parser.error('--stream не сочетается с --incremental и --validate')
+    if (args.columnar or args.save_columns) and (args.stream or args.incremental or args.validate):
+        parser.error('--columnar не сочетается с --stream, --incremental и --validate')
+    if args.sqlite and (args.stream or args.incremental or args.validate or args.columnar or args.save_columns):
+        parser.error('--sqlite не сочетается с --stream, --incremental, --validate и --columnar')
+    if args.trace and not args.svo:
+        parser.error('--trace работает только с --svo')
+    sources = expand_sources(args.source)
+    missing = [source for source in sources if not os.path.isfile(source)]
+    if missing:
+        parser.error(f'нет файлов: {", ".join(missing)}')
+    if args.svo:
+        return run_svo(sources, args)
+    if args.shards < 0:
+        parser.error('--shards: число шкафов в шарде должно быть положительным')
+    if args.shards and args.also:
+        parser.error('--shards пишет один формат, без --also')
+    plan = plan_targets(sources, args)
+    if args.shards:
+        plan = shard_targets(plan)
+    targets = [target for _, target in plan]
+    if len(set(targets)) != len(targets):
+        parser.error('у разных входов совпадают имена результатов, используйте --combine')
+    if args.serve is not None and len(plan) > 1:
+        parser.error('--serve работает с одним результатом (один вход или --combine)')
+    if args.watch:
+        if len(plan) > 1:
+            parser.error('--watch работает с одним результатом (один вход или --combine)')
+        if (args.format or format_of(plan[0][1])) != 'txt' or args.also or args.shards:
+            parser.error('--watch пишет только текстовый результат')
+        return run_watch(*plan[0], args)
+    for target in targets:
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+
+    if args.serve is not None:
+        source, target = plan[0]
+        app = Application(source, target, **application_options(args, target))
+        app.run()
+        print(format_timings(source, target, app.stats))
+        serve_index(app.query_index, args.serve)
+        return 0
+
+    if args.jobs > 1 and len(plan) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [executor.submit(run_one, source, target, **application_options(args, target))
+                       for source, target in plan]
+            results = [future.result() for future in futures]
+    else:
+        results = [run_one(source, target, **application_options(args, target)) for source, target in plan]
+
+    for (source, target), stats in zip(plan, results):
+        print(format_timings(source, target, stats))
+        if args.slowest:
+            for cabinet, seconds in stats.slowest_cabinets(args.slowest):
+                print(f'\t{cabinet}\t{seconds:.4f} s')
+        if stats.profile:
+            print(stats.profile)
+    return 0
@@ -0,0 +1,290 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from core.data_parser import Row
+from core.data_writer import DataWriter, REMARK_3_ON_2, cabinet_number
+from core.functions import terminal_key
+from core.provenance import pack_ref, render_ref
+from core.xlsx_writer import Group
+
+# снимок набора: заголовок, колонки как есть (байты array) и таблицы строк
+SNAPSHOT_SUFFIX = '.cols'
+SNAPSHOT_MAGIC = b'CJCOLS01'
+# magic, порядок байт, 0 - меток групп нет / 1 - есть, затем 5 чисел: шкафы, сигналы, клеммы, узлы, строки
+_HEADER = struct.Struct('<8s1sB6x5Q')
+_ALIGN = 8
+
+# колонки: имя и тип array; узел - клемма внутри шкафа (у разных шкафов разные узлы)
+_NODE_COLUMNS = (('node_cabinet', 'i'), ('node_term', 'i'))
+_ROW_COLUMNS = (('row_cabinet', 'i'), ('row_signal', 'i'), ('row_fr', 'i'), ('row_to', 'i'), ('row_ref', 'Q'))
+
+
+def is_snapshot(source) -> bool:
+    return isinstance(source, (str, os.PathLike)) and os.fspath(source).endswith(SNAPSHOT_SUFFIX)
+
+
+def _intern(table: Dict[str, int], names: List[str], name: str) -> int:
+    value = table.get(name)
+    if value is None:
+        value = table[name] = len(names)
+        names.append(name)
+    return value
+
+
+class ColumnarDataset:
+    """вся выгрузка в колонках целых чисел
+
+    Шкафы, сигналы и клеммы заменены номерами в таблицах строк; строки
+    выгрузки - параллельные колонки array (шкаф, сигнал, откуда, куда,
+    упакованная ссылка), пустая клемма - -1. Клемма шкафа - узел графа.
+    merge() одним проходом union-find по колонкам всех шкафов сразу
+    заполняет колонку меток: корень группы для каждой строки. Снимок
+    (save/load) - колонки как есть, загружается через mmap без разбора.
+    """
+
+    def __init__(self):
+        self.cabinets: List[str] = []
+        self.signals: List[str] = []
+        self.terms: List[str] = []
+        self.node_cabinet = array('i')
+        self.node_term = array('i')
+        self.row_cabinet = array('i')
+        self.row_signal = array('i')
+        self.row_fr = array('i')
+        self.row_to = array('i')
+        self.row_ref = array('Q')
+        # корень группы строки после merge() (-1 - строка без клемм)
+        self.labels: Optional[array] = None
+        self.duplicates = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._views: List[memoryview] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Row], dedup: bool = False) -> 'ColumnarDataset':
+        """из потока строк DataParser.iter_rows(); dedup - только подсчет повторов
+
+        Повторная строка соединяет те же клеммы, поэтому на группы не влияет,
+        а ее ссылка, как и у DataParser, остается у клемм.
+        """
+        dataset = cls()
+        cabinets: Dict[str, int] = {}
+        signals: Dict[str, int] = {}
+        terms: Dict[str, int] = {}
+        nodes: Dict[Tuple[int, int], int] = {}
+        seen = set()
+        row_cabinet, row_signal = dataset.row_cabinet, dataset.row_signal
+        row_fr, row_to, row_ref = dataset.row_fr, dataset.row_to, dataset.row_ref
+        node_cabinet, node_term = dataset.node_cabinet, dataset.node_term
+
+        def node(cabinet_id: int, term: Optional[str]) -> int:
+            if not term:
+                return -1
+            key = (cabinet_id, _intern(terms, dataset.terms, term))
+            node_id = nodes.get(key)
+            if node_id is None:
+                node_id = nodes[key] = len(node_cabinet)
+                node_cabinet.append(cabinet_id)
+                node_term.append(key[1])
+            return node_id
+
+        for row in rows:
+            cabinet_id = _intern(cabinets, dataset.cabinets, row.cabinet)
+            signal_id = _intern(signals, dataset.signals, row.signal)
+            fr, to = node(cabinet_id, row.fr), node(cabinet_id, row.to)
+            if dedup:
+                key = (cabinet_id, signal_id, fr, to)
+                if key in seen:
+                    dataset.duplicates += 1
+                seen.add(key)
+            row_cabinet.append(cabinet_id)
+            row_signal.append(signal_id)
+            row_fr.append(fr)
+            row_to.append(to)
+            row_ref.append(pack_ref(row.num_file, row.num_line))
+        return dataset
+
+    def __len__(self):
+        return len(self.row_cabinet)
+
+    def merge(self) -> int:
+        """метки групп всех строк (union-find по номерам узлов), число групп"""
+        parent = list(range(len(self.node_cabinet)))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                # сжатие пути делением пополам
+                parent[node] = node = parent[parent[node]]
+            return node
+
+        for fr, to in zip(self.row_fr, self.row_to):
+            if fr >= 0 and to >= 0:
+                fr_root, to_root = find(fr), find(to)
+                if fr_root != to_root:
+                    parent[max(fr_root, to_root)] = min(fr_root, to_root)
+        self.labels = array('i', (find(fr if fr >= 0 else to) if fr >= 0 or to >= 0 else -1
+                                  for fr, to in zip(self.row_fr, self.row_to)))
+        return self.group_count()
+
+    def group_count(self) -> int:
+        labels = self.labels
+        return len(set(labels)) - (-1 in labels) + sum(1 for label in labels if label < 0)
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        """группы шкафов в порядке result.txt, как DataWriter.iter_cabinets()
+
+        Строки раскладываются по шкафам (сортировка подсчетом в одну колонку
+        номеров строк), узлы групп и их ссылки собираются для одного шкафа
+        перед его выдачей - в памяти только текущий шкаф. Порядок групп
+        внутри шкафа - как у DataMerging.merge_cabinet (по первой строке
+        группы) с устойчивой сортировкой render_groups; клеммы группы
+        сортируются по общему рангу клемм - сравнением целых чисел.
+        """
+        if self.labels is None:
+            self.merge()
+        terms = self.terms
+        term_rank = [0] * len(terms)
+        for rank, term_id in enumerate(sorted(range(len(terms)), key=lambda i: terminal_key(terms[i]))):
+            term_rank[term_id] = rank
+        for cabinet_id, rows in self._cabinet_rows():
+            yield self.cabinets[cabinet_id], self._cabinet_groups(rows, term_rank)
+
+    def _cabinet_rows(self) -> Iterator[Tuple[int, array]]:
+        """номера строк каждого шкафа (в порядке выгрузки), шкафы - в порядке вывода"""
+        counts = [0] * len(self.cabinets)
+        for cabinet_id in self.row_cabinet:
+            counts[cabinet_id] += 1
+        order = sorted(range(len(self.cabinets)), key=lambda i: cabinet_number(self.cabinets[i]))
+        positions = [0] * len(self.cabinets)
+        position = 0
+        for cabinet_id in order:
+            positions[cabinet_id] = position
+            position += counts[cabinet_id]
+        rows = array('i', [0]) * len(self)
+        for row, cabinet_id in enumerate(self.row_cabinet):
+            rows[positions[cabinet_id]] = row
+            positions[cabinet_id] += 1
+        position = 0
+        for cabinet_id in order:
+            yield cabinet_id, rows[position:position + counts[cabinet_id]]
+            position += counts[cabinet_id]
+
+    def _cabinet_groups(self, rows: array, term_rank: List[int]) -> Iterator[Group]:
+        """группы одного шкафа по его строкам; строка без клемм - отдельная пустая группа"""
+        row_fr, row_to, row_ref, labels = self.row_fr, self.row_to, self.row_ref, self.labels
+        # метка группы -> ее узлы; узел -> ссылки 'файл_строка' (сначала откуда, потом куда)
+        members: Dict[int, Set[int]] = {}
+        refs: Dict[int, List[str]] = {}
+        # метки групп по первой строке, None - строка без клемм
+        first: List[Optional[int]] = []
+        for row in rows:
+            label = labels[row]
+            if label < 0:
+                first.append(None)
+                continue
+            nodes = members.get(label)
+            if nodes is None:
+                nodes = members[label] = set()
+                first.append(label)
+            ref = render_ref(row_ref[row])
+            for node in (row_fr[row], row_to[row]):
+                if node >= 0:
+                    nodes.add(node)
+                    refs.setdefault(node, []).append(ref)
+
+        terms, node_term = self.terms, self.node_term
+        groups = []
+        for label in first:
+            nodes = sorted(members[label], key=lambda node: term_rank[node_term[node]]) if label is not None else []
+            names = tuple(terms[node_term[node]] for node in nodes)
+            groups.append((terminal_key(''.join(names)), names, nodes))
+        groups.sort(key=lambda group: group[0])
+        for _, names, nodes in groups:
+            term_refs = [refs[node] for node in nodes]
+            remark = REMARK_3_ON_2 if any(len(wire_refs) > 2 for wire_refs in term_refs) else ''
+            yield names, term_refs, remark
+
+    def save(self, path: str):
+        """снимок: заголовок, колонки (байты array с выравниванием по 8) и таблицы строк"""
+        labels = self.labels
+        header = _HEADER.pack(SNAPSHOT_MAGIC, sys.byteorder[0].encode(), labels is not None,
+                              len(self.cabinets), len(self.signals), len(self.terms), len(self.node_cabinet), len(self))
+        with open(path, 'wb') as f:
+            f.write(header)
+            columns = [getattr(self, name) for name, _ in _NODE_COLUMNS + _ROW_COLUMNS]
+            if labels is not None:
+                columns.append(labels)
+            for column in columns:
+                data = memoryview(column).cast('B')
+                f.write(data)
+                f.write(bytes(-len(data) % _ALIGN))
+            for names in (self.cabinets, self.signals, self.terms):
+                blob = '\n'.join(names).encode()
+                f.write(struct.pack('<Q', len(blob)))
+                f.write(blob)
+
+    @classmethod
+    def load(cls, path: str) -> 'ColumnarDataset':
+        """снимок через mmap: колонки - memoryview прямо на страницы файла, без копирования"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byteorder, has_labels, *counts = _HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC:
+            mapped.close()
+            raise ValueError(f'{path}: не снимок ColumnarDataset')
+        if byteorder != sys.byteorder[0].encode():
+            mapped.close()
+            raise ValueError(f'{path}: снимок с другим порядком байт')
+        n_cabinets, n_signals, n_terms, n_nodes, n_rows = counts
+        dataset = cls()
+        dataset._mmap = mapped
+        buffer = memoryview(mapped)
+        dataset._views.append(buffer)
+        offset = _HEADER.size
+        columns = [(name, code, n_nodes) for name, code in _NODE_COLUMNS]
+        columns += [(name, code, n_rows) for name, code in _ROW_COLUMNS]
+        if has_labels:
+            columns.append(('labels', 'i', n_rows))
+        for name, code, length in columns:
+            size = length * array(code).itemsize
+            view = buffer[offset:offset + size].cast(code)
+            dataset._views.append(view)
+            setattr(dataset, name, view)
+            offset += size + (-size % _ALIGN)
+        for name, count in (('cabinets', n_cabinets), ('signals', n_signals), ('terms', n_terms)):
+            size, = struct.unpack_from('<Q', mapped, offset)
+            offset += 8
+            names = bytes(buffer[offset:offset + size]).decode().split('\n') if count else []
+            setattr(dataset, name, names)
+            offset += size
+        return dataset
+
+    def __enter__(self) -> 'ColumnarDataset':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """отпустить mmap снимка (колонки после этого недоступны); набор из строк не меняется"""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ColumnarWriter(DataWriter):
+    """DataWriter, который берет группы прямо из ColumnarDataset"""
+
+    def __init__(self, target, dataset: ColumnarDataset, atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = ()):
+        super().__init__(target, {}, {}, atomic=atomic, fmt=fmt, outputs=outputs)
+        self.dataset = dataset
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        return self.dataset.iter_cabinets()
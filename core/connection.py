@@ -1,22 +1,52 @@
+from typing import Iterable, Optional, Set, Tuple
+
 from core.functions import sorting_key
 
 class Connection:
     """представления одного соединения /перемычка, шлейф в рамках шкафа/"""
+    __slots__ = ('cabinet', 'signal', '_terms', '_sorted')
+
     def __init__(self, cabinet: str, signal: str = '', *terms):
         self.cabinet = cabinet
         self.signal = signal
-        self.terms = set(i for i in terms if i)
-        
+        self._terms: Set[str] = set(i for i in terms if i)
+        # отсортированные клеммы, сбрасывается при любом изменении terms
+        self._sorted: Optional[Tuple[str, ...]] = None
+
+    @property
+    def terms(self) -> Set[str]:
+        return self._terms
+
+    @terms.setter
+    def terms(self, value: Set[str]):
+        # `conn.terms |= other` тоже приходит сюда
+        self._terms = value
+        self._sorted = None
+
+    def update(self, terms: Iterable[str]):
+        """добавить клеммы на месте"""
+        self._terms.update(terms)
+        self._sorted = None
+
+    def sorted_terms(self) -> Tuple[str, ...]:
+        if self._sorted is None:
+            self._sorted = tuple(sorted(self._terms, key=sorting_key))
+        return self._sorted
+
+    def overlaps(self, other: 'Connection') -> bool:
+        """есть ли общие клеммы в одном шкафу - то же, что bool(self & other), без нового объекта"""
+        return self.cabinet == other.cabinet and not self._terms.isdisjoint(other._terms)
+
     def __str__(self):
-        line = " -> ".join(sorted(self.terms, key=sorting_key))
+        line = " -> ".join(self.sorted_terms())
         return f'{self.cabinet} ({line}) ({self.signal})'
-    
+
     def __iter__(self):
-        return iter(sorted(self.terms, key=sorting_key))
-    
+        return iter(self.sorted_terms())
+
     def __repr__(self):
         return f'Connection({self.cabinet}, {self.signal}, {", ".join(self)})'
-    
+
     def __and__(self, other):
         if isinstance(other, Connection):
             if self.cabinet == other.cabinet:
@@ -24,7 +54,7 @@ class Connection:
             elif self.cabinet != other.cabinet or self.signal != other.signal:
                 return Connection(self.cabinet, self.signal)
         return NotImplemented
-    
+
     def __or__(self, other):
         if isinstance(other, Connection):
             if self.cabinet == other.cabinet:
@@ -32,27 +62,32 @@ class Connection:
             elif self.cabinet != other.cabinet or self.signal != other.signal:
                 return Connection(self.cabinet, self.signal)
         return NotImplemented
-    
+
     def __bool__(self):
-        return bool(len(self.terms))
-    
+        return bool(self._terms)
+
     def __eq__(self, value):
         if isinstance(value, Connection):
-            return repr(self) == repr(value)
+            return (self.cabinet == value.cabinet
+                    and self.signal == value.signal
+                    and self._terms == value._terms)
         return NotImplemented
-    
+
+    def __hash__(self):
+        return hash((self.cabinet, self.signal, frozenset(self._terms)))
+
     def __add__(self, other):
         if isinstance(other, Connection):
             if self.cabinet == other.cabinet and self.signal == other.signal:
                 return Connection(self.cabinet, self.signal, *(self.terms | other.terms))
         return NotImplemented
-    
+
     def tabulated_term(self):
-        return '\t'.join(iter(self))
-    
-    
+        return '\t'.join(self.sorted_terms())
+
+
 if __name__ == '__main__':
     first_conn = Connection(*'1HV19	0501	XT11-b9	XT10-b9'.split('\t'))
     second_conn = Connection(*'1HV19	0501	XT11-b9	XT12-b9'.split('\t'))
     third_conn = first_conn + second_conn
-    print(third_conn)
\ No newline at end of file
+    print(third_conn)
@@ -1,23 +1,179 @@
-from typing import Dict, Set, List
+import gc
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Dict, Set, List, Sequence, Tuple, Optional
 
 from core.connection import Connection
+from core.merge_cache import MergeCache
+from core.stats import ProgressCallback
+from core.union_find import UnionFind
+
+# в пул уходят только клеммы перемычек шкафа, обратно - группы клемм
+CabinetBatch = List[Tuple[str, List[Set[str]]]]
+# группа: номер первой перемычки группы и клеммы группы
+TermGroups = List[Tuple[int, Set[str]]]
+
 
 class DataMerging:
-    def __init__(self, cabinet_jumpers: Dict[str, List[Connection]]):
+    # меньше строк - пул процессов не окупает запуск, сливаем в одном процессе
+    PARALLEL_MIN_ROWS = 50_000
+    # мелкие шкафы отправляются в пул пачками примерно такого размера
+    BATCH_ROWS = 10_000
+
+    def __init__(self, cabinet_jumpers: Dict[str, List[Connection]], workers: int = 0,
+                 cache: Optional[MergeCache] = None, digests: Optional[Dict[str, str]] = None,
+                 progress: Optional[ProgressCallback] = None):
         self.cabinet_jumpers: Dict[str, List[Connection]] = cabinet_jumpers
-        
+        self.workers = workers
+        # инкрементальный режим: шкафы с неизменным хэшем строк берутся из кэша
+        self.cache = cache
+        self.digests = digests
+        self.progress = progress
+        # время слияния каждого пересчитанного шкафа, секунды
+        self.cabinet_times: Dict[str, float] = {}
+
     def process(self):
+        pending = self.cabinet_jumpers
+        if self.cache is not None:
+            pending = self._apply_cache()
+        if self._parallel(pending):
+            self._process_parallel(pending)
+        else:
+            self._process_serial(pending)
+        if self.cache is not None:
+            for cabinet, jumpers in pending.items():
+                self.cache.put(cabinet, self.digests[cabinet], jumpers)
+            self.cache.save(keep=set(self.cabinet_jumpers))
+
+    def _apply_cache(self) -> Dict[str, List[Connection]]:
+        """подставить группы из кэша, вернуть шкафы для пересчета"""
+        pending = {}
         for cabinet, jumpers in self.cabinet_jumpers.items():
-            a = 0
-            while a < len(jumpers):
-                b = a + 1
-                while b < len(jumpers):
-                    if jumpers[a] & jumpers[b]:
-                        jumpers[a] |= jumpers.pop(b)
-                        b = a + 1
-                    else:
-                        b += 1
-                a += 1
-                if a % 100 == 0:
-                    print(f"\r{cabinet}={a}/{len(jumpers)}", end='')
-        print()
\ No newline at end of file
+            cached = self.cache.get(cabinet, self.digests[cabinet])
+            if cached is None:
+                pending[cabinet] = jumpers
+            else:
+                jumpers[:] = cached
+        return pending
+
+    def _parallel(self, cabinets: Optional[Dict[str, List[Connection]]] = None) -> bool:
+        if cabinets is None:
+            cabinets = self.cabinet_jumpers
+        if self.workers <= 1 or len(cabinets) < 2:
+            return False
+        rows = sum(len(jumpers) for jumpers in cabinets.values())
+        return rows >= self.PARALLEL_MIN_ROWS
+
+    def _process_serial(self, cabinets: Dict[str, List[Connection]]):
+        progress, total = self.progress, len(cabinets)
+        for done, (cabinet, jumpers) in enumerate(cabinets.items(), 1):
+            start = time.perf_counter()
+            jumpers[:] = self.merge_cabinet(jumpers)
+            self.cabinet_times[cabinet] = time.perf_counter() - start
+            if progress is not None:
+                progress(cabinet, done, total)
+
+    def _process_parallel(self, cabinets: Dict[str, List[Connection]]):
+        """шкафы не делят клеммы - сливаем их независимо в пуле процессов
+
+        Процессам передаются только множества клемм перемычек, назад приходят
+        группы клемм с номером первой перемычки - объекты Connection собираются
+        здесь (сигнал и шкаф берутся у первой перемычки, как в merge_cabinet).
+        executor.map сохраняет порядок пачек, результат кладется обратно
+        в те же списки, поэтому вывод совпадает с последовательным прогоном.
+        """
+        progress, total, done = self.progress, len(cabinets), 0
+        # ответы - сотни тысяч новых множеств; со сборщиком мусора их разбор
+        # в несколько раз дольше (он снова и снова обходит всю кучу процесса)
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for batch in executor.map(_merge_batch, self._batches(cabinets)):
+                    for cabinet, groups, seconds in batch:
+                        jumpers = cabinets[cabinet]
+                        jumpers[:] = _connections(jumpers, groups)
+                        self.cabinet_times[cabinet] = seconds
+                        done += 1
+                        if progress is not None:
+                            progress(cabinet, done, total)
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _batches(self, cabinets: Dict[str, List[Connection]]):
+        batch: CabinetBatch = []
+        rows = 0
+        for cabinet, jumpers in cabinets.items():
+            batch.append((cabinet, [jumper.terms for jumper in jumpers]))
+            rows += len(jumpers)
+            if rows >= self.BATCH_ROWS:
+                yield batch
+                batch, rows = [], 0
+        if batch:
+            yield batch
+
+    @staticmethod
+    def merge_cabinet(jumpers: List[Connection]) -> List[Connection]:
+        """объединение перемычек шкафа в группы связности по общим клеммам
+
+        Порядок групп - по первому вхождению, сигнал группы - от первой перемычки
+        (как при попарном слиянии через `|`).
+        """
+        return _connections(jumpers, merge_terms([jumper.terms for jumper in jumpers]))
+
+
+def merge_terms(rows: Sequence[Collection[str]]) -> TermGroups:
+    """группы связности наборов клемм: (номер первого набора группы, клеммы группы)
+
+    Группы - в порядке первого вхождения; пустой набор ни с чем не
+    пересекается и дает свою пустую группу.
+    """
+    terminals = UnionFind()
+    for terms in rows:
+        terms = iter(terms)
+        first = next(terms, None)
+        if first is None:
+            continue
+        terminals.add(first)
+        for term in terms:
+            terminals.union(first, term)
+
+    groups: Dict[str, Set[str]] = {}
+    merged: TermGroups = []
+    for index, terms in enumerate(rows):
+        if not terms:
+            merged.append((index, set()))
+            continue
+        root = terminals.find(next(iter(terms)))
+        group = groups.get(root)
+        if group is None:
+            group = groups[root] = set()
+            merged.append((index, group))
+        group.update(terms)
+    return merged
+
+
+def _connections(jumpers: List[Connection], groups: TermGroups) -> List[Connection]:
+    """группы клемм merge_terms -> Connection; сигнал группы - от ее первой перемычки"""
+    merged = []
+    for index, terms in groups:
+        jumper = jumpers[index]
+        if not terms:
+            # перемычка без клемм остается как есть
+            merged.append(jumper)
+            continue
+        group = Connection(jumper.cabinet, jumper.signal)
+        group.terms = terms
+        merged.append(group)
+    return merged
+
+
+def _merge_batch(batch: CabinetBatch) -> List[Tuple[str, TermGroups, float]]:
+    """задача для процесса пула: группы клемм пачки шкафов (с временем каждого)"""
+    result = []
+    for cabinet, rows in batch:
+        start = time.perf_counter()
+        groups = merge_terms(rows)
+        result.append((cabinet, groups, time.perf_counter() - start))
+    return result
@@ -1,52 +1,186 @@
-from typing import Dict, Set, List
+import hashlib
+import os
+import sys
+from typing import Dict, Iterable, Set, List, Iterator, NamedTuple, Optional, Sequence, Tuple
 from collections import defaultdict
 
 from core.connection import Connection
+from core.provenance import ProvenanceStore, pack_ref, parse_ref
+from core.xlsx_reader import iter_xlsx_lines
+
+# строки читаются лениво, блоками такого размера
+READ_BUFFER = 1 << 20
+
+
+class Row(NamedTuple):
+    """одна строка выгрузки: перемычка шкафа и ее происхождение (файл_строка)"""
+    cabinet: str
+    signal: str
+    fr: str
+    to: Optional[str]
+    num_file: int
+    num_line: int
+
 
 class DataParser:
-    def __init__(self, source):
+    def __init__(self, source=None, hash_cabinets: bool = False, dedup: bool = False, validator=None):
         self.source = source
         self.num_file = 0
         self.num_line = 0
         self.cabinets_connections: Dict[str, List[Connection]] = defaultdict(list)
-        self.jumpers_to_lines: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
-        
+        # шкаф -> клемма -> ссылки 'файл_строка' (компактное хранение, см. core/provenance.py)
+        self.jumpers_to_lines: ProvenanceStore = ProvenanceStore()
+        # хэш строк каждого шкафа (для инкрементального режима), см. cabinet_digests()
+        self.hash_cabinets = hash_cabinets
+        self.cabinet_hashes = {}
+        # dedup: одинаковые строки (шкаф, сигнал, откуда, куда) дают одно соединение,
+        # ссылки на все их строки остаются в jumpers_to_lines
+        self.dedup = dedup
+        self.duplicates = 0
+        self._unique_rows: Dict[str, Set[Tuple[str, str, Optional[str]]]] = defaultdict(set)
+        # WiringValidator: видит каждую строку, битые строки записывает вместо исключения
+        self.validator = validator
+        # число колонок в последнем заголовке (для проверки строк)
+        self.header_columns = 0
+
     def parse_data(self):
-        with open(self.source, encoding='utf-8') as rf:
-            for line in rf.readlines():
-                self._process_line(line=line)
-            
-    def _process_line(self, line: str):
-        line = line.strip()
-        
-        if not line.strip():
+        for row in self.iter_rows():
+            self.add_row(row)
+
+    def iter_rows(self) -> Iterator[Row]:
+        """потоковое чтение выгрузки: строки отдаются по мере чтения файла
+
+        source - путь или список путей; несколько файлов читаются подряд,
+        как одна склеенная выгрузка. Файлы .xlsx читаются напрямую
+        (core/xlsx_reader.py), каждый лист с заголовком - отдельная выгрузка.
+        """
+        self._reset_numbering()
+        sources = [self.source] if isinstance(self.source, (str, os.PathLike)) else self.source
+        for source in sources:
+            yield from self._iter_rows(self._read_lines(source))
+
+    def iter_lines(self, lines: Iterable[str]) -> Iterator[Row]:
+        """строки выгрузки из любого итерируемого строк (без файлов); нумерация - заново"""
+        self._reset_numbering()
+        return self._iter_rows(lines)
+
+    def _iter_rows(self, lines: Iterable[str]) -> Iterator[Row]:
+        for line in lines:
+            row = self.parse_line(line)
+            if row is not None:
+                yield row
+
+    def _reset_numbering(self):
+        # каждый проход по выгрузке нумерует файлы и строки с начала
+        self.num_file = 0
+        self.num_line = 0
+        self.header_columns = 0
+
+    @staticmethod
+    def _read_lines(source) -> Iterator[str]:
+        if os.fspath(source).lower().endswith('.xlsx'):
+            yield from iter_xlsx_lines(source)
             return
-        
+        with open(source, encoding='utf-8', buffering=READ_BUFFER) as rf:
+            yield from rf
+
+    def add_row(self, row: Row):
+        if self.validator is not None:
+            self.validator.check_row(row)
+        if self.dedup and self._is_duplicate(row):
+            self.duplicates += 1
+        else:
+            self.cabinets_connections[row.cabinet].append(Connection(
+                row.cabinet,
+                row.signal,
+                row.fr,
+                row.to
+            ))
+        source_info = pack_ref(row.num_file, row.num_line)
+        terms_lines = self.jumpers_to_lines.cabinet(row.cabinet)
+        for term in (row.fr, row.to):
+            if term:
+                terms_lines.add(term, source_info)
+        if self.hash_cabinets:
+            digest = self.cabinet_hashes.get(row.cabinet)
+            if digest is None:
+                digest = self.cabinet_hashes[row.cabinet] = hashlib.blake2b(digest_size=16)
+            digest.update(f'{row.signal}\t{row.fr}\t{row.to or ""}\n'.encode())
+
+    def _is_duplicate(self, row: Row) -> bool:
+        seen = self._unique_rows[row.cabinet]
+        key = row[1:4]
+        if key in seen:
+            return True
+        seen.add(key)
+        return False
+
+    def release(self, cabinet: str):
+        """забыть все данные шкафа (потоковый режим: шкаф уже слит и сохранен)"""
+        self.cabinets_connections.pop(cabinet, None)
+        self.jumpers_to_lines.release(cabinet)
+        self._unique_rows.pop(cabinet, None)
+        self.cabinet_hashes.pop(cabinet, None)
+
+    def unique_rows(self, cabinet: str) -> Set[Tuple[str, str, Optional[str]]]:
+        """ключи строк шкафа (сигнал, откуда, куда), по которым dedup ищет повторы"""
+        return self._unique_rows.get(cabinet, set())
+
+    def restore(self, cabinet: str, groups: Iterable[Tuple[Sequence[str], Sequence[Sequence[str]], str]],
+                unique_rows: Iterable[Tuple[str, str, Optional[str]]] = ()):
+        """вернуть шкаф после release() по его уже слитым группам
+
+        Группа (клеммы, их ссылки 'файл_строка', замечание) становится одним
+        соединением - связность та же, что у исходных строк, ссылки клемм
+        идут в прежнем порядке. unique_rows - ключи строк для dedup.
+        """
+        connections = self.cabinets_connections[cabinet]
+        terms_lines = self.jumpers_to_lines.cabinet(cabinet)
+        for terms, refs, _ in groups:
+            connections.append(Connection(cabinet, '', *terms))
+            for term, wire_refs in zip(terms, refs):
+                for ref in wire_refs:
+                    terms_lines.add(term, parse_ref(ref))
+        if self.dedup:
+            self._unique_rows[cabinet].update(unique_rows)
+
+    def cabinet_digests(self) -> Dict[str, str]:
+        """шкаф -> хэш его строк (сигнал, откуда, куда) в порядке выгрузки"""
+        return {cabinet: digest.hexdigest() for cabinet, digest in self.cabinet_hashes.items()}
+
+    def parse_line(self, line: str) -> Optional[Row]:
+        """одна строка выгрузки с продолжением нумерации; заголовок и пустая строка - None"""
+        line = line.strip()
+
+        if not line:
+            return None
+
         if 'Откуда' in line:
             self.num_line = 0
             self.num_file += 1
-            return
-        
+            self.header_columns = line.count('\t') + 1
+            return None
+
         self.num_line += 1
-        
-        # try:
-        if len(line.split('\t')) > 3:
-            cabinet, signal, fr, to = line.split('\t')
+
+        fields = line.split('\t')
+        if self.validator is not None and (
+                not 3 <= len(fields) <= 4 or self.header_columns and len(fields) != self.header_columns):
+            self.validator.malformed(self.num_file, self.num_line, line, self.header_columns)
+            if not 3 <= len(fields) <= 4:
+                return None
+        if len(fields) > 3:
+            cabinet, signal, fr, to = fields
+            # шкафы, сигналы и клеммы повторяются тысячи раз - храним одну копию
+            to = sys.intern(to)
         else:
-            cabinet, signal, fr = line.split('\t')
+            cabinet, signal, fr = fields
             to = None
-        source_info = f'{self.num_file}_{self.num_line}'
-        self.cabinets_connections[cabinet].append(Connection(
-            cabinet,
-            signal,
-            fr,
-            to
-        ))
-        for term in (fr, to):
-            if term:
-                self.jumpers_to_lines[cabinet][term].append(source_info)
-            
-        # except:
-        #     print('Ошибка парсинга страницы')
-            
-            
\ No newline at end of file
+        return Row(
+            sys.intern(cabinet),
+            sys.intern(signal),
+            sys.intern(fr),
+            to,
+            self.num_file,
+            self.num_line
+        )
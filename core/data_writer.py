@@ -1,31 +1,72 @@
-from typing import Dict, List, Set
+from contextlib import ExitStack
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 from core.functions import sorting_key
 from core.connection import Connection
+from core.rendering import SINKS, format_of, open_target, render
+from core.xlsx_writer import Group
+
+FORMATS = tuple(SINKS)
+REMARK_3_ON_2 = 'Замечание 3 на 2'
+
+
+def cabinet_number(cabinet: str) -> int:
+    """порядок шкафов в результате - по цифрам имени"""
+    return int(''.join(i for i in cabinet if i.isdigit()))
+
+
+def render_groups(jumpers: Sequence[Connection], terms_lines: Mapping[str, List[str]]) -> Iterator[Group]:
+    """группы шкафа в порядке вывода: клеммы, их ссылки 'файл_строка' и замечание"""
+    for jumper in sorted(jumpers, key=sorting_key):
+        terms = jumper.sorted_terms()
+        refs = [terms_lines[wire] for wire in terms]
+        remark = REMARK_3_ON_2 if any(len(wire_refs) > 2 for wire_refs in refs) else ''
+        yield terms, refs, remark
+
 
 class DataWriter:
-    def __init__(self, target, cabinet_jumpers: Dict[str, List[Connection]], jumpers_to_lines: Dict[str, Dict[str, List[str]]]):
+    """группы шкафов в порядке вывода (iter_cabinets) и их запись через core/rendering.py
+
+    target - путь или открытый файл (объект с write: текстовый для txt, csv
+    и jsonl, бинарный для xlsx); outputs - дополнительные результаты (формат
+    по расширению), они пишутся тем же проходом по группам. Конструктор
+    файлов не трогает, все открывается только в process().
+    """
+
+    def __init__(self, target, cabinet_jumpers: Dict[str, List[Connection]], jumpers_to_lines: Mapping[str, Mapping[str, List[str]]], atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = ()):
         self.target = target
         self.cabinet_jumpers: Dict[str, List[Connection]] = cabinet_jumpers
-        self.jumpers_to_lines: Dict[str, Dict[str, List[str]]] = jumpers_to_lines
-        with open(self.target, 'w', encoding='utf-8') as f:
-            f.write('')
-        
-    def process(self):
-        for cabinet, jumpers in sorted(self.cabinet_jumpers.items(), key=lambda x: int(''.join(i for i in x[0] if i.isdigit()))):
-            self.print(cabinet)
-            for jumper in sorted(jumpers, key=sorting_key):
-                lines = []
-                for wire in jumper:
-                    lines.append(', '.join(self.jumpers_to_lines[cabinet][wire]))
-                ending = ''
-                for k in lines:
-                    if k.count(',') > 1:
-                        ending = '\tЗамечание 3 на 2' 
-                self.print(f'\t{jumper.tabulated_term()}')
-                self.print(f'\t{"\t".join(lines)}{ending}')
-                
-    def print(self, *line):
-        with open(self.target, 'a', encoding='utf-8') as f:
-            f.write(f'{line[0]}\n')
-            # print(*line)
\ No newline at end of file
+        # шкаф -> клемма -> ссылки 'файл_строка' (ProvenanceStore или обычные словари)
+        self.jumpers_to_lines: Mapping[str, Mapping[str, List[str]]] = jumpers_to_lines
+        # atomic: пишем во временный файл рядом и подменяем target одним rename,
+        # читатель никогда не видит недописанный результат
+        self.atomic = atomic
+        # txt - result.txt, xlsx - книга для макросов, csv, jsonl (по умолчанию по расширению target)
+        if fmt is None:
+            fmt = format_of(target)
+        if fmt not in FORMATS:
+            raise ValueError(f'неизвестный формат результата: {fmt}')
+        self.fmt = fmt
+        self.outputs = list(outputs)
+
+    def targets(self) -> List[Tuple[object, str]]:
+        """(результат, формат): target и outputs"""
+        return [(self.target, self.fmt)] + [(output, format_of(output)) for output in self.outputs]
+
+    def process(self) -> int:
+        """один проход по группам во все результаты; число групп"""
+        with ExitStack() as stack:
+            sinks = []
+            for target, fmt in self.targets():
+                sink = SINKS[fmt]
+                sinks.append(sink(stack.enter_context(open_target(target, sink.binary, self.atomic))))
+            return render(self.iter_cabinets(), sinks)
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        """шкафы в порядке вывода, у каждого - ленивый поток его групп"""
+        for cabinet, jumpers in sorted(self.cabinet_jumpers.items(), key=lambda x: cabinet_number(x[0])):
+            yield cabinet, self.iter_groups(cabinet, jumpers)
+
+    def iter_groups(self, cabinet: str, jumpers: Sequence[Connection]) -> Iterator[Group]:
+        return render_groups(jumpers, self.jumpers_to_lines[cabinet])
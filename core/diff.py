@@ -0,0 +1,157 @@
+import hashlib
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from core.connection import Connection
+from core.data_merger import DataMerging
+from core.data_parser import DataParser
+from core.data_writer import cabinet_number
+from core.functions import sorting_key
+from core.union_find import UnionFind
+
+KINDS = ('added', 'removed', 'changed')
+
+Terms = Tuple[str, ...]
+# строка шкафа без происхождения: сигнал, откуда, куда
+RowKey = Tuple[str, str, Optional[str]]
+
+
+class GroupChange(NamedTuple):
+    """изменение группы перемычек шкафа
+
+    changed - связанные общими клеммами старые и новые группы
+    (расширение, сокращение, слияние или разделение групп).
+    """
+    kind: str
+    cabinet: str
+    old: Tuple[Terms, ...]
+    new: Tuple[Terms, ...]
+
+
+def group_hash(cabinet: str, terms: Iterable[str]) -> str:
+    """канонический хэш группы: шкаф и отсортированный набор клемм"""
+    canonical = '\t'.join(sorted(terms))
+    return hashlib.blake2b(f'{cabinet}\n{canonical}'.encode(), digest_size=16).hexdigest()
+
+
+def read_export(source) -> Dict[str, Set[RowKey]]:
+    """шкаф -> множество строк выгрузки (без ссылок на файл и строку)"""
+    cabinets: Dict[str, Set[RowKey]] = {}
+    for row in DataParser(source).iter_rows():
+        rows = cabinets.get(row.cabinet)
+        if rows is None:
+            rows = cabinets[row.cabinet] = set()
+        rows.add(row[1:4])
+    return cabinets
+
+
+def merged_groups(cabinet: str, rows: Iterable[RowKey]) -> Dict[str, Terms]:
+    """канонический хэш группы -> клеммы группы (в порядке sorting_key)"""
+    jumpers = [Connection(cabinet, signal, fr, to) for signal, fr, to in rows]
+    return {
+        group_hash(cabinet, group.terms): group.sorted_terms()
+        for group in DataMerging.merge_cabinet(jumpers) if group
+    }
+
+
+def diff_groups(cabinet: str, old: Dict[str, Terms], new: Dict[str, Terms]) -> List[GroupChange]:
+    """изменения групп шкафа; совпавшие по хэшу группы пропускаются
+
+    Оставшиеся группы обеих сторон объединяются по общим клеммам:
+    компонента только из новых групп - added, только из старых - removed,
+    из тех и других - changed.
+    """
+    old_only = [old[key] for key in old.keys() - new.keys()]
+    new_only = [new[key] for key in new.keys() - old.keys()]
+    if not old_only and not new_only:
+        return []
+    terminals = UnionFind()
+    for terms in old_only + new_only:
+        terminals.add(terms[0])
+        for term in terms[1:]:
+            terminals.union(terms[0], term)
+
+    components: Dict[str, Tuple[List[Terms], List[Terms]]] = {}
+    for side, groups in ((0, old_only), (1, new_only)):
+        for terms in groups:
+            components.setdefault(terminals.find(terms[0]), ([], []))[side].append(terms)
+
+    changes = []
+    for old_groups, new_groups in components.values():
+        kind = 'changed' if old_groups and new_groups else 'added' if new_groups else 'removed'
+        changes.append(GroupChange(kind, cabinet, tuple(sorted(old_groups, key=_terms_key)),
+                                   tuple(sorted(new_groups, key=_terms_key))))
+    changes.sort(key=lambda change: _terms_key((change.new or change.old)[0]))
+    return changes
+
+
+def _terms_key(terms: Terms):
+    return [sorting_key(term) for term in terms]
+
+
+class ExportDiff:
+    """сравнение двух выгрузок на уровне слитых групп перемычек
+
+    Шкафы с одинаковым множеством строк (порядок и повторы строк не важны) не сливаются вовсе,
+    для остальных группы сравниваются по каноническому хэшу (group_hash),
+    результат (result.txt) ни для одной стороны не строится.
+    """
+
+    def __init__(self, old_source, new_source):
+        self.old_source = old_source
+        self.new_source = new_source
+        self.changes: List[GroupChange] = []
+        self.unchanged_cabinets = 0
+        self.compared_cabinets = 0
+
+    def compare(self) -> List[GroupChange]:
+        old = read_export(self.old_source)
+        new = read_export(self.new_source)
+        self.changes = []
+        self.unchanged_cabinets = self.compared_cabinets = 0
+        for cabinet in sorted(old.keys() | new.keys(), key=cabinet_number):
+            old_rows, new_rows = old.pop(cabinet, set()), new.pop(cabinet, set())
+            # множества сравниваются по хэшам строк без сортировки - одинаковые шкафы не сливаются
+            if old_rows == new_rows:
+                self.unchanged_cabinets += 1
+                continue
+            self.compared_cabinets += 1
+            self.changes.extend(diff_groups(cabinet, merged_groups(cabinet, old_rows),
+                                            merged_groups(cabinet, new_rows)))
+        return self.changes
+
+    def summary(self) -> Dict[str, int]:
+        counts = Counter(change.kind for change in self.changes)
+        return {kind: counts[kind] for kind in KINDS}
+
+    def by_cabinet(self) -> Dict[str, List[GroupChange]]:
+        cabinets: Dict[str, List[GroupChange]] = {}
+        for change in self.changes:
+            cabinets.setdefault(change.cabinet, []).append(change)
+        return cabinets
+
+    def format(self) -> str:
+        """текстовый отчет: шкаф, затем '+' новые, '-' удаленные, '~' измененные группы"""
+        lines = []
+        for cabinet, changes in self.by_cabinet().items():
+            counts = Counter(change.kind for change in changes)
+            lines.append(f'{cabinet}\t+{counts["added"]} -{counts["removed"]} ~{counts["changed"]}')
+            for change in changes:
+                old = ' | '.join(' '.join(terms) for terms in change.old)
+                new = ' | '.join(' '.join(terms) for terms in change.new)
+                if change.kind == 'added':
+                    lines.append(f'\t+ {new}')
+                elif change.kind == 'removed':
+                    lines.append(f'\t- {old}')
+                else:
+                    lines.append(f'\t~ {old} -> {new}')
+        return '\n'.join(lines)
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'summary': dict(self.summary(), unchanged_cabinets=self.unchanged_cabinets,
+                                compared_cabinets=self.compared_cabinets),
+                'changes': [change._asdict() for change in self.changes],
+            }, f, ensure_ascii=False, indent=1)
@@ -1,9 +1,23 @@
-def sorting_key(item: set):
+import re
+from functools import lru_cache
+
+_NUMBERS = re.compile(r'\d+')
+
+# разных клемм в выгрузке - десятки тысяч, ключ каждой считаем один раз
+SORT_KEY_CACHE = 1 << 18
+
+def sorting_key(item):
     """
     Кастомный ключ сортировки для элементов вида XT...
     Возвращает кортеж: (приоритет группы, число, исходная строка)
     """
-    item: str = ''.join(item)
+    if not isinstance(item, str):
+        item = ''.join(item)
+    return terminal_key(item)
+
+@lru_cache(maxsize=SORT_KEY_CACHE)
+def terminal_key(item: str):
+    """ключ сортировки одной строки (кэшируется)"""
     # Определяем приоритет группы
     if item.startswith('XTK'):
         group_priority = 0  # Первая группа: XTK
@@ -15,9 +29,8 @@ def sorting_key(item: set):
         group_priority = 3  # Все остальное
     
     # Извлекаем число из строки
-    import re
-    numbers = re.findall(r'\d+', item)
-    number_one = int(numbers[0]) if numbers and len(numbers) >= 1 else 0
-    number_two = int(numbers[1]) if numbers and len(numbers) >= 2 else 0
+    numbers = _NUMBERS.findall(item)
+    number_one = int(numbers[0]) if len(numbers) >= 1 else 0
+    number_two = int(numbers[1]) if len(numbers) >= 2 else 0
     
     return (group_priority, number_one, number_two, item)
@@ -0,0 +1,60 @@
+import pickle
+from typing import Dict, List, Optional, Tuple
+
+from core.connection import Connection
+from core.rendering import open_target
+
+# меняется при изменении алгоритма слияния или формата - старый кэш игнорируется
+CACHE_VERSION = 1
+
+CachedGroups = List[Tuple[str, Tuple[str, ...]]]
+
+
+class MergeCache:
+    """кэш результатов слияния по шкафам на диске (pickle рядом с результатом)
+
+    Шкаф хранится вместе с хэшем своих строк; если хэш не изменился,
+    группы берутся из кэша без DataMerging.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cabinets: Dict[str, Tuple[str, CachedGroups]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_target(cls, target: str) -> 'MergeCache':
+        cache = cls(f'{target}.merge-cache')
+        cache.load()
+        return cache
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            # битый кэш просто пересчитываем
+            return
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            self.cabinets = data['cabinets']
+
+    def save(self, keep: Optional[set] = None):
+        """сохранить кэш; keep - шкафы текущего запуска, остальные выбрасываются"""
+        if keep is not None:
+            self.cabinets = {c: v for c, v in self.cabinets.items() if c in keep}
+        with open_target(self.path, binary=True, atomic=True) as f:
+            pickle.dump({'version': CACHE_VERSION, 'cabinets': self.cabinets}, f, pickle.HIGHEST_PROTOCOL)
+
+    def get(self, cabinet: str, digest: str) -> Optional[List[Connection]]:
+        cached = self.cabinets.get(cabinet)
+        if cached is None or cached[0] != digest:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [Connection(cabinet, signal, *terms) for signal, terms in cached[1]]
+
+    def put(self, cabinet: str, digest: str, groups: List[Connection]):
+        self.cabinets[cabinet] = (digest, [(group.signal, tuple(group.terms)) for group in groups])
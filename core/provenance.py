@@ -0,0 +1,159 @@
+import threading
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+# (номер файла, номер строки) упаковываются в одно 64-битное число
+LINE_BITS = 32
+LINE_MASK = (1 << LINE_BITS) - 1
+
+
+def pack_ref(num_file: int, num_line: int) -> int:
+    return (num_file << LINE_BITS) | num_line
+
+
+def render_ref(packed: int) -> str:
+    """ссылка в виде файл_строка, как в result.txt"""
+    return f'{packed >> LINE_BITS}_{packed & LINE_MASK}'
+
+
+def parse_ref(ref: str) -> int:
+    """обратное render_ref: 'файл_строка' -> упакованная ссылка"""
+    num_file, num_line = ref.split('_')
+    return pack_ref(int(num_file), int(num_line))
+
+
+class TermTable:
+    """общая для всех шкафов таблица имен клемм: имя <-> целый id"""
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.names)
+            self.names.append(term)
+        return term_id
+
+
+class CabinetProvenance(Mapping):
+    """происхождение клемм одного шкафа: клемма -> ссылки на строки выгрузки
+
+    Хранятся только два массива по ссылкам: id клеммы и упакованная
+    ссылка (12 байт на ссылку). Индекс клемма -> ссылки и число ссылок
+    строятся одним проходом при первом чтении и держатся, пока шкаф
+    читают (ProvenanceStore хранит индекс только последнего шкафа).
+    Строки 'файл_строка' собираются только при чтении (__getitem__).
+    Индекс строится под блокировкой хранилища, а каждое чтение берет
+    его один раз в локальную переменную - читать шкафы можно из многих
+    потоков (сброс индекса другим потоком не ломает начатое чтение).
+    """
+    __slots__ = ('store', 'term_ids', 'refs', '_index')
+
+    def __init__(self, store: 'ProvenanceStore'):
+        self.store = store
+        self.term_ids = array('I')
+        self.refs = array('Q')
+        self._index: Optional[Dict[int, List[int]]] = None
+
+    def add(self, term: str, packed: int):
+        self.term_ids.append(self.store.terms.intern(term))
+        self.refs.append(packed)
+        self._index = None
+
+    def index(self) -> Dict[int, List[int]]:
+        """id клеммы -> упакованные ссылки в порядке выгрузки"""
+        index = self._index
+        if index is not None:
+            return index
+        with self.store._lock:
+            index = self._index
+            if index is None:
+                index = {}
+                for term_id, packed in zip(self.term_ids, self.refs):
+                    refs = index.get(term_id)
+                    if refs is None:
+                        index[term_id] = [packed]
+                    else:
+                        refs.append(packed)
+                self._index = index
+                self.store._indexed(self)
+        return index
+
+    def drop_index(self):
+        self._index = None
+
+    def count(self, term: str) -> int:
+        """число ссылок на клемму"""
+        term_id = self.store.terms.ids.get(term)
+        return len(self.index().get(term_id, ()))
+
+    def packed_refs(self, term: str) -> List[int]:
+        term_id = self.store.terms.ids.get(term)
+        refs = self.index().get(term_id) if term_id is not None else None
+        if refs is None:
+            raise KeyError(term)
+        return refs
+
+    def __getitem__(self, term: str) -> List[str]:
+        return [render_ref(packed) for packed in self.packed_refs(term)]
+
+    def __iter__(self) -> Iterator[str]:
+        names = self.store.terms.names
+        return (names[term_id] for term_id in self.index())
+
+    def __len__(self):
+        return len(self.index())
+
+    def __contains__(self, term):
+        term_id = self.store.terms.ids.get(term)
+        return term_id is not None and term_id in self.index()
+
+
+class ProvenanceStore(Mapping):
+    """шкаф -> CabinetProvenance; замена словаря jumpers_to_lines со строками"""
+
+    def __init__(self):
+        self.terms = TermTable()
+        self._cabinets: Dict[str, CabinetProvenance] = {}
+        self._last_indexed: Optional[CabinetProvenance] = None
+        # построение индекса шкафа и смена последнего индексированного шкафа
+        self._lock = threading.Lock()
+
+    def cabinet(self, cabinet: str) -> CabinetProvenance:
+        """провенанс шкафа, создается при первом обращении"""
+        store = self._cabinets.get(cabinet)
+        if store is None:
+            store = self._cabinets[cabinet] = CabinetProvenance(self)
+        return store
+
+    def add(self, cabinet: str, term: str, num_file: int, num_line: int):
+        self.cabinet(cabinet).add(term, pack_ref(num_file, num_line))
+
+    def release(self, cabinet: str):
+        """удалить шкаф; без шкафов таблица имен клемм тоже начинается заново"""
+        store = self._cabinets.pop(cabinet, None)
+        with self._lock:
+            if store is not None and store is self._last_indexed:
+                self._last_indexed = None
+        if not self._cabinets:
+            self.terms = TermTable()
+
+    def _indexed(self, cabinet: CabinetProvenance):
+        # индекс держим только у одного шкафа - память не растет при записи;
+        # вызывается под self._lock
+        if self._last_indexed is not None and self._last_indexed is not cabinet:
+            self._last_indexed.drop_index()
+        self._last_indexed = cabinet
+
+    def __getitem__(self, cabinet: str) -> CabinetProvenance:
+        return self._cabinets[cabinet]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cabinets)
+
+    def __len__(self):
+        return len(self._cabinets)
@@ -0,0 +1,188 @@
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from core.xlsx_writer import Group
+
+# меняется при изменении формата снимка - старый снимок не читается
+INDEX_VERSION = 1
+
+
+class GroupRecord(NamedTuple):
+    """группа перемычек шкафа, как в result.txt: клеммы, их ссылки 'файл_строка', замечание"""
+    cabinet: str
+    terms: Tuple[str, ...]
+    refs: Tuple[Tuple[str, ...], ...]
+    remark: str
+
+    def to_dict(self, group_id: int) -> dict:
+        return {
+            'id': group_id,
+            'cabinet': self.cabinet,
+            'terms': list(self.terms),
+            'refs': {term: list(refs) for term, refs in zip(self.terms, self.refs)},
+            'remark': self.remark,
+        }
+
+
+class QueryIndex:
+    """индекс слитых групп для точечных запросов
+
+    (шкаф, клемма) -> группа, группа -> ее строки выгрузки, строка выгрузки
+    ('файл_строка') -> группа; все три - поиск в словаре. После построения
+    индекс только читается, поэтому запросы из разных потоков безопасны
+    без блокировок. Снимок (save/load) хранит только группы, словари
+    поиска строятся заново при загрузке - без разбора выгрузки.
+    """
+
+    def __init__(self, groups: Iterable[GroupRecord] = ()):
+        self.groups: List[GroupRecord] = []
+        # шкаф -> клемма -> номер группы
+        self._by_term: Dict[str, Dict[str, int]] = {}
+        # 'файл_строка' -> номер группы
+        self._by_line: Dict[str, int] = {}
+        for group in groups:
+            self._add(group)
+
+    @classmethod
+    def from_cabinets(cls, cabinets: Iterable[Tuple[str, Iterable[Group]]]) -> 'QueryIndex':
+        """из шкафов в порядке вывода, как их отдает DataWriter.iter_cabinets()"""
+        index = cls()
+        for cabinet, groups in cabinets:
+            index.add_cabinet(cabinet, groups)
+        return index
+
+    def add_cabinet(self, cabinet: str, groups: Iterable[Group]) -> List[Group]:
+        """добавить группы следующего по порядку шкафа; их список - для записи тем же проходом"""
+        groups = list(groups)
+        for terms, refs, remark in groups:
+            self._add(GroupRecord(cabinet, tuple(terms), tuple(tuple(wire_refs) for wire_refs in refs), remark))
+        return groups
+
+    def _add(self, group: GroupRecord):
+        group_id = len(self.groups)
+        self.groups.append(group)
+        terms = self._by_term.setdefault(group.cabinet, {})
+        for term, refs in zip(group.terms, group.refs):
+            terms[term] = group_id
+            for ref in refs:
+                self._by_line[ref] = group_id
+
+    def __len__(self):
+        return len(self.groups)
+
+    def group(self, group_id: int) -> GroupRecord:
+        return self.groups[group_id]
+
+    def group_id(self, cabinet: str, term: str) -> Optional[int]:
+        return self._by_term.get(cabinet, {}).get(term)
+
+    def group_of(self, cabinet: str, term: str) -> Optional[GroupRecord]:
+        """группа, в которую входит клемма шкафа"""
+        group_id = self.group_id(cabinet, term)
+        return None if group_id is None else self.groups[group_id]
+
+    def lines_of(self, group_id: int) -> List[str]:
+        """строки выгрузки группы ('файл_строка') без повторов, в порядке клемм"""
+        return list(dict.fromkeys(ref for refs in self.groups[group_id].refs for ref in refs))
+
+    def line_group_id(self, ref: str) -> Optional[int]:
+        return self._by_line.get(ref)
+
+    def group_for_line(self, ref: str) -> Optional[GroupRecord]:
+        """группа, в которую попала строка выгрузки 'файл_строка'"""
+        group_id = self._by_line.get(ref)
+        return None if group_id is None else self.groups[group_id]
+
+    def cabinets(self) -> Iterator[str]:
+        return iter(self._by_term)
+
+    def summary(self) -> Dict[str, int]:
+        return {'groups': len(self.groups), 'cabinets': len(self._by_term), 'lines': len(self._by_line)}
+
+    def save(self, path: str):
+        """снимок индекса, атомарно и с обычными правами, как result.txt"""
+        # core.rendering сам импортирует этот модуль (GroupRecord)
+        from core.rendering import open_target
+        groups = [tuple(group) for group in self.groups]
+        with open_target(path, binary=True, atomic=True) as f:
+            pickle.dump({'version': INDEX_VERSION, 'groups': groups}, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> 'QueryIndex':
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            raise ValueError(f'{path}: снимок индекса другой версии, пересоздайте его')
+        return cls(GroupRecord._make(group) for group in data['groups'])
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    """GET /term?cabinet=&term=, /line?ref=, /group?id=, /stats -> JSON"""
+    index: QueryIndex
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        index = self.index
+        try:
+            if url.path == '/term':
+                group_id = index.group_id(query['cabinet'], query['term'])
+            elif url.path == '/line':
+                group_id = index.line_group_id(query['ref'])
+            elif url.path == '/group':
+                group_id = int(query['id'])
+                if not 0 <= group_id < len(index):
+                    group_id = None
+            elif url.path == '/stats':
+                self._send(200, index.summary())
+                return
+            else:
+                self._send(404, {'error': f'неизвестный запрос {url.path}'})
+                return
+        except (KeyError, ValueError) as error:
+            self._send(400, {'error': f'нет или неверный параметр {error}'})
+            return
+        if group_id is None:
+            self._send(404, {'error': 'не найдено'})
+        else:
+            self._send(200, index.group(group_id).to_dict(group_id))
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryServer(HTTPServer):
+    """HTTP/JSON поверх QueryIndex; запросы обслуживает пул из workers потоков"""
+
+    def __init__(self, index: QueryIndex, address: Tuple[str, int] = ('127.0.0.1', 8000), workers: int = 8):
+        handler = type('QueryHandler', (_QueryHandler,), {'index': index})
+        super().__init__(address, handler)
+        self.index = index
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
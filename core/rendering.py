@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, IO, Iterator, List, Sequence, Tuple, Type
+
+from core.query_index import GroupRecord
+from core.xlsx_writer import Group, XlsxWriter
+
+# каждый приемник пишет в свой файл со своим буфером такого размера
+WRITE_BUFFER = 1 << 20
+
+# формат -> класс приемника, заполняется register_sink
+SINKS: Dict[str, Type['Sink']] = {}
+
+
+def register_sink(fmt: str) -> Callable[[Type['Sink']], Type['Sink']]:
+    """декоратор: приемник для формата fmt (он же расширение файла результата)"""
+    def register(sink: Type['Sink']) -> Type['Sink']:
+        sink.fmt = fmt
+        SINKS[fmt] = sink
+        return sink
+    return register
+
+
+def format_of(target) -> str:
+    """формат результата по расширению target; открытый файл и неизвестное расширение - txt"""
+    name = str(target).lower()
+    for fmt in SINKS:
+        if name.endswith(f'.{fmt}'):
+            return fmt
+    return 'txt'
+
+
+def format_cabinet(cabinet: str, groups: Iterable[Group]) -> str:
+    """текст шкафа в result.txt: строка шкафа, затем у каждой группы строка клемм и строка ссылок"""
+    parts = [f'{cabinet}\n']
+    for terms, refs, remark in groups:
+        ending = f'\t{remark}' if remark else ''
+        parts.append('\t' + '\t'.join(terms) + '\n\t' + '\t'.join(', '.join(wire_refs) for wire_refs in refs)
+                     + f'{ending}\n')
+    return ''.join(parts)
+
+
+@contextmanager
+def open_target(target, binary: bool = False, atomic: bool = False) -> Iterator[IO]:
+    """файл результата для записи
+
+    target - путь или уже открытый файл (его закрывает владелец). atomic:
+    пишем во временный файл рядом и подменяем target одним rename, читатель
+    никогда не видит недописанный результат.
+    """
+    if hasattr(target, 'write'):
+        yield target
+        return
+    mode, options = ('wb', {}) if binary else ('w', {'encoding': 'utf-8'})
+    if not atomic:
+        with open(target, mode, buffering=WRITE_BUFFER, **options) as f:
+            yield f
+        return
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, buffering=WRITE_BUFFER, **options) as f:
+            yield f
+        # mkstemp создает файл 0600, выставляем обычные права по umask
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class Sink(ABC):
+    """приемник групп одного формата поверх открытого файла
+
+    write_cabinet получает уже отсортированные группы шкафа (клеммы,
+    ссылки, замечание) и номер первой из них - общий для всех
+    приемников и совпадающий с номерами групп QueryIndex.
+    """
+    fmt = ''
+    binary = False
+
+    def __init__(self, handle: IO):
+        self.handle = handle
+
+    @abstractmethod
+    def write_cabinet(self, cabinet: str, groups: Sequence[Group], first_id: int):
+        """записать группы шкафа"""
+
+    def close(self):
+        """дописать хвост формата (файл закрывает open_target)"""
+
+
+@register_sink('txt')
+class TextSink(Sink):
+    """result.txt: строка шкафа, у группы строка клемм и строка ссылок"""
+
+    def write_cabinet(self, cabinet: str, groups: Sequence[Group], first_id: int):
+        self.handle.write(format_cabinet(cabinet, groups))
+
+
+@register_sink('csv')
+class CsvSink(Sink):
+    """CSV: строка на клемму - шкаф, номер группы, клемма, ее ссылки, замечание группы"""
+    HEADER = ('Шкаф', 'Группа', 'Клемма', 'Ссылки', 'Замечание')
+
+    def __init__(self, handle: IO):
+        super().__init__(handle)
+        self.writer = csv.writer(handle, lineterminator='\n')
+        self.writer.writerow(self.HEADER)
+
+    def write_cabinet(self, cabinet: str, groups: Sequence[Group], first_id: int):
+        rows = []
+        for group_id, (terms, refs, remark) in enumerate(groups, first_id):
+            # группа без клемм - одна строка с пустой клеммой
+            for term, wire_refs in zip(terms, refs) if terms else [('', ())]:
+                rows.append((cabinet, group_id, term, ', '.join(wire_refs), remark))
+        self.writer.writerows(rows)
+
+
+@register_sink('jsonl')
+class JsonLinesSink(Sink):
+    """JSON Lines: объект на группу, как ответ /group сервера QueryServer"""
+
+    def write_cabinet(self, cabinet: str, groups: Sequence[Group], first_id: int):
+        self.handle.write(''.join(
+            json.dumps(GroupRecord(cabinet, terms, refs, remark).to_dict(group_id), ensure_ascii=False) + '\n'
+            for group_id, (terms, refs, remark) in enumerate(groups, first_id)))
+
+
+@register_sink('xlsx')
+class XlsxSink(Sink):
+    """книга .xlsx со скрытым листом связей (core/xlsx_writer.py)"""
+    binary = True
+
+    def __init__(self, handle: IO):
+        super().__init__(handle)
+        self.book = XlsxWriter(handle)
+
+    def write_cabinet(self, cabinet: str, groups: Sequence[Group], first_id: int):
+        self.book.write_groups([(cabinet, groups)])
+
+    def close(self):
+        self.book.close()
+
+
+def render(cabinets: Iterable[Tuple[str, Iterable[Group]]], sinks: Sequence[Sink]) -> int:
+    """один проход по шкафам во все приемники; число групп
+
+    Группы шкафа (сортировка, ссылки, замечание - уже в cabinets, см.
+    DataWriter.iter_cabinets) собираются один раз и отдаются каждому
+    приемнику - новый формат не добавляет ни сортировки, ни слияния.
+    В памяти одновременно только группы текущего шкафа.
+    """
+    group_id = 0
+    for cabinet, groups in cabinets:
+        groups: List[Group] = list(groups)
+        for sink in sinks:
+            sink.write_cabinet(cabinet, groups, group_id)
+        group_id += len(groups)
+    for sink in sinks:
+        sink.close()
+    return group_id
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import json
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.rendering import SINKS, format_cabinet, open_target
+from core.xlsx_writer import Group
+
+MANIFEST = 'manifest.json'
+# меняется при изменении формата манифеста - старый манифест считается пустым
+MANIFEST_VERSION = 1
+SHARD_WORKERS = 4
+
+# символы, которые нельзя оставлять в имени файла шарда
+_UNSAFE = re.compile(r'[^\w.-]')
+
+# шкаф и его готовые группы (ссылки уже собраны в списки)
+CabinetGroups = Tuple[str, List[Group]]
+
+
+def content_hash(text: bytes) -> str:
+    """хэш содержимого шкафа - его текста в result.txt, не зависит от формата шардов"""
+    return hashlib.blake2b(text, digest_size=16).hexdigest()
+
+
+class ShardReport(NamedTuple):
+    """итог записи шардов: всего, переписано, оставлено как есть, удалено лишних"""
+    shards: int
+    written: int
+    skipped: int
+    removed: int
+
+
+class ShardedWriter:
+    """результат по шардам: файл на шкаф (batch=1) или на batch шкафов подряд
+
+    Шкафы идут в порядке вывода; их группы собираются в основном потоке
+    (источник групп - парсер, sqlite, колонки - читается одним потоком),
+    а текст, хэши и запись шардов - в пуле потоков. manifest.json хранит
+    для каждого шкафа шард, число групп, хэш содержимого и (для текстовых
+    форматов) смещение и длину его части в шарде. Шард, у которого не
+    изменились ни состав, ни хэши шкафов, не пересобирается и не
+    переписывается. Номера групп в csv / jsonl - внутри шарда.
+    """
+
+    def __init__(self, directory: str, fmt: str = 'txt', batch: int = 1, workers: int = SHARD_WORKERS):
+        if fmt not in SINKS:
+            raise ValueError(f'неизвестный формат результата: {fmt}')
+        if batch < 1:
+            raise ValueError('в шарде должен быть хотя бы один шкаф')
+        self.directory = directory
+        self.fmt = fmt
+        self.batch = batch
+        self.workers = workers
+        # записи прежнего манифеста и число шкафов в каждом прежнем шарде
+        self._previous: Dict[str, dict] = {}
+        self._members: Counter = Counter()
+
+    def shard_name(self, number: int, cabinets: List[str], used: Optional[set] = None) -> str:
+        """имя файла шарда; used - уже занятые имена (в нижнем регистре) этого прохода
+
+        Имя шкафа, измененное заменой символов или совпавшее с занятым без учета
+        регистра (Windows, macOS), получает короткий хэш исходного имени.
+        """
+        if self.batch != 1:
+            return f'shard-{number:05d}.{self.fmt}'
+        cabinet = cabinets[0]
+        stem = _UNSAFE.sub('_', cabinet)
+        if stem != cabinet or (used is not None and f'{stem}.{self.fmt}'.casefold() in used):
+            stem = f'{stem}-{content_hash(cabinet.encode())[:8]}'
+        name = f'{stem}.{self.fmt}'
+        if used is not None:
+            if name.casefold() in used:
+                raise ValueError(f'имя шарда {name} для шкафа {cabinet!r} уже занято')
+            used.add(name.casefold())
+        return name
+
+    def write(self, cabinets: Iterable[Tuple[str, Iterable[Group]]]) -> ShardReport:
+        """записать шарды и манифест, удалить шарды, которых больше нет"""
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = ShardManifest.read(self.directory)
+        if manifest.fmt == self.fmt and manifest.batch == self.batch:
+            self._previous = manifest.cabinets
+            self._members = Counter(entry['shard'] for entry in self._previous.values())
+        entries: Dict[str, dict] = {}
+        written = shards = 0
+        pending: Deque[Future] = deque()
+        used: set = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shard') as pool:
+
+            def collect(future: Future):
+                nonlocal written
+                shard_entries, rewritten = future.result()
+                entries.update(shard_entries)
+                written += rewritten
+
+            batch: List[CabinetGroups] = []
+            for cabinet, groups in cabinets:
+                batch.append((cabinet, list(groups)))
+                if len(batch) == self.batch:
+                    name = self.shard_name(shards, [cabinet for cabinet, _ in batch], used)
+                    pending.append(pool.submit(self._write_shard, name, batch))
+                    shards += 1
+                    batch = []
+                # в работе не больше нескольких шардов на поток - память не растет с выгрузкой
+                while len(pending) > 2 * self.workers:
+                    collect(pending.popleft())
+            if batch:
+                name = self.shard_name(shards, [cabinet for cabinet, _ in batch], used)
+                pending.append(pool.submit(self._write_shard, name, batch))
+                shards += 1
+            while pending:
+                collect(pending.popleft())
+        ShardManifest(self.fmt, self.batch, entries).write(self.directory)
+        removed = 0
+        # прежние шарды удаляются, даже если сменились формат или размер шарда
+        stale = {entry['shard'] for entry in manifest.cabinets.values()} - {entry['shard'] for entry in entries.values()}
+        for shard in stale:
+            path = os.path.join(self.directory, shard)
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        return ShardReport(shards, written, shards - written, removed)
+
+    def _write_shard(self, name: str, batch: List[CabinetGroups]) -> Tuple[Dict[str, dict], bool]:
+        """записи манифеста шкафов шарда; True - шард переписан"""
+        cabinets = [cabinet for cabinet, _ in batch]
+        texts = [format_cabinet(cabinet, groups).encode() for cabinet, groups in batch]
+        hashes = [content_hash(text) for text in texts]
+        previous = [self._previous.get(cabinet) for cabinet in cabinets]
+        if (all(entry is not None and entry['shard'] == name and entry['hash'] == digest
+                for entry, digest in zip(previous, hashes))
+                and self._members[name] == len(cabinets)
+                and os.path.exists(os.path.join(self.directory, name))):
+            return dict(zip(cabinets, previous)), False
+        sink_class = SINKS[self.fmt]
+        buffer = io.BytesIO()
+        if self.fmt == 'txt':
+            # текст шкафа для хэша - это и есть его часть шарда
+            sink = None
+        else:
+            sink = sink_class(buffer if sink_class.binary else
+                              io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True))
+        entries = {}
+        group_id = 0
+        for (cabinet, groups), text, digest in zip(batch, texts, hashes):
+            start = buffer.tell()
+            if sink is None:
+                buffer.write(text)
+            else:
+                sink.write_cabinet(cabinet, groups, group_id)
+            group_id += len(groups)
+            entry = {'shard': name, 'groups': len(groups), 'hash': digest}
+            if not sink_class.binary:
+                entry['offset'] = start
+                entry['size'] = buffer.tell() - start
+            entries[cabinet] = entry
+        if sink is not None:
+            sink.close()
+        with open_target(os.path.join(self.directory, name), binary=True, atomic=True) as f:
+            f.write(buffer.getvalue())
+        return entries, True
+
+
+class ShardManifest:
+    """manifest.json каталога шардов: шкаф -> шард, число групп, хэш (и смещение, длина)"""
+
+    def __init__(self, fmt: str = 'txt', batch: int = 1, cabinets: Optional[Dict[str, dict]] = None):
+        self.fmt = fmt
+        self.batch = batch
+        self.cabinets: Dict[str, dict] = cabinets or {}
+
+    @classmethod
+    def read(cls, directory: str) -> 'ShardManifest':
+        """манифест каталога; нет файла или другая версия - пустой манифест"""
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(fmt='')
+        if data.get('version') != MANIFEST_VERSION:
+            return cls(fmt='')
+        return cls(data['format'], data['batch'], data['cabinets'])
+
+    def write(self, directory: str):
+        data = {'version': MANIFEST_VERSION, 'format': self.fmt, 'batch': self.batch, 'cabinets': self.cabinets}
+        with open_target(os.path.join(directory, MANIFEST), atomic=True) as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+class ShardedResult:
+    """чтение результата по шардам: шкаф находится по манифесту, без просмотра остальных"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest = ShardManifest.read(directory)
+        if not self.manifest.fmt:
+            raise ValueError(f'{directory}: нет {MANIFEST}')
+
+    def __contains__(self, cabinet: str):
+        return cabinet in self.manifest.cabinets
+
+    def cabinets(self) -> List[str]:
+        """шкафы в порядке вывода"""
+        return list(self.manifest.cabinets)
+
+    def path(self, cabinet: str) -> str:
+        """файл шарда со шкафом"""
+        return os.path.join(self.directory, self.manifest.cabinets[cabinet]['shard'])
+
+    def read(self, cabinet: str) -> str:
+        """часть шарда со шкафом (txt, csv, jsonl); xlsx - только path()"""
+        entry = self.manifest.cabinets[cabinet]
+        if 'offset' not in entry:
+            raise ValueError(f'шарды {self.manifest.fmt} читаются целиком: {self.path(cabinet)}')
+        with open(self.path(cabinet), 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['size']).decode('utf-8')
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import tempfile
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.connection import Connection
+from core.data_merger import DataMerging
+from core.data_parser import Row
+from core.data_writer import DataWriter, cabinet_number, render_groups
+from core.provenance import pack_ref, render_ref
+from core.query_index import QueryIndex
+from core.xlsx_writer import Group
+
+# строки вставляются пачками такого размера, все - в одной транзакции
+INSERT_BATCH = 10_000
+
+_SCHEMA = '''
+CREATE TABLE cabinets (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE rows (
+    id INTEGER PRIMARY KEY,
+    cabinet INTEGER NOT NULL,
+    signal TEXT NOT NULL,
+    fr TEXT NOT NULL,
+    to_term TEXT,
+    ref INTEGER NOT NULL
+);
+'''
+
+
+class SqliteStore:
+    """строки выгрузки во временной базе sqlite вместо объектов в памяти
+
+    Строки вставляются пачками в одной транзакции, индекс (шкаф, порядок
+    строки) строится после загрузки. Слияние идет по одному шкафу:
+    строки шкафа читаются по индексу, сливаются DataMerging.merge_cabinet
+    и сразу отдаются на запись - в памяти только текущий шкаф.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        # без path - временный файл, удаляется в close()
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(fd)
+            os.remove(path)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # база одноразовая: журнал и fsync не нужны
+        self.connection.executescript('PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;')
+        self.connection.execute('DROP TABLE IF EXISTS rows')
+        self.connection.execute('DROP TABLE IF EXISTS cabinets')
+        self.connection.executescript(_SCHEMA)
+        self.rows = 0
+        self.groups = 0
+        self.cabinet_times: Dict[str, float] = {}
+
+    def load(self, rows: Iterable[Row]) -> int:
+        """вставить строки DataParser.iter_rows() и построить индекс; число строк"""
+        cabinets: Dict[str, int] = {}
+        connection = self.connection
+        rows = iter(rows)
+        with connection:
+            while True:
+                batch = []
+                for row in islice(rows, INSERT_BATCH):
+                    cabinet_id = cabinets.get(row.cabinet)
+                    if cabinet_id is None:
+                        cabinet_id = cabinets[row.cabinet] = len(cabinets) + 1
+                        connection.execute('INSERT INTO cabinets (id, name) VALUES (?, ?)', (cabinet_id, row.cabinet))
+                    batch.append((cabinet_id, row.signal, row.fr, row.to, pack_ref(row.num_file, row.num_line)))
+                if not batch:
+                    break
+                connection.executemany(
+                    'INSERT INTO rows (cabinet, signal, fr, to_term, ref) VALUES (?, ?, ?, ?, ?)', batch)
+                self.rows += len(batch)
+            connection.execute('CREATE INDEX rows_by_cabinet ON rows (cabinet, id)')
+        return self.rows
+
+    def cabinets(self) -> List[Tuple[int, str]]:
+        """(id, шкаф) в порядке вывода: по номеру шкафа, при равных - по первому появлению"""
+        cabinets = self.connection.execute('SELECT id, name FROM cabinets ORDER BY id').fetchall()
+        return sorted(cabinets, key=lambda cabinet: cabinet_number(cabinet[1]))
+
+    def duplicates(self) -> int:
+        """повторы строк (шкаф, сигнал, откуда, куда), как у DataParser(dedup=True)"""
+        distinct, = self.connection.execute(
+            'SELECT COUNT(*) FROM (SELECT DISTINCT cabinet, signal, fr, to_term FROM rows)').fetchone()
+        return self.rows - distinct
+
+    def merge_cabinet(self, cabinet_id: int, cabinet: str) -> Tuple[List[Connection], Dict[str, List[str]]]:
+        """группы шкафа и ссылки его клемм - из строк шкафа по индексу"""
+        jumpers = []
+        terms_lines: Dict[str, List[str]] = {}
+        query = 'SELECT signal, fr, to_term, ref FROM rows WHERE cabinet = ? ORDER BY id'
+        for signal, fr, to, packed in self.connection.execute(query, (cabinet_id,)):
+            jumpers.append(Connection(cabinet, signal, fr, to))
+            ref = render_ref(packed)
+            for term in (fr, to):
+                if term:
+                    terms_lines.setdefault(term, []).append(ref)
+        start = time.perf_counter()
+        merged = DataMerging.merge_cabinet(jumpers)
+        self.cabinet_times[cabinet] = time.perf_counter() - start
+        return merged, terms_lines
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        """слитые группы шкафов в порядке вывода, как DataWriter.iter_cabinets()"""
+        self.groups = 0
+        for cabinet_id, cabinet in self.cabinets():
+            merged, terms_lines = self.merge_cabinet(cabinet_id, cabinet)
+            self.groups += len(merged)
+            yield cabinet, render_groups(merged, terms_lines)
+
+    def close(self):
+        self.connection.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SqliteWriter(DataWriter):
+    """DataWriter, который сливает и пишет шкафы по одному прямо из SqliteStore
+
+    index - QueryIndex, который заполняется теми же группами при записи:
+    второй проход по базе слил бы каждый шкаф еще раз.
+    """
+
+    def __init__(self, target, store: SqliteStore, atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = (), index: Optional[QueryIndex] = None):
+        super().__init__(target, {}, {}, atomic=atomic, fmt=fmt, outputs=outputs)
+        self.store = store
+        self.index = index
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterable[Group]]]:
+        if self.index is None:
+            return self.store.iter_cabinets()
+        return ((cabinet, self.index.add_cabinet(cabinet, groups)) for cabinet, groups in self.store.iter_cabinets())
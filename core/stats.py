@@ -0,0 +1,137 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# progress(cabinet, done, total) - вызывается после слияния каждого шкафа
+ProgressCallback = Callable[[str, int, int], None]
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+
+def max_rss() -> int:
+    """пиковая память процесса в байтах (0, если недоступно)"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss в Linux - в килобайтах, в macOS - в байтах
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def print_progress(cabinet: str, done: int, total: int):
+    """простой progress-callback для консоли"""
+    print(f'\r{cabinet} {done}/{total}', end='\n' if done == total else '', flush=True)
+
+
+@dataclass
+class StageStats:
+    """этап конвейера: время и память
+
+    peak_memory - пик tracemalloc за этот этап (только в режиме
+    'tracemalloc', иначе None). process_max_rss - пиковая память всего
+    процесса (ru_maxrss) на конец этапа: она не сбрасывается между
+    этапами, у этапа после самого тяжелого - то же число.
+    """
+    wall: float = 0.0
+    peak_memory: Optional[int] = None
+    process_max_rss: int = 0
+
+
+@dataclass
+class RunStats:
+    """статистика одного Application.run"""
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    rows: int = 0
+    cabinets: int = 0
+    groups: int = 0
+    # строки-дубликаты, схлопнутые при разборе (DataParser(dedup=True))
+    duplicates: int = 0
+    # число замечаний WiringValidator по видам проверок
+    findings: Optional[Dict[str, int]] = None
+    cache_hits: Optional[int] = None
+    cache_misses: Optional[int] = None
+    # потоковый режим: шкафы, встретившиеся в выгрузке несколькими секциями
+    reappeared: Optional[int] = None
+    # результат по шардам: шарды переписанные и оставленные как есть
+    shards_written: Optional[int] = None
+    shards_skipped: Optional[int] = None
+    cabinet_merge_times: Dict[str, float] = field(default_factory=dict)
+    profile: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if tracing else None
+            self.stages[name] = StageStats(wall, peak, max_rss())
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        return {name: stage.wall for name, stage in self.stages.items()}
+
+    def slowest_cabinets(self, n: int = 10) -> List[Tuple[str, float]]:
+        return sorted(self.cabinet_merge_times.items(), key=lambda x: x[1], reverse=True)[:n]
+
+    def to_dict(self, slowest: int = 10) -> dict:
+        data = asdict(self)
+        del data['cabinet_merge_times']
+        data['total_wall'] = sum(self.timings.values())
+        data['slowest_cabinets'] = [
+            {'cabinet': cabinet, 'merge_time': seconds}
+            for cabinet, seconds in self.slowest_cabinets(slowest)
+        ]
+        return data
+
+    def write_json(self, path: str, slowest: int = 10):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(slowest), f, ensure_ascii=False, indent=2)
+
+
+@contextmanager
+def profiling(mode: Optional[str], stats: RunStats, top: int = 30):
+    """opt-in профилирование всего запуска
+
+    cprofile - cumulative-топ функций в stats.profile,
+    tracemalloc - точный пик памяти по этапам.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f'неизвестный режим профилирования: {mode}')
+    if mode == 'tracemalloc':
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        stats.profile = out.getvalue()
@@ -0,0 +1,155 @@
+import pickle
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.data_merger import DataMerging
+from core.data_parser import DataParser
+from core.data_writer import DataWriter, cabinet_number, render_groups
+from core.xlsx_writer import Group
+
+
+class SpillStore:
+    """временный файл с pickle-блоками по ключам; в памяти только смещения блоков"""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._blocks: Dict[str, List[Tuple[int, int]]] = {}
+        self.bytes_written = 0
+
+    def append(self, key: str, value):
+        """добавить блок к ключу"""
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._file.seek(0, 2)
+        offset = self._file.tell()
+        self._file.write(data)
+        self.bytes_written += len(data)
+        self._blocks.setdefault(key, []).append((offset, len(data)))
+
+    def replace(self, key: str, value):
+        """заменить все блоки ключа одним; старые блоки остаются в файле мусором"""
+        self._blocks.pop(key, None)
+        self.append(key, value)
+
+    def load(self, key: str) -> Iterator:
+        """блоки ключа в порядке добавления"""
+        for offset, size in self._blocks.get(key, ()):
+            self._file.seek(offset)
+            yield pickle.loads(self._file.read(size))
+
+    def keys(self):
+        return self._blocks.keys()
+
+    def __contains__(self, key):
+        return key in self._blocks
+
+    def close(self):
+        self._file.close()
+
+
+def spilled_cabinets(groups: SpillStore) -> Iterator[Tuple[str, Iterator[Group]]]:
+    """готовые группы шкафов из SpillStore в порядке вывода, как DataWriter.iter_cabinets()"""
+    for cabinet in sorted(groups.keys(), key=cabinet_number):
+        yield cabinet, (group for block in groups.load(cabinet) for group in block)
+
+
+class _SpilledWriter(DataWriter):
+    """DataWriter, который берет готовые группы шкафов из SpillStore"""
+
+    def __init__(self, target, groups: SpillStore, atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = ()):
+        super().__init__(target, {}, {}, atomic=atomic, fmt=fmt, outputs=outputs)
+        self.groups = groups
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        return spilled_cabinets(self.groups)
+
+
+class StreamingPipeline:
+    """разбор, слияние и подготовка вывода по одному шкафу за раз
+
+    Выгрузки идут секциями по шкафам: когда начинается следующий шкаф,
+    предыдущий сливается, его группы (с готовыми ссылками) уходят во
+    временный файл, а данные в парсере освобождаются. Пик памяти - самый
+    большой шкаф, а не вся выгрузка. Строки шкафа не сохраняются: шкаф,
+    который встретился снова (склеенные выгрузки), восстанавливается из
+    своих групп (группа - одно соединение со всеми ее клеммами и ссылками)
+    и сливается с новыми строками - результат тот же, что у обычного
+    Application.run. С dedup во временный файл идут еще ключи строк
+    шкафа. В конце группы пишутся в порядке номеров шкафов.
+    """
+
+    def __init__(self, parser: DataParser, target, atomic: bool = False, fmt: Optional[str] = None,
+                 outputs: Sequence = ()):
+        self.parser = parser
+        self.target = target
+        self.atomic = atomic
+        self.fmt = fmt
+        self.outputs = outputs
+        self.rows = 0
+        self.groups = 0
+        # шкафы, чьи строки встретились не одной секцией
+        self.reappeared = 0
+        self.cabinet_times: Dict[str, float] = {}
+        self._groups = SpillStore()
+        # ключи строк шкафов для dedup повторной секции
+        self._unique_rows: Optional[SpillStore] = SpillStore() if parser.dedup else None
+        # число групп каждого шкафа - для пересчета при повторном появлении
+        self._cabinet_groups: Dict[str, int] = {}
+
+    @property
+    def cabinets(self) -> int:
+        return len(self._cabinet_groups)
+
+    def process(self):
+        """разбор и слияние всех шкафов (группы - во временном файле)"""
+        current = None
+        for row in self.parser.iter_rows():
+            if row.cabinet != current:
+                if current is not None:
+                    self._finish_cabinet(current)
+                current = row.cabinet
+                if current in self._groups:
+                    self._restore_cabinet(current)
+            self.parser.add_row(row)
+            self.rows += 1
+        if current is not None:
+            self._finish_cabinet(current)
+
+    def iter_cabinets(self) -> Iterator[Tuple[str, Iterator[Group]]]:
+        """группы всех шкафов после process() и до write()"""
+        return spilled_cabinets(self._groups)
+
+    def write(self):
+        try:
+            _SpilledWriter(self.target, self._groups, atomic=self.atomic, fmt=self.fmt,
+                           outputs=self.outputs).process()
+        finally:
+            self.close()
+
+    def close(self):
+        """удалить временные файлы групп и ключей строк (после write() или вместо него)"""
+        self._groups.close()
+        if self._unique_rows is not None:
+            self._unique_rows.close()
+
+    def _restore_cabinet(self, cabinet: str):
+        """вернуть в парсер шкаф из прежних секций - по его группам"""
+        self.reappeared += 1
+        self.groups -= self._cabinet_groups[cabinet]
+        unique_rows = () if self._unique_rows is None else next(self._unique_rows.load(cabinet))
+        for groups in self._groups.load(cabinet):
+            self.parser.restore(cabinet, groups, unique_rows)
+
+    def _finish_cabinet(self, cabinet: str):
+        start = time.perf_counter()
+        merged = DataMerging.merge_cabinet(self.parser.cabinets_connections.get(cabinet, []))
+        self.cabinet_times[cabinet] = self.cabinet_times.get(cabinet, 0.0) + time.perf_counter() - start
+
+        terms_lines = self.parser.jumpers_to_lines[cabinet]
+        self._groups.replace(cabinet, list(render_groups(merged, terms_lines)))
+        if self._unique_rows is not None:
+            self._unique_rows.replace(cabinet, self.parser.unique_rows(cabinet))
+        self._cabinet_groups[cabinet] = len(merged)
+        self.groups += len(merged)
+        self.parser.release(cabinet)
@@ -0,0 +1,234 @@
+import os
+import re
+import sys
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from core.functions import SORT_KEY_CACHE, terminal_key
+from core.provenance import TermTable, pack_ref, render_ref
+
+_PARTS = re.compile(r'(\d+)')
+
+
+def split_device(text: str) -> Tuple[str, str]:
+    """'устройство[.разъем]' -> (устройство, разъем или ''); разъем - после последней точки"""
+    device, dot, connector = text.rpartition('.')
+    if not dot:
+        return connector, ''
+    return device, connector
+
+
+def split_pin(text: str) -> Tuple[str, str, str]:
+    """вывод выгрузки СВО 'XM1-001.XT2:4', 'XA009:A' -> (устройство, разъем или '', вывод)"""
+    node, colon, pin = text.rpartition(':')
+    if not colon or not node or not pin:
+        raise ValueError(f'не вывод устройства: {text!r}')
+    return (*split_device(node), pin)
+
+
+@lru_cache(maxsize=SORT_KEY_CACHE)
+def _natural(text: str) -> tuple:
+    """'XT10' -> ('XT', 10, ''): числа сравниваются как числа; имена разъемов и выводов повторяются"""
+    return tuple(int(part) if part.isdigit() else part for part in _PARTS.split(text))
+
+
+def pin_key(node: str):
+    """ключ сортировки выводов: устройство (как клеммы), разъем и вывод по числам"""
+    device, connector, pin = split_pin(node)
+    return terminal_key(device), _natural(connector), _natural(pin)
+
+
+class SvoLink(NamedTuple):
+    """строка выгрузки СВО: провод между двумя выводами и его происхождение"""
+    fr: str
+    to: str
+    num_file: int
+    num_line: int
+
+
+class SvoParser:
+    """выгрузка СВО: две колонки Откуда / Куда, без шкафа
+
+    Как и у DataParser, строка заголовка начинает следующую выгрузку
+    (num_file), строки нумеруются внутри нее.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.num_file = 0
+        self.num_line = 0
+
+    def iter_links(self) -> Iterator[SvoLink]:
+        sources = [self.source] if isinstance(self.source, (str, os.PathLike)) else self.source
+        for source in sources:
+            with open(source, encoding='utf-8') as rf:
+                for line in rf:
+                    link = self._process_line(source, line)
+                    if link is not None:
+                        yield link
+
+    def _process_line(self, source, line: str) -> Optional[SvoLink]:
+        line = line.strip()
+        if not line:
+            return None
+        if 'Откуда' in line:
+            self.num_line = 0
+            self.num_file += 1
+            return None
+        self.num_line += 1
+        fields = line.split('\t')
+        if len(fields) != 2:
+            raise ValueError(f'{source}: строка {self.num_line}: ожидается 2 колонки, а не {len(fields)}')
+        fr, to = fields
+        split_pin(fr)
+        split_pin(to)
+        return SvoLink(sys.intern(fr), sys.intern(to), self.num_file, self.num_line)
+
+
+class Net(NamedTuple):
+    """связная цепь: выводы по pin_key и провода (откуда, куда, 'файл_строка')"""
+    pins: Tuple[str, ...]
+    links: Tuple[Tuple[str, str, str], ...]
+
+
+class NetIndex:
+    """граф выводов всех устройств: вывод -> провода, на нем сходящиеся
+
+    Выводы хранятся целыми id (TermTable), провода - тремя массивами
+    (откуда, куда, упакованная ссылка). Трассировка - обход в ширину от
+    вывода: время пропорционально размеру найденной цепи, а не выгрузки.
+    Все цепи сразу (nets()) - один общий обход всех выводов.
+    """
+
+    def __init__(self):
+        self.pins = TermTable()
+        self.fr = array('I')
+        self.to = array('I')
+        self.refs = array('Q')
+        # id вывода -> номера проводов
+        self.adjacency: List[List[int]] = []
+        # устройство -> id его выводов
+        self.devices: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_source(cls, source) -> 'NetIndex':
+        index = cls()
+        for link in SvoParser(source).iter_links():
+            index.add(link.fr, link.to, pack_ref(link.num_file, link.num_line))
+        return index
+
+    def __len__(self):
+        return len(self.refs)
+
+    def __contains__(self, node):
+        return node in self.pins.ids
+
+    def _pin_id(self, node: str) -> int:
+        pin_id = self.pins.ids.get(node)
+        if pin_id is None:
+            pin_id = self.pins.intern(node)
+            self.adjacency.append([])
+            self.devices.setdefault(split_pin(node)[0], []).append(pin_id)
+        return pin_id
+
+    def add(self, fr: str, to: str, packed_ref: int = 0):
+        fr_id, to_id = self._pin_id(fr), self._pin_id(to)
+        link = len(self.refs)
+        self.fr.append(fr_id)
+        self.to.append(to_id)
+        self.refs.append(packed_ref)
+        self.adjacency[fr_id].append(link)
+        if to_id != fr_id:
+            self.adjacency[to_id].append(link)
+
+    def _component(self, start: int) -> Tuple[List[int], List[int]]:
+        """id выводов и номера проводов цепи, в которую входит вывод start"""
+        seen = {start}
+        pins = [start]
+        links = set()
+        queue = deque(pins)
+        fr, to, adjacency = self.fr, self.to, self.adjacency
+        while queue:
+            pin_id = queue.popleft()
+            for link in adjacency[pin_id]:
+                links.add(link)
+                other = to[link] if fr[link] == pin_id else fr[link]
+                if other not in seen:
+                    seen.add(other)
+                    pins.append(other)
+                    queue.append(other)
+        return pins, list(links)
+
+    def trace(self, node: str) -> List[str]:
+        """все выводы, достижимые от node по проводам (без него самого)"""
+        pin_id = self.pins.ids.get(node)
+        if pin_id is None:
+            raise KeyError(node)
+        names = self.pins.names
+        return sorted((names[i] for i in self._component(pin_id)[0][1:]), key=pin_key)
+
+    def device_pins(self, device: str, connector: Optional[str] = None) -> List[str]:
+        """выводы устройства (или одного его разъема) по pin_key"""
+        names = self.pins.names
+        nodes = (names[i] for i in self.devices.get(device, ()))
+        if connector is not None:
+            nodes = (node for node in nodes if split_pin(node)[1] == connector)
+        return sorted(nodes, key=pin_key)
+
+    def net(self, node: str) -> Net:
+        """цепь, в которую входит вывод node"""
+        pin_id = self.pins.ids.get(node)
+        if pin_id is None:
+            raise KeyError(node)
+        return self._net(*self._component(pin_id))
+
+    def _net(self, pins: List[int], links: List[int], key=None) -> Net:
+        names, fr, to, refs = self.pins.names, self.fr, self.to, self.refs
+        return Net(
+            tuple(names[i] for i in sorted(pins, key=key or (lambda i: pin_key(names[i])))),
+            tuple((names[fr[link]], names[to[link]], render_ref(refs[link])) for link in sorted(links)),
+        )
+
+    def nets(self) -> List[Net]:
+        """все цепи выгрузки, по первому выводу цепи
+
+        Выводы один раз сортируются общим списком (ранг вывода); обход
+        в ширину запускается от каждого еще не пройденного вывода в этом
+        порядке - цепи получаются сразу упорядоченными, а внутри цепи
+        сортируются уже целые ранги.
+        """
+        names, fr, to, adjacency = self.pins.names, self.fr, self.to, self.adjacency
+        order = sorted(range(len(names)), key=lambda i: pin_key(names[i]))
+        rank = array('I', bytes(4 * len(names)))
+        for position, pin_id in enumerate(order):
+            rank[pin_id] = position
+        seen = bytearray(len(names))
+        nets = []
+        for start in order:
+            if seen[start]:
+                continue
+            seen[start] = 1
+            pins = [start]
+            links = []
+            for pin_id in pins:
+                for link in adjacency[pin_id]:
+                    other = to[link] if fr[link] == pin_id else fr[link]
+                    # провод берется со стороны вывода с меньшим id (провод на себя - один раз)
+                    if other >= pin_id:
+                        links.append(link)
+                    if not seen[other]:
+                        seen[other] = 1
+                        pins.append(other)
+            nets.append(self._net(pins, links, rank.__getitem__))
+        return nets
+
+    def write_nets(self, out) -> int:
+        """цепи в текст: строка выводов цепи, затем провода с отступом; число цепей"""
+        nets = self.nets()
+        for number, net in enumerate(nets, 1):
+            out.write(f'{number}\t' + '\t'.join(net.pins) + '\n')
+            for fr, to, ref in net.links:
+                out.write(f'\t{fr}\t{to}\t{ref}\n')
+        return len(nets)
@@ -0,0 +1,62 @@
+from typing import Dict, Hashable, List
+
+
+class UnionFind:
+    """система непересекающихся множеств (disjoint-set) по именам клемм
+
+    Сжатие путей + объединение по рангу: почти линейное время
+    на всю последовательность операций find/union.
+    """
+    __slots__ = ('parent', 'rank')
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.rank: Dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __contains__(self, item):
+        return item in self.parent
+
+    def add(self, item: Hashable):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.rank[item] = 0
+
+    def find(self, item: Hashable) -> Hashable:
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.rank[item] = 0
+            return item
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        # сжатие пути: все пройденные узлы подвешиваем прямо к корню
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, first: Hashable, second: Hashable) -> Hashable:
+        first_root = self.find(first)
+        second_root = self.find(second)
+        if first_root == second_root:
+            return first_root
+        rank = self.rank
+        if rank[first_root] < rank[second_root]:
+            first_root, second_root = second_root, first_root
+        self.parent[second_root] = first_root
+        if rank[first_root] == rank[second_root]:
+            rank[first_root] += 1
+        return first_root
+
+    def connected(self, first: Hashable, second: Hashable) -> bool:
+        return self.find(first) == self.find(second)
+
+    def groups(self) -> Dict[Hashable, List[Hashable]]:
+        """корень -> элементы множества в порядке добавления"""
+        result: Dict[Hashable, List[Hashable]] = {}
+        for item in self.parent:
+            result.setdefault(self.find(item), []).append(item)
+        return result
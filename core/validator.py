@@ -0,0 +1,144 @@
+import json
+import re
+from collections import Counter
+from typing import Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from core.functions import sorting_key
+from core.union_find import UnionFind
+
+# кириллические буквы, которые в именах клемм выглядят как латинские
+LOOKALIKES = str.maketrans('АВЕКМНОРСТХаеорсух', 'ABEKMHOPCTXaeopcyx')
+_CYRILLIC = re.compile('[\u0400-\u04ff]')
+
+CHECKS = ('malformed', 'self_loop', 'cyrillic', 'fan_out', 'mixed_signals')
+
+
+class Finding(NamedTuple):
+    """одно замечание проверки"""
+    check: str
+    cabinet: str
+    terminals: Tuple[str, ...]
+    detail: str
+    refs: Tuple[str, ...] = ()
+
+
+def _row_refs(row) -> Tuple[str]:
+    return (f'{row.num_file}_{row.num_line}',)
+
+
+class _CabinetChecks:
+    """состояние проверки одного шкафа"""
+    __slots__ = ('terminals', 'degree', 'edges', 'row_terms', 'row_signals')
+
+    def __init__(self):
+        self.terminals = UnionFind()
+        self.degree: Counter = Counter()
+        # уже учтенные в degree перемычки (сигнал, откуда, куда)
+        self.edges: Set[Tuple[str, Optional[str], Optional[str]]] = set()
+        # клемма и сигнал каждой строки - сигналы групп собираются в finish()
+        self.row_terms: List[str] = []
+        self.row_signals: List[str] = []
+
+
+class WiringValidator:
+    """проверка монтажа за один проход по строкам выгрузки
+
+    Строки приходят из DataParser (check_row / malformed), все проверки
+    считаются по индексам, без печати и пауз:
+    - malformed - строка не из 3-4 колонок или число колонок не как у заголовка
+    - self_loop - перемычка с клеммы на саму себя
+    - cyrillic - кириллица в имени клеммы (каждое имя проверяется один раз)
+    - fan_out - на клемму приходит больше двух разных перемычек ("3 на 2")
+    - mixed_signals - в одной группе связности разные сигналы
+    """
+
+    def __init__(self, max_degree: int = 2):
+        self.max_degree = max_degree
+        self.findings: List[Finding] = []
+        self._cabinets: Dict[str, _CabinetChecks] = {}
+        self._names: Dict[str, Optional[str]] = {}
+
+    def check_row(self, row):
+        state = self._cabinets.get(row.cabinet)
+        if state is None:
+            state = self._cabinets[row.cabinet] = _CabinetChecks()
+        terms = [term for term in (row.fr, row.to) if term]
+        if not terms:
+            self.findings.append(Finding('malformed', row.cabinet, (), 'строка без клемм', _row_refs(row)))
+            return
+        if len(terms) == 2 and terms[0] == terms[1]:
+            self.findings.append(Finding('self_loop', row.cabinet, (terms[0],), 'перемычка на ту же клемму',
+                                         _row_refs(row)))
+            del terms[1]
+
+        # повтор той же перемычки (склеенные выгрузки) не добавляет клемме связей
+        edge = (row.signal, row.fr, row.to)
+        repeated = edge in state.edges
+        state.edges.add(edge)
+        for term in terms:
+            if not repeated:
+                state.degree[term] += 1
+            cyrillic = self._cyrillic(term)
+            if cyrillic is not None:
+                self.findings.append(Finding('cyrillic', row.cabinet, (term,), cyrillic, _row_refs(row)))
+        state.terminals.add(terms[0])
+        if len(terms) == 2:
+            state.terminals.union(terms[0], terms[1])
+            # сигнал несут только перемычки; строки с одной клеммой (out) его не задают
+            state.row_terms.append(terms[0])
+            state.row_signals.append(row.signal)
+
+    def malformed(self, num_file: int, num_line: int, line: str, expected: Optional[int] = None):
+        cabinet = line.split('\t', 1)[0]
+        detail = f'колонок: {line.count(chr(9)) + 1}'
+        if expected:
+            detail += f', в заголовке: {expected}'
+        self.findings.append(Finding('malformed', cabinet, (), detail, (f'{num_file}_{num_line}',)))
+
+    def _cyrillic(self, term: str) -> Optional[str]:
+        """описание замечания для имени клеммы или None; результат кэшируется по имени"""
+        if term in self._names:
+            return self._names[term]
+        detail = None
+        letters = _CYRILLIC.findall(term)
+        if letters:
+            latin = term.translate(LOOKALIKES)
+            detail = f'кириллица: {"".join(letters)}'
+            if not _CYRILLIC.search(latin):
+                detail += f', вероятно {latin}'
+        self._names[term] = detail
+        return detail
+
+    def finish(self, provenance: Optional[Mapping[str, Mapping[str, List[str]]]] = None) -> List[Finding]:
+        """проверки по группам связности; provenance - ссылки для клемм с fan_out"""
+        for cabinet, state in self._cabinets.items():
+            refs = provenance.get(cabinet, {}) if provenance is not None else {}
+            for term, degree in state.degree.items():
+                if degree > self.max_degree:
+                    self.findings.append(Finding('fan_out', cabinet, (term,), f'перемычек на клемму: {degree}',
+                                                 tuple(refs.get(term, ()))))
+
+            find = state.terminals.find
+            signals: Dict[str, set] = {}
+            for term, signal in zip(state.row_terms, state.row_signals):
+                signals.setdefault(find(term), set()).add(signal)
+            mixed = {root for root, group_signals in signals.items() if len(group_signals) > 1}
+            if mixed:
+                for root, terms in state.terminals.groups().items():
+                    if root in mixed:
+                        self.findings.append(Finding(
+                            'mixed_signals', cabinet, tuple(sorted(terms, key=sorting_key)),
+                            f'сигналы: {", ".join(sorted(signals[root]))}'))
+        self._cabinets.clear()
+        return self.findings
+
+    def summary(self) -> Dict[str, int]:
+        counts = Counter(finding.check for finding in self.findings)
+        return {check: counts[check] for check in CHECKS}
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'summary': self.summary(),
+                'findings': [finding._asdict() for finding in self.findings],
+            }, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,438 @@
+import os
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from core.connection import Connection
+from core.data_parser import DataParser
+from core.data_writer import cabinet_number, render_groups
+from core.provenance import pack_ref, render_ref
+from core.rendering import format_cabinet, format_of
+from core.xlsx_reader import iter_xlsx_lines
+
+# строка шкафа в памяти демона: сигнал, откуда, куда
+CabinetRow = Tuple[str, str, Optional[str]]
+# источники сравниваются блоками такого размера
+COMPARE_BLOCK = 1 << 16
+
+
+class ConnectivityGraph:
+    """группы клемм шкафа, которые обновляются по одной перемычке
+
+    Перемычки хранятся мультимножеством (одинаковые строки считаются).
+    Новая перемычка сливает две группы (меньшая перекрашивается в большую),
+    удаление последней копии перемычки запускает обход в ширину по
+    оставшимся перемычкам группы: если конец не достижим - группа
+    делится. Работа пропорциональна размеру затронутой группы.
+    """
+
+    def __init__(self):
+        # клемма -> соседняя клемма -> число перемычек между ними
+        self.adjacency: Dict[str, Counter] = {}
+        # клемма -> число строк с этой клеммой
+        self.uses: Counter = Counter()
+        # клемма -> номер группы; номер группы -> клеммы
+        self.group_of: Dict[str, int] = {}
+        self.groups: Dict[int, Set[str]] = {}
+        # строки без клемм: каждая - отдельная пустая группа
+        self.empty = 0
+        self._next_group = 0
+
+    def _new_group(self, terms: Set[str]) -> int:
+        group = self._next_group
+        self._next_group += 1
+        self.groups[group] = terms
+        for term in terms:
+            self.group_of[term] = group
+        return group
+
+    def add(self, fr: Optional[str], to: Optional[str]):
+        terms = [term for term in (fr, to) if term]
+        if not terms:
+            self.empty += 1
+            return
+        for term in terms:
+            self.uses[term] += 1
+            if term not in self.group_of:
+                self.adjacency[term] = Counter()
+                self._new_group({term})
+        if len(terms) < 2 or fr == to:
+            return
+        self.adjacency[fr][to] += 1
+        self.adjacency[to][fr] += 1
+        first, second = self.group_of[fr], self.group_of[to]
+        if first != second:
+            if len(self.groups[first]) < len(self.groups[second]):
+                first, second = second, first
+            moved = self.groups.pop(second)
+            for term in moved:
+                self.group_of[term] = first
+            self.groups[first] |= moved
+
+    def remove(self, fr: Optional[str], to: Optional[str]):
+        terms = [term for term in (fr, to) if term]
+        if not terms:
+            self.empty -= 1
+            return
+        split = False
+        if len(terms) == 2 and fr != to:
+            adjacency = self.adjacency
+            adjacency[fr][to] -= 1
+            adjacency[to][fr] -= 1
+            if not adjacency[fr][to]:
+                del adjacency[fr][to]
+                del adjacency[to][fr]
+                split = True
+        for term in terms:
+            self.uses[term] -= 1
+            if not self.uses[term]:
+                # строк с клеммой не осталось - перемычек с ней тоже
+                del self.uses[term]
+                del self.adjacency[term]
+                group = self.group_of.pop(term)
+                self.groups[group].discard(term)
+                if not self.groups[group]:
+                    del self.groups[group]
+        if split and fr in self.group_of and to in self.group_of:
+            self._split(fr, to)
+
+    def _split(self, fr: str, to: str):
+        """отделить часть группы, в которой осталась клемма fr, если to из нее не достижима"""
+        seen = {fr}
+        queue = deque(seen)
+        adjacency = self.adjacency
+        while queue:
+            term = queue.popleft()
+            for other in adjacency[term]:
+                if other == to:
+                    return
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        group = self.group_of[fr]
+        self.groups[group] -= seen
+        self._new_group(seen)
+
+    def term_groups(self) -> List[Set[str]]:
+        return list(self.groups.values())
+
+
+def common_prefix(old: bytes, new: bytes) -> int:
+    """длина общего начала: блоки сравниваются целиком, байты - только в первом различном"""
+    limit = min(len(old), len(new))
+    size = 0
+    while size < limit and old[size:size + COMPARE_BLOCK] == new[size:size + COMPARE_BLOCK]:
+        size += COMPARE_BLOCK
+    end = min(size + COMPARE_BLOCK, limit)
+    while size < end and old[size] == new[size]:
+        size += 1
+    return min(size, limit)
+
+
+def common_suffix(old: bytes, new: bytes, limit: int) -> int:
+    """длина общего конца, не больше limit (чтобы не заходить в общее начало)"""
+    size = 0
+    while size < limit:
+        step = min(COMPARE_BLOCK, limit - size)
+        if old[len(old) - size - step:len(old) - size] != new[len(new) - size - step:len(new) - size]:
+            break
+        size += step
+    while size < limit and old[len(old) - size - 1] == new[len(new) - size - 1]:
+        size += 1
+    return size
+
+
+class Section:
+    """кусок источника: заголовок выгрузки или подряд идущие строки одного шкафа
+
+    Пустые строки входят в кусок, но не нумеруются. Номера строк не
+    хранятся: у rows[i] ссылка (num_file, line_offset + i + 1), num_file
+    и line_offset проставляет ExportWatcher после каждого разбора - сдвиг
+    строк ниже правки меняет только их.
+    """
+    __slots__ = ('cabinet', 'header', 'size', 'rows', 'num_file', 'line_offset')
+
+    def __init__(self, cabinet: Optional[str] = None, header: bool = False):
+        self.cabinet = cabinet
+        self.header = header
+        # длина куска в байтах источника
+        self.size = 0
+        self.rows: List[CabinetRow] = []
+        self.num_file = 0
+        self.line_offset = 0
+
+
+def parse_sections(data: bytes) -> List[Section]:
+    """разбор части источника (с начала строки) на заголовки и куски шкафов"""
+    parser = DataParser()
+    sections: List[Section] = []
+    section = None
+    for line in data.splitlines(keepends=True):
+        files = parser.num_file
+        row = parser.parse_line(line.decode('utf-8'))
+        if parser.num_file != files:
+            section = Section(header=True)
+            sections.append(section)
+        elif row is not None and (section is None or section.cabinet != row.cabinet):
+            section = Section(row.cabinet)
+            sections.append(section)
+        elif section is None:
+            # пустые строки в начале файла
+            section = Section()
+            sections.append(section)
+        if row is not None:
+            section.rows.append(row[1:4])
+        section.size += len(line)
+    return sections
+
+
+class SourceFile:
+    """файл выгрузки в памяти демона: прежнее содержимое и его куски"""
+    __slots__ = ('path', 'data', 'sections')
+
+    def __init__(self, path):
+        self.path = path
+        self.data = b''
+        self.sections: List[Section] = []
+
+    def read(self) -> bytes:
+        if os.fspath(self.path).lower().endswith('.xlsx'):
+            # книга читается в текст TSV, дальше - как обычная выгрузка
+            return ''.join(f'{line}\n' for line in iter_xlsx_lines(self.path)).encode()
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def update(self) -> Tuple[List[Section], List[Section]]:
+        """перечитать файл, разобрать заново только куски с изменением: (прежние куски, новые)
+
+        Изменение - байты между общим началом и общим концом старого и
+        нового содержимого. Разбираются задетые им куски и соседние (строка,
+        дописанная к шкафу, попадает в его кусок), остальные остаются как есть.
+        """
+        data, old = self.read(), self.data
+        if data == old:
+            return [], []
+        prefix = common_prefix(old, data)
+        suffix = common_suffix(old, data, min(len(old), len(data)) - prefix)
+        sections = self.sections
+        starts = list(accumulate((section.size for section in sections), initial=0))
+        first = max(bisect_right(starts, max(prefix - 1, 0)) - 1, 0)
+        last = min(bisect_right(starts, len(old) - suffix), len(sections))
+        added = parse_sections(data[starts[first]:starts[last] + len(data) - len(old)])
+        removed = sections[first:last]
+        sections[first:last] = added
+        self.data = data
+        return removed, added
+
+
+class CabinetState:
+    """шкаф в памяти демона: его строки, связность клемм и готовый текст для result.txt
+
+    groups - группы в порядке вывода, у клемм вместо ссылок номера строк
+    шкафа; при сдвиге номеров строк текст собирается из них заново без
+    слияния и сортировки.
+    """
+    __slots__ = ('cabinet', 'rows', 'graph', 'groups', 'numbering', 'text')
+
+    def __init__(self, cabinet: str):
+        self.cabinet = cabinet
+        self.rows: List[CabinetRow] = []
+        self.graph = ConnectivityGraph()
+        self.groups: List[Tuple[Tuple[str, ...], List[List[int]], str]] = []
+        # (файл, смещение, строк) кусков шкафа, по которым собран text
+        self.numbering: Optional[Tuple] = None
+        self.text = ''
+
+    def update(self, rows: List[CabinetRow]) -> Tuple[int, int]:
+        """перейти к новым строкам шкафа; в граф идут только добавленные и удаленные перемычки"""
+        old = Counter((row[1], row[2]) for row in self.rows)
+        new = Counter((row[1], row[2]) for row in rows)
+        removed, added = old - new, new - old
+        for (fr, to), count in removed.items():
+            for _ in range(count):
+                self.graph.remove(fr, to)
+        for (fr, to), count in added.items():
+            for _ in range(count):
+                self.graph.add(fr, to)
+        self.rows = rows
+        self.groups = self.layout()
+        self.numbering = None
+        return sum(added.values()), sum(removed.values())
+
+    def layout(self) -> List[Tuple[Tuple[str, ...], List[List[int]], str]]:
+        """группы графа через render_groups, как у DataWriter; ссылки - номера строк шкафа"""
+        positions: Dict[str, List[int]] = {}
+        for index, (_, fr, to) in enumerate(self.rows):
+            for term in (fr, to):
+                if term:
+                    positions.setdefault(term, []).append(index)
+        jumpers = [Connection(self.cabinet, '', *terms) for terms in self.graph.term_groups()]
+        jumpers.extend(Connection(self.cabinet, '') for _ in range(self.graph.empty))
+        return list(render_groups(jumpers, positions))
+
+    def refresh(self, sections: Iterable[Section]) -> bool:
+        """пересобрать текст, если изменились группы или номера строк кусков шкафа"""
+        sections = list(sections)
+        numbering = tuple((section.num_file, section.line_offset, len(section.rows)) for section in sections)
+        if numbering == self.numbering:
+            return False
+        refs = [render_ref(pack_ref(section.num_file, section.line_offset + number))
+                for section in sections for number in range(1, len(section.rows) + 1)]
+        self.text = format_cabinet(self.cabinet, (
+            (terms, [[refs[index] for index in indexes] for indexes in positions], remark)
+            for terms, positions, remark in self.groups))
+        self.numbering = numbering
+        return True
+
+
+class WatchUpdate(NamedTuple):
+    """одно обновление демона: шкафы с измененными строками, перемычки +/-, время
+    и шкафы, у которых сдвинулись только номера строк (текст пересобран без слияния)"""
+    cabinets: Tuple[str, ...]
+    added: int
+    removed: int
+    seconds: float
+    shifted: Tuple[str, ...] = ()
+
+
+class ExportWatcher:
+    """демон: держит выгрузку в памяти и обновляет result.txt по изменениям источника
+
+    Источник проверяется опросом (mtime и размер). При изменении файл
+    читается байтами и сравнивается с прежним; разбираются заново только
+    куски (заголовки и подряд идущие строки шкафа) между общим началом и
+    общим концом. У шкафов из этих кусков в граф связности идут только
+    разница перемычек. Ссылки 'файл_строка' входят в результат: вставка
+    строки сдвигает номера строк ниже, такие шкафы получают новые номера
+    одним проходом по кускам и пересобирают только текст. Файл результата
+    переписывается на месте с первого изменившегося шкафа.
+    """
+
+    def __init__(self, source, target: str, interval: float = 1.0):
+        if format_of(target) != 'txt':
+            raise ValueError('демон пишет только result.txt (другие форматы нельзя обновить на месте)')
+        self.source = source
+        self.target = target
+        self.interval = interval
+        self.files = [SourceFile(path) for path in self._sources()]
+        self.cabinets: Dict[str, CabinetState] = {}
+        # шкафы в порядке вывода и смещения их текста в файле результата (байты, последнее - конец)
+        self.order: List[str] = []
+        self.offsets: List[int] = [0]
+        # файл результата уже записан этим демоном
+        self._written = False
+        self._signature = None
+
+    def _sources(self) -> List[str]:
+        return [self.source] if isinstance(self.source, (str, os.PathLike)) else list(self.source)
+
+    def signature(self) -> Tuple:
+        """(mtime, размер) всех источников - признак изменения для опроса"""
+        signature = []
+        for source in self._sources():
+            info = os.stat(source)
+            signature.append((info.st_mtime_ns, info.st_size))
+        return tuple(signature)
+
+    def _sections(self) -> Dict[str, List[Section]]:
+        """номера строк кусков и куски каждого шкафа - один проход по кускам, без строк"""
+        cabinets: Dict[str, List[Section]] = {}
+        num_file = line = 0
+        for source in self.files:
+            for section in source.sections:
+                if section.header:
+                    num_file += 1
+                    line = 0
+                    continue
+                section.num_file, section.line_offset = num_file, line
+                line += len(section.rows)
+                if section.cabinet is not None:
+                    cabinets.setdefault(section.cabinet, []).append(section)
+        return cabinets
+
+    def update(self) -> WatchUpdate:
+        """перечитать источник, пересчитать изменившиеся шкафы и дописать результат"""
+        start = time.perf_counter()
+        self._signature = self.signature()
+        touched: Set[str] = set()
+        for source in self.files:
+            old, new = source.update()
+            touched.update(section.cabinet for section in old + new if section.cabinet is not None)
+        cabinets = self._sections()
+        changed: List[str] = []
+        shifted: List[str] = []
+        added = removed = 0
+        for cabinet, sections in cabinets.items():
+            state = self.cabinets.get(cabinet)
+            if state is None:
+                state = self.cabinets[cabinet] = CabinetState(cabinet)
+            if cabinet in touched:
+                rows = [row for section in sections for row in section.rows]
+                if rows != state.rows:
+                    plus, minus = state.update(rows)
+                    added += plus
+                    removed += minus
+                    changed.append(cabinet)
+                    state.refresh(sections)
+                    continue
+            if state.refresh(sections):
+                shifted.append(cabinet)
+        for cabinet in [cabinet for cabinet in self.cabinets if cabinet not in cabinets]:
+            removed += len(self.cabinets.pop(cabinet).rows)
+            changed.append(cabinet)
+        order = sorted(cabinets, key=cabinet_number)
+        self._write(order, set(changed) | set(shifted))
+        return WatchUpdate(tuple(changed), added, removed, time.perf_counter() - start, tuple(shifted))
+
+    def _write(self, order: List[str], changed: Set[str]):
+        """переписать результат с первого шкафа, у которого изменился текст или место"""
+        first, old = 0, self.order
+        while first < min(len(order), len(old)) and order[first] == old[first] and order[first] not in changed:
+            first += 1
+        # чужой файл результата (от прежнего запуска) переписывается целиком
+        written = self._written and os.path.exists(self.target)
+        if first == len(order) == len(old) and written:
+            return
+        if not written:
+            first = 0
+        offsets = self.offsets[:first + 1]
+        blocks = []
+        for cabinet in order[first:]:
+            block = self.cabinets[cabinet].text.encode()
+            blocks.append(block)
+            offsets.append(offsets[-1] + len(block))
+        with open(self.target, 'r+b' if first else 'wb') as f:
+            f.seek(offsets[first])
+            f.write(b''.join(blocks))
+            f.truncate()
+        self._written = True
+        self.order = order
+        self.offsets = offsets
+
+    def changed(self) -> bool:
+        return self.signature() != self._signature
+
+    def watch(self, on_update: Optional[Callable[[WatchUpdate], None]] = None,
+              polls: Optional[int] = None, should_stop: Callable[[], bool] = lambda: False):
+        """первый полный расчет, затем опрос источника каждые interval секунд
+
+        polls - сколько опросов сделать (None - пока should_stop() не вернет True).
+        """
+        update = self.update()
+        if on_update is not None:
+            on_update(update)
+        done = 0
+        while (polls is None or done < polls) and not should_stop():
+            time.sleep(self.interval)
+            done += 1
+            try:
+                if not self.changed():
+                    continue
+            except FileNotFoundError:
+                # редактор может заменять файл через удаление и создание
+                continue
+            update = self.update()
+            if on_update is not None:
+                on_update(update)
@@ -0,0 +1,268 @@
+import io
+import posixpath
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_SI = f'{_MAIN}si'
+
+# лист читается из zip кусками такого размера
+READ_CHUNK = 1 << 18
+# строка или ячейка листа в разметке Excel: <c r="B7" s="3" t="s"><v>12</v></c>;
+# для <row у найденного кортежа пустые все группы
+_FAST_TOKEN = re.compile(
+    r'<row\b|<c r="([A-Z]{1,3})\d+"(?: s="\d+")?(?: t="([sn])")?(?: s="\d+")?\s*(?:/>|>(?:<v>([^<&]*)</v>)?</c>)')
+
+# колонки выгрузки по началу заголовка; порядок - как в TSV (Шкаф / Сигнал / Откуда / Куда)
+COLUMNS = (
+    ('Шкаф',),
+    ('Обозначение провода', 'Сигнал'),
+    ('Откуда',),
+    ('Куда',),
+)
+# заголовок, который получает DataParser вместо строки заголовка листа
+HEADER = 'Шкаф\tОбозначение провода\tОткуда идет\tКуда поступает'
+
+_DIGITS = '0123456789'
+_COLUMN_INDEX: Dict[str, int] = {}
+
+
+def column_index(reference: str) -> int:
+    """адрес ячейки -> номер колонки с 0 ('C7' -> 2)"""
+    letters = reference.rstrip(_DIGITS)
+    index = _COLUMN_INDEX.get(letters)
+    if index is None:
+        index = 0
+        for letter in letters:
+            index = index * 26 + ord(letter) - 64
+        index = _COLUMN_INDEX[letters] = index - 1
+    return index
+
+
+def _text(element) -> str:
+    """текст <si>: простой <t> или несколько <r><t> с форматированием"""
+    return ''.join(t.text or '' for t in element.iter(f'{_MAIN}t'))
+
+
+def read_shared_strings(book: zipfile.ZipFile) -> List[str]:
+    try:
+        source = book.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with source:
+        for _, element in iterparse(source):
+            if element.tag == _SI:
+                strings.append(_text(element))
+                element.clear()
+    return strings
+
+
+def worksheets(book: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(имя листа, путь в архиве) в порядке листов книги"""
+    with book.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for _, rel in iterparse(f) if rel.tag == f'{_PKG_REL}Relationship'
+        }
+    sheets = []
+    with book.open('xl/workbook.xml') as f:
+        for _, element in iterparse(f):
+            if element.tag == f'{_MAIN}sheet':
+                target = targets[element.get(f'{_REL}id')]
+                path = target.lstrip('/') if target.startswith('/') else posixpath.join('xl', target)
+                sheets.append((element.get('name'), posixpath.normpath(path)))
+    return sheets
+
+
+class _SheetHandler:
+    """обработчики expat для листа: значения ячеек каждой строки по колонкам
+
+    Пространства имен expat не разбирает (так заметно быстрее): префикс
+    элементов ('' или, например, 'x:') берется из корневого <worksheet>.
+    """
+    __slots__ = ('strings', 'rows', 'values', 'kind', 'column', 'parts', 'capture',
+                 'row_tag', 'cell_tag', 'value_tag', 'text_tag')
+
+    def __init__(self, strings: List[str]):
+        self.strings = strings
+        # строки, разобранные с последнего куска XML
+        self.rows: List[List[str]] = []
+        self.values: List[str] = []
+        self.kind: Optional[str] = None
+        self.column = 0
+        self.parts: List[str] = []
+        self.capture = False
+        self.row_tag = self.cell_tag = self.value_tag = self.text_tag = None
+
+    def start(self, name: str, attrs: Dict[str, str]):
+        if name == self.cell_tag:
+            self.kind = attrs.get('t')
+            reference = attrs.get('r')
+            self.column = column_index(reference) if reference else len(self.values)
+            self.parts = []
+        elif name == self.value_tag or name == self.text_tag:
+            self.capture = True
+        elif name == self.row_tag:
+            self.values = []
+        elif self.row_tag is None:
+            prefix = name[:-len('worksheet')] if name.endswith('worksheet') else ''
+            self.row_tag, self.cell_tag, self.value_tag, self.text_tag = (
+                f'{prefix}{tag}' for tag in ('row', 'c', 'v', 't'))
+
+    def data(self, text: str):
+        if self.capture:
+            self.parts.append(text)
+
+    def end(self, name: str):
+        if name == self.value_tag or name == self.text_tag:
+            self.capture = False
+        elif name == self.cell_tag:
+            if not self.parts:
+                return
+            value = ''.join(self.parts)
+            if self.kind == 's':
+                value = self.strings[int(value)]
+            values = self.values
+            if self.column >= len(values):
+                values.extend([''] * (self.column + 1 - len(values)))
+            values[self.column] = value
+        elif name == self.row_tag:
+            self.rows.append(self.values)
+
+
+def _expat_sheet_rows(book: zipfile.ZipFile, path: str, strings: List[str]) -> Iterator[List[str]]:
+    """любой лист: потоковый разбор по кускам READ_CHUNK парсером expat
+
+    Тот же парсер, что под iterparse, но без построения дерева элементов
+    и очереди событий - память не зависит от размера листа.
+    """
+    handler = _SheetHandler(strings)
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.data
+    rows = handler.rows
+    with book.open(path) as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            parser.Parse(chunk, not chunk)
+            yield from rows
+            rows.clear()
+            if not chunk:
+                break
+
+
+def _fast_sheet_rows(book: zipfile.ZipFile, path: str, strings: List[str]) -> Iterator[Optional[List[str]]]:
+    """лист в разметке Excel: ячейки кусков XML разбираются одним регулярным выражением
+
+    Каждый кусок до последнего </row> сверяется: число найденных строк и
+    ячеек должно совпасть с числом тегов <row и <c в куске. Иначе (префиксы
+    пространств имен, формулы, inline-строки, другие атрибуты) отдается None -
+    дальше лист читает expat.
+    """
+    with book.open(path) as f, io.TextIOWrapper(f, encoding='utf-8') as text:
+        rest = ''
+        checked = False
+        while True:
+            chunk = text.read(READ_CHUNK)
+            buffer = rest + chunk
+            end = buffer.rfind('</row>') + len('</row>') if chunk else len(buffer)
+            if end < len('</row>'):
+                rest = buffer
+                continue
+            if not checked:
+                checked = True
+                if '<sheetData' not in buffer:
+                    yield None
+                    return
+            tokens = _FAST_TOKEN.findall(buffer, 0, end)
+            expected = buffer.count('<c ', 0, end) + buffer.count('<row ', 0, end) + buffer.count('<row>', 0, end)
+            if len(tokens) != expected:
+                yield None
+                return
+            values = None
+            for letters, kind, value in tokens:
+                if not letters:
+                    if values is not None:
+                        yield values
+                    values = []
+                    continue
+                if not value:
+                    continue
+                if kind == 's':
+                    value = strings[int(value)]
+                column = _COLUMN_INDEX.get(letters)
+                if column is None:
+                    column = column_index(letters)
+                if column > len(values):
+                    values.extend([''] * (column - len(values)))
+                values.append(value)
+            if values is not None:
+                yield values
+            rest = buffer[end:]
+            if not chunk:
+                return
+
+
+def iter_sheet_rows(book: zipfile.ZipFile, path: str, strings: List[str]) -> Iterator[List[str]]:
+    """строки листа как списки значений по колонкам (пропуски - '')
+
+    Сначала быстрый разбор (_fast_sheet_rows); если разметка листа ему
+    не подходит, лист дочитывается expat с той же строки.
+    """
+    done = 0
+    for values in _fast_sheet_rows(book, path, strings):
+        if values is None:
+            break
+        done += 1
+        yield values
+    else:
+        return
+    for number, values in enumerate(_expat_sheet_rows(book, path, strings)):
+        if number >= done:
+            yield values
+
+
+def header_columns(values: List[str]) -> Optional[List[int]]:
+    """номера колонок Шкаф / Сигнал / Откуда / Куда в строке заголовка или None"""
+    names = [value.strip() for value in values]
+    columns = []
+    for prefixes in COLUMNS:
+        found = [i for i, name in enumerate(names) if name.startswith(prefixes)]
+        if not found:
+            return None
+        columns.append(found[0])
+    return columns
+
+
+def iter_xlsx_lines(source) -> Iterator[str]:
+    """книга .xlsx как строки TSV для DataParser
+
+    Каждый лист с заголовком Шкаф / Обозначение провода / Откуда / Куда
+    отдается как отдельная выгрузка: строка заголовка, затем строки
+    из четырех колонок по именам заголовка (прочие колонки пропускаются).
+    Строки до заголовка и листы без него пропускаются.
+    """
+    found = False
+    with zipfile.ZipFile(source) as book:
+        strings = read_shared_strings(book)
+        for _, path in worksheets(book):
+            columns = None
+            for values in iter_sheet_rows(book, path, strings):
+                if columns is None:
+                    columns = header_columns(values)
+                    if columns is not None:
+                        found = True
+                        yield HEADER
+                    continue
+                width = len(values)
+                yield '\t'.join(values[i] if i < width else '' for i in columns)
+    if not found:
+        raise ValueError(f'{source}: нет листа с колонками {" / ".join(p[0] for p in COLUMNS)}')
@@ -0,0 +1,240 @@
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+# группа: клеммы, ссылки каждой клеммы, замечание
+Group = Tuple[Sequence[str], Sequence[Sequence[str]], str]
+
+MAX_ROWS = 1_048_576
+# строки листа копятся и отдаются в zip пачками
+FLUSH_ROWS = 1_000
+
+STYLE_DEFAULT, STYLE_TERMS, STYLE_REFS = 0, 1, 2
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_SHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+_SHEET_HEAD = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+_SHEET_TAIL = '</sheetData></worksheet>'
+_HIDDEN = ' state="hidden"'
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="left"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" applyAlignment="1">'
+    '<alignment horizontal="right"/></xf></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def column_letter(index: int) -> str:
+    """номер колонки с 1 -> буквы Excel (1 -> A, 27 -> AA)"""
+    letters = ''
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _cell(address: str, value: str, style: int) -> str:
+    style_attr = f' s="{style}"' if style else ''
+    # имена клемм и ссылки почти никогда не требуют экранирования
+    if '&' in value or '<' in value or '>' in value:
+        value = escape(value)
+    return f'<c r="{address}" t="inlineStr"{style_attr}><is><t>{value}</t></is></c>'
+
+
+def related_cells(refs: Sequence[Sequence[str]], columns: Sequence[str], row: int) -> Iterator[Tuple[int, str]]:
+    """для ячеек строки ссылок - адреса ячеек той же строки с общими ссылками
+
+    Результат для ячейки: по каждой ее ссылке (в порядке ссылок) адреса через ',',
+    ссылки разделены ';'. Так макрос красит связанные ячейки без поиска по тексту.
+    """
+    columns_by_ref: Dict[str, List[int]] = {}
+    for position, cell_refs in enumerate(refs):
+        for ref in cell_refs:
+            columns_by_ref.setdefault(ref, []).append(position)
+    for position, cell_refs in enumerate(refs):
+        parts = [
+            ','.join(f'{columns[other]}{row}' for other in columns_by_ref[ref] if other != position)
+            for ref in cell_refs
+        ]
+        if any(parts):
+            yield position, ';'.join(parts)
+
+
+class XlsxWriter:
+    """потоковая запись результата в .xlsx только стандартной библиотекой
+
+    Лист результата пишется прямо в zip-запись, строки не копятся в памяти.
+    Раскладка как в result.txt: строка шкафа, затем на каждую группу строка
+    клемм (колонки B...) и строка ссылок с замечанием. Рядом - скрытый лист
+    '<лист>_links': в тех же адресах, что и ячейки ссылок, лежат адреса
+    связанных ячеек (см. related_cells). Больше MAX_ROWS строк - продолжение
+    на листах 'result2', 'result3', ...
+    """
+
+    def __init__(self, fileobj: BinaryIO, sheet_name: str = 'result', max_rows: int = MAX_ROWS):
+        self.zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        self.sheet_name = sheet_name
+        self.max_rows = max_rows
+        self.sheets: List[str] = []
+        self.rows_written = 0
+        self._columns: List[str] = ['']
+        self._sheet = None
+        self._links = None
+        self._row = 0
+        self._buffer: List[str] = []
+        self._links_buffer: List[str] = []
+
+    def write_groups(self, cabinets: Iterable[Tuple[str, Iterable[Group]]]):
+        for cabinet, groups in cabinets:
+            self._ensure_rows(1)
+            self._write_row([cabinet], STYLE_DEFAULT, first_column=1)
+            for terms, refs, remark in groups:
+                if self._ensure_rows(2):
+                    # продолжение шкафа на новом листе
+                    self._write_row([cabinet], STYLE_DEFAULT, first_column=1)
+                self._write_row(terms, STYLE_TERMS)
+                refs_row = self._write_row([', '.join(cell_refs) for cell_refs in refs] + ([remark] if remark else []),
+                                           STYLE_REFS)
+                self._write_links(refs, refs_row)
+
+    def close(self):
+        if self._sheet is None and not self.sheets:
+            self._open_sheet()
+        self._close_sheet()
+        self._write_package()
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.zip.close()
+
+    def _column(self, index: int) -> str:
+        while len(self._columns) <= index:
+            self._columns.append(column_letter(len(self._columns)))
+        return self._columns[index]
+
+    def _ensure_rows(self, count: int) -> bool:
+        """открыть новый лист, если на текущем не хватает места; True - лист сменился"""
+        if self._sheet is not None and self._row + count <= self.max_rows:
+            return False
+        self._close_sheet()
+        self._open_sheet()
+        return len(self.sheets) > 1
+
+    def _write_row(self, values: Sequence[str], style: int, first_column: int = 2) -> int:
+        self._row += 1
+        self.rows_written += 1
+        row = self._row
+        cells = ''.join(_cell(f'{self._column(column)}{row}', value, style)
+                        for column, value in enumerate(values, first_column))
+        self._buffer.append(f'<row r="{row}">{cells}</row>')
+        if len(self._buffer) >= FLUSH_ROWS:
+            self._flush()
+        return row
+
+    def _write_links(self, refs: Sequence[Sequence[str]], row: int):
+        columns = [self._column(column) for column in range(2, len(refs) + 2)]
+        cells = ''.join(_cell(f'{columns[position]}{row}', links, STYLE_DEFAULT)
+                        for position, links in related_cells(refs, columns, row))
+        if cells:
+            self._links_buffer.append(f'<row r="{row}">{cells}</row>')
+
+    def _flush(self):
+        if self._buffer:
+            self._sheet.write(''.join(self._buffer).encode('utf-8'))
+            self._buffer.clear()
+        if self._links_buffer:
+            self._links.write(''.join(self._links_buffer).encode('utf-8'))
+            self._links_buffer.clear()
+
+    def _open_sheet(self):
+        number = len(self.sheets) + 1
+        self.sheets.append(self.sheet_name if number == 1 else f'{self.sheet_name}{number}')
+        self._sheet = self.zip.open(f'xl/worksheets/sheet{2 * number - 1}.xml', 'w', force_zip64=True)
+        self._sheet.write(_SHEET_HEAD.encode('utf-8'))
+        # в zip одновременно открыта только одна запись - лист связей копится во временном файле
+        self._links = tempfile.TemporaryFile()
+        self._row = 0
+
+    def _close_sheet(self):
+        if self._sheet is None:
+            return
+        self._flush()
+        self._sheet.write(_SHEET_TAIL.encode('utf-8'))
+        self._sheet.close()
+        number = len(self.sheets)
+        with self.zip.open(f'xl/worksheets/sheet{2 * number}.xml', 'w', force_zip64=True) as links:
+            links.write(_SHEET_HEAD.encode('utf-8'))
+            self._links.seek(0)
+            shutil.copyfileobj(self._links, links)
+            links.write(_SHEET_TAIL.encode('utf-8'))
+        self._links.close()
+        self._sheet = self._links = None
+
+    def _write_package(self):
+        names = []
+        for name in self.sheets:
+            names.extend((name, f'{name}_links'))
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_SHEET_TYPE}"/>'
+            for i in range(1, len(names) + 1)
+        )
+        self.zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'
+        ))
+        self.zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{_PKG_REL_NS}">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ))
+        # четные листы - скрытые листы связей
+        sheets = ''.join(
+            f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"{_HIDDEN if i % 2 == 0 else ""}/>'
+            for i, name in enumerate(names, 1)
+        )
+        self.zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>{sheets}</sheets></workbook>'
+        ))
+        rels = ''.join(
+            f'<Relationship Id="rId{i}" Target="worksheets/sheet{i}.xml" Type="{_REL_NS}/worksheet"/>'
+            for i in range(1, len(names) + 1)
+        )
+        self.zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{_PKG_REL_NS}">{rels}'
+            f'<Relationship Id="rId{len(names) + 1}" Target="styles.xml" Type="{_REL_NS}/styles"/>'
+            '</Relationships>'
+        ))
+        self.zip.writestr('xl/styles.xml', _STYLES)
@@ -1,5 +1,6 @@
-from core.application import Application
+import sys
+
+from core.cli import main
 
 if __name__ == '__main__':
-    app = Application('./data/data.txt', './output/result.txt')
-    app.run()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.api import MergeResult, merge_lines, merge_rows
+from core.application import Application
+from core.data_parser import Row
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+DATA = (
+    HEADER
+    + '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '2HV2\t2\tXT2-b1\tXTN1-b1\n'
+    + '2HV2\t3\tXTK1-a1\n'
+    + HEADER
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+)
+EXPECTED = (
+    '1HV1\n'
+    '\tXT1-a1\tXT2-a1\n'
+    '\t1_2, 2_1\t1_2, 2_1\n'
+    '2HV2\n'
+    '\tXTK1-a1\n'
+    '\t1_5\n'
+    '\tXT1-b1\tXT2-b1\tXT3-b1\tXTN1-b1\n'
+    '\t1_3\t1_1, 1_3, 1_4\t1_1\t1_4\tЗамечание 3 на 2\n'
+)
+REAL_EXPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'data.txt')
+
+
+def test_merge_lines():
+    result = merge_lines(DATA.splitlines())
+    assert isinstance(result, MergeResult)
+    assert result.text() == EXPECTED
+    assert result.rows == 6
+    assert result.cabinets() == ['1HV1', '2HV2']
+    assert [group.terms for group in result.groups('2HV2')] == [
+        ('XTK1-a1',), ('XT1-b1', 'XT2-b1', 'XT3-b1', 'XTN1-b1')]
+    assert result.refs('2HV2', 'XT2-b1') == ('1_1', '1_3', '1_4')
+    with pytest.raises(KeyError):
+        result.refs('2HV2', 'XT9')
+
+
+def test_merge_lines_dedup():
+    result = merge_lines(io.StringIO(DATA), dedup=True)
+    assert result.duplicates == 1
+    assert result.text() == EXPECTED
+
+
+def test_merge_rows():
+    rows = [
+        ('1HV1', '5', 'XT1-a1', 'XT2-a1'),
+        ('1HV1', '6', 'XT2-a1', 'XT3-a1'),
+        ('1HV1', '7', 'XTK1-a1'),
+        Row('2HV2', '1', 'XT1-b1', None, 3, 7),
+    ]
+    result = merge_rows(rows)
+    assert [group.terms for group in result.groups('1HV1')] == [('XTK1-a1',), ('XT1-a1', 'XT2-a1', 'XT3-a1')]
+    assert result.refs('1HV1', 'XT2-a1') == ('1_1', '1_2')
+    assert result.refs('2HV2', 'XT1-b1') == ('3_7',)
+    with pytest.raises(ValueError):
+        merge_rows([('1HV1', '5')])
+
+
+def test_no_output_without_sink(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    merge_lines(DATA.splitlines())
+    assert os.listdir(tmp_path) == []
+
+
+def test_sinks(tmp_path):
+    sink = io.StringIO()
+    result = merge_lines(DATA.splitlines(), sink=sink)
+    assert sink.getvalue() == EXPECTED
+    target = tmp_path / 'result.txt'
+    result.write(str(target), atomic=True)
+    assert target.read_text(encoding='utf-8') == EXPECTED
+    book = io.BytesIO()
+    result.write(book, fmt='xlsx')
+    assert 'xl/worksheets/sheet1.xml' in zipfile.ZipFile(book).namelist()
+
+
+def test_index():
+    index = merge_lines(DATA.splitlines()).index()
+    assert index.group_of('2HV2', 'XT3-b1').terms == ('XT1-b1', 'XT2-b1', 'XT3-b1', 'XTN1-b1')
+
+
+def test_matches_application(tmp_path):
+    target = tmp_path / 'result.txt'
+    Application(REAL_EXPORT, str(target)).run()
+    with open(REAL_EXPORT, encoding='utf-8') as f:
+        assert merge_lines(f).text() == target.read_text(encoding='utf-8')
+
+
+def test_concurrent_calls():
+    """одновременные вызовы из потоков не делят состояние"""
+    exports = [DATA.replace('2HV2', f'{number}HV{number}') for number in range(2, 34)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        texts = list(pool.map(lambda data: merge_lines(data.splitlines()).text(), exports * 4))
+    expected = [EXPECTED.replace('2HV2', f'{number}HV{number}') for number in range(2, 34)]
+    assert texts == expected * 4
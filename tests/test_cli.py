@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from core.cli import build_parser, expand_sources, plan_targets, main
+
+DATA = "Шкаф\tОбозначение провода\tОткуда идет\tКуда поступает\n1HV1\t1\tXT1-b1\tXT2-b1\n1HV1\t1\tXT2-b1\tXT3-b1\n"
+EXPECTED = "1HV1\n\tXT1-b1\tXT2-b1\tXT3-b1\n\t1_1\t1_1, 1_2\t1_2\n"
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for name in ('a.txt', 'b.txt'):
+        path = tmp_path / name
+        path.write_text(DATA, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def test_expand_sources(tmp_path, sources):
+    pattern = str(tmp_path / '*.txt')
+    assert expand_sources([pattern, sources[0]]) == sources
+
+
+def test_plan_targets_single():
+    args = build_parser().parse_args(['-s', 'x.txt', '-t', 'out/r.txt'])
+    assert plan_targets(['x.txt'], args) == [('x.txt', 'out/r.txt')]
+
+
+def test_plan_targets_per_file():
+    args = build_parser().parse_args(['-s', 'd/x.txt', 'd/y.txt', '-t', 'out/r.txt'])
+    assert plan_targets(['d/x.txt', 'd/y.txt'], args) == [
+        ('d/x.txt', 'out/x_result.txt'),
+        ('d/y.txt', 'out/y_result.txt'),
+    ]
+
+
+def test_plan_targets_per_file_xlsx():
+    args = build_parser().parse_args(['-s', 'd/x.txt', 'd/y.txt', '-o', 'out', '-f', 'xlsx'])
+    assert [target for _, target in plan_targets(['d/x.txt', 'd/y.txt'], args)] == [
+        os.path.join('out', 'x_result.xlsx'),
+        os.path.join('out', 'y_result.xlsx'),
+    ]
+
+
+def test_plan_targets_combine():
+    args = build_parser().parse_args(['-s', 'x.txt', 'y.txt', '--combine'])
+    assert plan_targets(['x.txt', 'y.txt'], args) == [(['x.txt', 'y.txt'], './output/result.txt')]
+
+
+def test_main_per_file(tmp_path, sources, capsys):
+    out = tmp_path / 'out'
+    assert main(['-s', str(tmp_path / '*.txt'), '-o', str(out), '-j', '2']) == 0
+    assert (out / 'a_result.txt').read_text(encoding='utf-8') == EXPECTED
+    assert (out / 'b_result.txt').read_text(encoding='utf-8') == EXPECTED
+    report = capsys.readouterr().out
+    assert 'parse' in report and 'merge' in report and 'write' in report
+
+
+def test_main_combine(tmp_path, sources):
+    target = tmp_path / 'combined.txt'
+    assert main(['-s', *sources, '--combine', '-t', str(target)]) == 0
+    # две выгрузки с заголовками: ссылки первого и второго файла
+    assert target.read_text(encoding='utf-8') == (
+        "1HV1\n\tXT1-b1\tXT2-b1\tXT3-b1\n\t1_1, 2_1\t1_1, 1_2, 2_1, 2_2\t1_2, 2_2\tЗамечание 3 на 2\n"
+    )
+
+
+def test_main_missing_source(tmp_path):
+    with pytest.raises(SystemExit):
+        main(['-s', str(tmp_path / 'nope.txt')])
+
+
+def test_main_svo(tmp_path, capsys):
+    source = tmp_path / 'svo.txt'
+    source.write_text('Откуда идет\tКуда поступает\nXA1:A\tXM1-001.XT2:4\nXM1-001.XT2:4\tXM1-002.XT2:4\n'
+                      'XA1:B\tXM1-002.XT2:3\n', encoding='utf-8')
+    target = tmp_path / 'nets.txt'
+    assert main(['--svo', '-s', str(source), '-t', str(target)]) == 0
+    assert target.read_text(encoding='utf-8').startswith('1\tXA1:A\tXM1-001.XT2:4\tXM1-002.XT2:4\n')
+    capsys.readouterr()
+    assert main(['--svo', '-s', str(source), '--trace', 'XA1']) == 0
+    assert capsys.readouterr().out == 'XA1:A\tXM1-001.XT2:4\tXM1-002.XT2:4\nXA1:B\tXM1-002.XT2:3\n'
+
+
+def test_main_svo_trace_dotted_device(tmp_path, capsys):
+    # точка в имени устройства: разъем запроса, как и у выводов, - после последней точки
+    source = tmp_path / 'svo.txt'
+    source.write_text('Откуда идет\tКуда поступает\nXA1:A\tXM1.5.XT2:4\n', encoding='utf-8')
+    assert main(['--svo', '-s', str(source), '--trace', 'XM1.5.XT2']) == 0
+    assert capsys.readouterr().out == 'XM1.5.XT2:4\tXA1:A\n'
+
+
+def test_main_also_formats(tmp_path, sources):
+    target = tmp_path / 'r.txt'
+    assert main(['-s', sources[0], '-t', str(target), '--also', 'csv', 'jsonl', 'txt']) == 0
+    assert target.read_text(encoding='utf-8') == EXPECTED
+    assert (tmp_path / 'r.csv').read_text(encoding='utf-8').splitlines()[1] == '1HV1,0,XT1-b1,1_1,'
+    assert '"terms": ["XT1-b1", "XT2-b1", "XT3-b1"]' in (tmp_path / 'r.jsonl').read_text(encoding='utf-8')
+
+
+def test_main_shards(tmp_path, sources, capsys):
+    target = tmp_path / 'r.txt'
+    assert main(['-s', sources[0], '-t', str(target), '--shards']) == 0
+    assert (tmp_path / 'r' / '1HV1.txt').read_text(encoding='utf-8') == EXPECTED
+    assert main(['-s', sources[0], '-t', str(target), '--shards']) == 0
+    assert 'шарды: 0 записано, 1 без изменений' in capsys.readouterr().out
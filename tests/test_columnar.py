@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from core.application import Application
+from core.columnar import ColumnarDataset
+from core.data_parser import DataParser
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+# шкафы не по порядку и двумя секциями, "3 на 2", строка из 3 колонок,
+# перемычка клеммы на себя, пустая клемма и повтор строки
+DATA = (
+    HEADER
+    + '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '2HV2\t2\tXT2-b1\tXTN1-b1\n'
+    + '2HV2\t3\tXTK1-a1\n'
+    + '1HV1\t5\tXT3-a1\tXT3-a1\n'
+    + HEADER
+    + '2HV2\t4\t\tXT9-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+)
+REAL_EXPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'data.txt')
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text(DATA, encoding='utf-8')
+    return str(path)
+
+
+def run(source, target, **options):
+    app = Application(source, str(target), **options)
+    app.run()
+    return app, target.read_bytes()
+
+
+@pytest.mark.parametrize('fmt', ['txt', 'xlsx'])
+def test_same_result_as_staged(tmp_path, source, fmt):
+    staged, expected = run(source, tmp_path / f'staged.{fmt}', dedup=True)
+    columnar, result = run(source, tmp_path / f'columnar.{fmt}', columnar=True, dedup=True)
+    if fmt == 'txt':
+        assert result == expected
+    else:
+        assert len(result) > 0
+    for field in ('rows', 'cabinets', 'groups', 'duplicates'):
+        assert getattr(columnar.stats, field) == getattr(staged.stats, field)
+    assert columnar.stats.duplicates == 2
+
+
+def test_merge_labels(source):
+    dataset = ColumnarDataset.from_rows(DataParser(source).iter_rows())
+    assert dataset.cabinets == ['2HV2', '1HV1']
+    assert len(dataset) == 9
+    assert dataset.merge() == 5
+    labels = list(dataset.labels)
+    # строки 1, 3, 4 и 9 - одна группа 2HV2
+    assert labels[0] == labels[2] == labels[3] == labels[8]
+    assert len(set(labels)) == 5
+
+
+def test_snapshot_roundtrip(tmp_path, source):
+    target = tmp_path / 'result.txt'
+    snapshot = str(tmp_path / 'result.txt.cols')
+    _, expected = run(source, target, save_columns=snapshot)
+    app, result = run(snapshot, tmp_path / 'from_snapshot.txt')
+    assert result == expected
+    # run() отпускает mmap снимка
+    assert app.dataset._mmap is None and not app.dataset._views
+    with ColumnarDataset.load(snapshot) as dataset:
+        assert isinstance(dataset.row_fr, memoryview) and dataset.labels is not None
+        assert dataset.terms[dataset.node_term[dataset.row_to[0]]] == 'XT3-b1'
+    assert dataset._mmap is None
+
+    # снимок без меток групп: слияние при загрузке
+    unmerged = ColumnarDataset.from_rows(DataParser(source).iter_rows())
+    unmerged.save(snapshot)
+    loaded = ColumnarDataset.load(snapshot)
+    assert loaded.labels is None
+    assert loaded.merge() == 5
+    loaded.close()
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / 'bad.cols'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        ColumnarDataset.load(str(path))
+
+
+def test_columnar_options_conflict(tmp_path, source):
+    with pytest.raises(ValueError):
+        Application(source, str(tmp_path / 'result.txt'), columnar=True, stream=True)
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_EXPORT), reason='нет выгрузки data/data.txt')
+def test_real_export(tmp_path):
+    _, expected = run(REAL_EXPORT, tmp_path / 'staged.txt')
+    _, result = run(REAL_EXPORT, tmp_path / 'columnar.txt', columnar=True)
+    assert result == expected
@@ -198,6 +198,35 @@ class TestConnectionEdgeCases:
         conn = Connection("Cab1", "Signal1", "", "term1")
         assert conn.terms == {"term1",}
     
+    def test_sorted_cache_invalidated(self):
+        """Кэш отсортированных клемм сбрасывается при изменении"""
+        conn = Connection("Cab1", "Signal1", "XT2-b1")
+        assert list(conn) == ["XT2-b1"]
+        conn.terms |= {"XT1-b1"}
+        assert list(conn) == ["XT1-b1", "XT2-b1"]
+        conn.update(["XT0-b1"])
+        assert conn.tabulated_term() == "XT0-b1\tXT1-b1\tXT2-b1"
+
+    def test_overlaps(self):
+        conn1 = Connection("Cab1", "Signal1", "term1", "term2")
+        conn2 = Connection("Cab1", "Signal2", "term2", "term3")
+        conn3 = Connection("Cab1", "Signal1", "term4")
+        conn4 = Connection("Cab2", "Signal1", "term1")
+        assert conn1.overlaps(conn2) is bool(conn1 & conn2) is True
+        assert conn1.overlaps(conn3) is bool(conn1 & conn3) is False
+        assert conn1.overlaps(conn4) is bool(conn1 & conn4) is False
+
+    def test_hash(self):
+        conn1 = Connection("Cab1", "Signal1", "term1", "term2")
+        conn2 = Connection("Cab1", "Signal1", "term2", "term1")
+        conn3 = Connection("Cab1", "Signal2", "term2", "term1")
+        assert hash(conn1) == hash(conn2)
+        assert len({conn1, conn2, conn3}) == 2
+
+    def test_slots(self):
+        conn = Connection("Cab1", "Signal1", "term1")
+        assert not hasattr(conn, "__dict__")
+
 
 def test_sorting_key_integration():
     """Интеграционный тест с sorting_key"""
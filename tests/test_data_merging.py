@@ -1,7 +1,7 @@
 import pytest
 from typing import Dict, Set, List
 
-from core.data_merger import DataMerging
+from core.data_merger import DataMerging, merge_terms
 from core.connection import Connection
 
 class TestDataMerging:
@@ -108,4 +108,89 @@ class TestDataMerging:
         expected = {
             'cab1': [Connection('cab1')]
         }
-        assert cabinet_humpers == expected
\ No newline at end of file
+        assert cabinet_humpers == expected
+
+    def test_chain_merged_in_reverse_order(self):
+        """Цепочка, собранная в обратном порядке, и сигнал от первой перемычки"""
+        cabinet_jumpers = {
+            'cab1': [
+                Connection('cab1', '2', 'e', 'f'),
+                Connection('cab1', '1', 'x', 'y'),
+                Connection('cab1', '1', 'd', 'e'),
+                Connection('cab1', '1', 'c', 'd'),
+                Connection('cab1'),
+                Connection('cab1', '1', 'a', 'c'),
+            ]
+        }
+        merger = DataMerging(cabinet_jumpers)
+        merger.process()
+
+        expected = {
+            'cab1': [
+                Connection('cab1', '2', 'a', 'c', 'd', 'e', 'f'),
+                Connection('cab1', '1', 'x', 'y'),
+                Connection('cab1'),
+            ]
+        }
+        assert cabinet_jumpers == expected
+
+    def test_parallel_matches_serial(self):
+        """Слияние в пуле процессов совпадает с последовательным"""
+        def make():
+            return {
+                f'cab{n}': [
+                    Connection(f'cab{n}', '1', f'XT{i}-a1', f'XT{i + 1}-a1')
+                    for i in range(n, 10 * n, n)
+                ] + [Connection(f'cab{n}', '1', 'XT1-b1', f'XT{n}-b1')]
+                for n in range(1, 6)
+            }
+        serial = make()
+        DataMerging(serial).process()
+
+        parallel = make()
+        merger = DataMerging(parallel, workers=2)
+        merger.PARALLEL_MIN_ROWS = 0
+        merger.BATCH_ROWS = 5
+        assert merger._parallel()
+        merger.process()
+
+        assert list(parallel) == list(serial)
+        assert parallel == serial
+
+    def test_parallel_falls_back_to_serial_on_small_input(self):
+        cabinet_jumpers = {
+            'cab1': [Connection('cab1', '1', 'a', 'b')],
+            'cab2': [Connection('cab2', '1', 'c', 'd')],
+        }
+        merger = DataMerging(cabinet_jumpers, workers=4)
+        assert not merger._parallel()
+
+    def test_parallel_keeps_signal_and_empty_jumpers(self):
+        """В пул уходят только клеммы: сигнал группы и пустые перемычки берутся на месте"""
+        def make():
+            return {
+                cabinet: [
+                    Connection(cabinet, 'first', 'XT1-a1', 'XT2-a1'),
+                    Connection(cabinet, 'empty'),
+                    Connection(cabinet, 'second', 'XT2-a1', 'XT3-a1'),
+                    Connection(cabinet, 'other', 'XT9-b1'),
+                ]
+                for cabinet in ('cab1', 'cab2')
+            }
+        parallel = make()
+        empty = parallel['cab1'][1]
+        merger = DataMerging(parallel, workers=2)
+        merger.PARALLEL_MIN_ROWS = 0
+        merger.process()
+
+        assert [group.signal for group in parallel['cab1']] == ['first', 'empty', 'other']
+        assert parallel['cab1'][1] is empty
+        assert parallel['cab1'][0].sorted_terms() == ('XT1-a1', 'XT2-a1', 'XT3-a1')
+        serial = make()
+        DataMerging(serial).process()
+        assert parallel == serial
+
+    def test_merge_terms(self):
+        """Группы наборов клемм: номер первого набора группы и все ее клеммы"""
+        rows = [{'a', 'b'}, set(), {'x'}, {'b', 'c'}, {'c', 'd'}, {'x', 'y'}]
+        assert merge_terms(rows) == [(0, {'a', 'b', 'c', 'd'}), (1, set()), (2, {'x', 'y'})]
@@ -4,7 +4,7 @@ import os
 from unittest.mock import mock_open, patch, MagicMock
 from collections import defaultdict
 
-from core.data_parser import DataParser
+from core.data_parser import DataParser, Row
 from core.connection import Connection
 
 class TestDataParser:
@@ -106,4 +106,50 @@ def test_connection_objects_creation():
         assert isinstance(connection, Connection)
         assert connection.cabinet == "Cab1"
         assert connection.signal == "Signal1"
-        assert connection.terms == {"XT1-b1", "XT2-b2"}
\ No newline at end of file
+        assert connection.terms == {"XT1-b1", "XT2-b2"}
+
+@patch('builtins.open', mock_open(read_data="Откуда\tКуда\tСигнал\nCab1\tSignal1\tXT1-b1\tXT2-b2\n\nCab1\tout\tXT3-b3\n"))
+def test_iter_rows():
+    """Потоковое чтение строк без накопления соединений"""
+    parser = DataParser("rows.txt")
+    rows = list(parser.iter_rows())
+
+    assert rows == [
+        Row('Cab1', 'Signal1', 'XT1-b1', 'XT2-b2', 1, 1),
+        Row('Cab1', 'out', 'XT3-b3', None, 1, 2),
+    ]
+    assert parser.cabinets_connections == defaultdict(list)
+    # клеммы интернированы
+    assert rows[0].cabinet is rows[1].cabinet
+
+
+@patch('builtins.open', mock_open(read_data="Откуда\tКуда\nCab1\t1\tXT1-b1\tXT2-b2\nОткуда\tКуда\nCab1\t1\tXT1-b1\tXT2-b2\nCab1\t2\tXT1-b1\tXT2-b2\n"))
+def test_dedup():
+    """Одинаковые строки дают одно соединение, ссылки сохраняются все"""
+    parser = DataParser("dups.txt", dedup=True)
+    parser.parse_data()
+
+    assert parser.duplicates == 1
+    assert parser.cabinets_connections['Cab1'] == [
+        Connection('Cab1', '1', 'XT1-b1', 'XT2-b2'),
+        Connection('Cab1', '2', 'XT1-b1', 'XT2-b2'),
+    ]
+    assert parser.jumpers_to_lines['Cab1']['XT1-b1'] == ['1_1', '2_1', '2_2']
+
+
+@patch('builtins.open', mock_open(read_data="Откуда\tКуда\nCab1\t1\tXT1-b1\tXT2-b2\n"))
+def test_iter_rows_twice_restarts_numbering():
+    """Повторный проход по той же выгрузке нумерует файлы и строки заново"""
+    parser = DataParser("rows.txt")
+    assert list(parser.iter_rows()) == list(parser.iter_rows()) == [Row('Cab1', '1', 'XT1-b1', 'XT2-b2', 1, 1)]
+
+
+def test_iter_lines():
+    """Строки из любого итерируемого, без файлов"""
+    parser = DataParser()
+    lines = ["Откуда\tКуда\n", "Cab1\t1\tXT1-b1\tXT2-b2\n", "Cab1\t2\tXT3-b3\n"]
+    assert list(parser.iter_lines(lines)) == [
+        Row('Cab1', '1', 'XT1-b1', 'XT2-b2', 1, 1),
+        Row('Cab1', '2', 'XT3-b3', None, 1, 2),
+    ]
+    assert [row.num_line for row in parser.iter_lines(lines)] == [1, 2]
@@ -1,3 +1,4 @@
+import io
 import pytest
 import tempfile
 import os
@@ -9,6 +10,7 @@ from core.functions import sorting_key
 from core.data_writer import DataWriter
 from core.connection import Connection
 
+
 class TestDataWriter:
     @pytest.fixture
     def sample_data(self):
@@ -17,4 +19,80 @@ class TestDataWriter:
                 'cab2': [Connection('cab2', '1', 'XT1-b1', 'XT2-b2')],
                 'cab1': [Connection('cab1', '2', 'XT3-b3', 'XT4-b4'), Connection('cab1', '3', 'XT5-b5', 'XT6-b6')]
             }
-        }
\ No newline at end of file
+        }
+
+    @pytest.fixture
+    def jumpers_to_lines(self):
+        lines = defaultdict(lambda: defaultdict(list))
+        lines['cab2']['XT1-b1'] = ['1_1', '1_2', '2_1']
+        lines['cab2']['XT2-b2'] = ['1_1']
+        lines['cab1']['XT3-b3'] = ['1_3']
+        lines['cab1']['XT4-b4'] = ['1_3']
+        lines['cab1']['XT5-b5'] = ['1_4']
+        lines['cab1']['XT6-b6'] = ['1_4']
+        return lines
+
+    EXPECTED = (
+        'cab1\n'
+        '\tXT3-b3\tXT4-b4\n'
+        '\t1_3\t1_3\n'
+        '\tXT5-b5\tXT6-b6\n'
+        '\t1_4\t1_4\n'
+        'cab2\n'
+        '\tXT1-b1\tXT2-b2\n'
+        '\t1_1, 1_2, 2_1\t1_1\tЗамечание 3 на 2\n'
+    )
+
+    def test_process(self, tmp_path, sample_data, jumpers_to_lines):
+        target = tmp_path / 'result.txt'
+        writer = DataWriter(str(target), sample_data['cabinet_jumpers'], jumpers_to_lines)
+        writer.process()
+        assert target.read_text(encoding='utf-8') == self.EXPECTED
+
+    def test_process_rewrites_target(self, tmp_path, sample_data, jumpers_to_lines):
+        target = tmp_path / 'result.txt'
+        target.write_text('old content\n', encoding='utf-8')
+        writer = DataWriter(str(target), sample_data['cabinet_jumpers'], jumpers_to_lines)
+        writer.process()
+        writer.process()
+        assert target.read_text(encoding='utf-8') == self.EXPECTED
+
+    def test_constructor_does_not_touch_target(self, tmp_path, sample_data, jumpers_to_lines):
+        target = tmp_path / 'result.txt'
+        target.write_text('old content\n', encoding='utf-8')
+        DataWriter(str(target), sample_data['cabinet_jumpers'], jumpers_to_lines)
+        assert target.read_text(encoding='utf-8') == 'old content\n'
+
+    def test_process_to_file_object(self, sample_data, jumpers_to_lines):
+        sink = io.StringIO()
+        DataWriter(sink, sample_data['cabinet_jumpers'], jumpers_to_lines).process()
+        assert sink.getvalue() == self.EXPECTED
+        assert not sink.closed
+
+    def test_process_outputs(self, tmp_path, sample_data, jumpers_to_lines):
+        target = tmp_path / 'result.txt'
+        writer = DataWriter(str(target), sample_data['cabinet_jumpers'], jumpers_to_lines,
+                            outputs=[str(tmp_path / 'result.csv'), str(tmp_path / 'result.jsonl')])
+        assert writer.process() == 3
+        assert target.read_text(encoding='utf-8') == self.EXPECTED
+        assert (tmp_path / 'result.csv').read_text(encoding='utf-8').count('\n') == 7
+        assert (tmp_path / 'result.jsonl').read_text(encoding='utf-8').count('\n') == 3
+
+    def test_atomic_process(self, tmp_path, sample_data, jumpers_to_lines):
+        target = tmp_path / 'result.txt'
+        target.write_text('old content\n', encoding='utf-8')
+        writer = DataWriter(str(target), sample_data['cabinet_jumpers'], jumpers_to_lines, atomic=True)
+        # до записи старый результат не тронут
+        assert target.read_text(encoding='utf-8') == 'old content\n'
+        writer.process()
+        assert target.read_text(encoding='utf-8') == self.EXPECTED
+        assert os.listdir(tmp_path) == ['result.txt']
+
+    def test_atomic_process_failure_keeps_old_result(self, tmp_path, sample_data):
+        target = tmp_path / 'result.txt'
+        target.write_text('old content\n', encoding='utf-8')
+        writer = DataWriter(str(target), sample_data['cabinet_jumpers'], {}, atomic=True)
+        with pytest.raises(KeyError):
+            writer.process()
+        assert target.read_text(encoding='utf-8') == 'old content\n'
+        assert os.listdir(tmp_path) == ['result.txt']
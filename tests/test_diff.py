@@ -0,0 +1,78 @@
+import json
+
+from core.cli import main
+from core.diff import ExportDiff, GroupChange, diff_groups, group_hash, merged_groups
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+OLD = (
+    HEADER
+    + '1HV1\t1\tXT1-b1\tXT2-b1\n'
+    + '1HV1\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t2\tXT5-b1\tXT6-b1\n'
+    + '1HV1\t3\tXT7-b1\tXT8-b1\n'
+    + '2HV2\t1\tXT1-a1\tXT2-a1\n'
+)
+# 2HV2 - те же строки в другом порядке и с повтором
+NEW = (
+    HEADER
+    + '2HV2\t1\tXT1-a1\tXT2-a1\n'
+    + '1HV1\t1\tXT1-b1\tXT2-b1\n'
+    + '1HV1\t2\tXT5-b1\tXT6-b1\n'
+    + '1HV1\t4\tXT9-b1\tXT10-b1\n'
+    + '2HV2\t1\tXT1-a1\tXT2-a1\n'
+    + '1HV1\t3\tXT7-b1\tXT8-b1\n'
+    + '1HV1\t3\tXT8-b1\tXT3-b1\n'
+)
+
+
+def test_group_hash_canonical():
+    assert group_hash('1HV1', ['XT2-b1', 'XT1-b1']) == group_hash('1HV1', ('XT1-b1', 'XT2-b1'))
+    assert group_hash('1HV1', ['XT1-b1']) != group_hash('2HV2', ['XT1-b1'])
+
+
+def test_merged_groups():
+    groups = merged_groups('1HV1', [('1', 'XT2-b1', 'XT1-b1'), ('1', 'XT2-b1', 'XT3-b1'), ('out', 'XT9-b1', None)])
+    assert sorted(groups.values()) == [('XT1-b1', 'XT2-b1', 'XT3-b1'), ('XT9-b1',)]
+
+
+def test_diff_groups_split():
+    old = merged_groups('1HV1', [('1', 'XT1-b1', 'XT2-b1'), ('1', 'XT2-b1', 'XT3-b1'), ('2', 'XT5-b1', 'XT6-b1')])
+    new = merged_groups('1HV1', [('1', 'XT1-b1', 'XT2-b1'), ('1', 'XT3-b1', 'XT4-b1'), ('2', 'XT5-b1', 'XT6-b1')])
+    assert diff_groups('1HV1', old, new) == [GroupChange(
+        'changed', '1HV1',
+        (('XT1-b1', 'XT2-b1', 'XT3-b1'),),
+        (('XT1-b1', 'XT2-b1'), ('XT3-b1', 'XT4-b1')),
+    )]
+
+
+def test_export_diff(tmp_path):
+    old, new = tmp_path / 'old.txt', tmp_path / 'new.txt'
+    old.write_text(OLD, encoding='utf-8')
+    new.write_text(NEW, encoding='utf-8')
+    diff = ExportDiff(str(old), str(new))
+    changes = diff.compare()
+
+    assert diff.unchanged_cabinets == 1 and diff.compared_cabinets == 1
+    assert diff.summary() == {'added': 1, 'removed': 0, 'changed': 1}
+    assert changes == [
+        GroupChange('changed', '1HV1',
+                    (('XT1-b1', 'XT2-b1', 'XT3-b1'), ('XT7-b1', 'XT8-b1')),
+                    (('XT1-b1', 'XT2-b1'), ('XT3-b1', 'XT7-b1', 'XT8-b1'))),
+        GroupChange('added', '1HV1', (), (('XT9-b1', 'XT10-b1'),)),
+    ]
+    assert diff.format().splitlines()[0] == '1HV1\t+1 -0 ~1'
+
+
+def test_cli_diff(tmp_path, capsys):
+    old, new = tmp_path / 'old.txt', tmp_path / 'new.txt'
+    old.write_text(OLD, encoding='utf-8')
+    new.write_text(OLD.replace('1HV1\t3\tXT7-b1\tXT8-b1\n', ''), encoding='utf-8')
+    target = tmp_path / 'result.txt'
+    assert main(['--diff', str(old), str(new), '-t', str(target), '--report']) == 0
+
+    out = capsys.readouterr().out
+    assert '\t- XT7-b1 XT8-b1' in out
+    assert not target.exists()
+    report = json.loads((tmp_path / 'result.txt.diff.json').read_text(encoding='utf-8'))
+    assert report['summary'] == {'added': 0, 'removed': 1, 'changed': 0,
+                                 'unchanged_cabinets': 1, 'compared_cabinets': 1}
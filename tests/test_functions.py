@@ -0,0 +1,26 @@
+from core.connection import Connection
+from core.functions import sorting_key, terminal_key
+
+
+def test_sorting_key_group_order():
+    terms = ['A1', 'XTN1-a1', 'XT2-b1', 'XTK3-a1', 'XT10-a1', 'XT2-a10']
+    assert sorted(terms, key=sorting_key) == ['XTK3-a1', 'XT2-b1', 'XT2-a10', 'XT10-a1', 'XTN1-a1', 'A1']
+
+
+def test_sorting_key_numbers():
+    assert sorting_key('XT12-b9') == (1, 12, 9, 'XT12-b9')
+    assert sorting_key('XT12') == (1, 12, 0, 'XT12')
+    assert sorting_key('Z') == (3, 0, 0, 'Z')
+
+
+def test_sorting_key_connection():
+    """Для соединения ключ строится по склеенным отсортированным клеммам"""
+    conn = Connection('Cab1', '1', 'XT2-b1', 'XT1-b2')
+    assert sorting_key(conn) == sorting_key('XT1-b2XT2-b1')
+
+
+def test_sorting_key_cached():
+    terminal_key.cache_clear()
+    sorting_key('XT5-a5')
+    sorting_key('XT5-a5')
+    assert terminal_key.cache_info().hits == 1
@@ -0,0 +1,22 @@
+from benchmarks.generator import generate_file
+from core.application import Application
+from core.data_parser import DataParser
+
+
+def test_generated_export_is_parsed(tmp_path):
+    source = tmp_path / 'synthetic.txt'
+    assert generate_file(str(source), 2000, cabinets=4, exports=2, fan_out=0.5) == 2000
+
+    parser = DataParser(str(source))
+    parser.parse_data()
+    assert parser.num_file == 2
+    assert sorted(parser.cabinets_connections) == ['1HV1', '1HV2', '1HV3', '1HV4']
+    assert all(len(rows) == 500 for rows in parser.cabinets_connections.values())
+
+
+def test_generated_export_has_fan_out(tmp_path):
+    source = tmp_path / 'synthetic.txt'
+    target = tmp_path / 'result.txt'
+    generate_file(str(source), 1000, cabinets=1, fan_out=0.5)
+    Application(str(source), str(target)).run()
+    assert 'Замечание 3 на 2' in target.read_text(encoding='utf-8')
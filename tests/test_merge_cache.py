@@ -0,0 +1,74 @@
+import os
+import pickle
+
+from core.application import Application
+from core.connection import Connection
+from core.merge_cache import MergeCache
+
+DATA = "1HV1\t1\tXT1-b1\tXT2-b1\n1HV1\t1\tXT2-b1\tXT3-b1\n1HV2\t2\tXT1-a1\tXT2-a1\n"
+
+
+class TestMergeCache:
+
+    def test_roundtrip(self, tmp_path):
+        cache = MergeCache(str(tmp_path / 'cache'))
+        groups = [Connection('1HV1', '1', 'XT1-b1', 'XT2-b1'), Connection('1HV1', '2', 'XT5-b1')]
+        cache.put('1HV1', 'abc', groups)
+        cache.save()
+
+        loaded = MergeCache(str(tmp_path / 'cache'))
+        loaded.load()
+        assert loaded.get('1HV1', 'abc') == groups
+        assert loaded.get('1HV1', 'other') is None
+        assert loaded.get('1HV2', 'abc') is None
+        assert (loaded.hits, loaded.misses) == (1, 2)
+
+    def test_save_drops_stale_cabinets(self, tmp_path):
+        cache = MergeCache(str(tmp_path / 'cache'))
+        cache.put('1HV1', 'a', [])
+        cache.put('1HV2', 'b', [])
+        cache.save(keep={'1HV2'})
+        assert set(cache.cabinets) == {'1HV2'}
+
+    def test_save_permissions_follow_umask(self, tmp_path):
+        path = tmp_path / 'cache'
+        umask = os.umask(0o022)
+        try:
+            MergeCache(str(path)).save()
+        finally:
+            os.umask(umask)
+        assert path.stat().st_mode & 0o777 == 0o644
+        assert os.listdir(tmp_path) == ['cache']
+
+    def test_broken_or_old_cache_ignored(self, tmp_path):
+        path = tmp_path / 'cache'
+        path.write_bytes(b'not a pickle')
+        cache = MergeCache(str(path))
+        cache.load()
+        assert cache.cabinets == {}
+
+        path.write_bytes(pickle.dumps({'version': -1, 'cabinets': {'1HV1': ('a', [])}}))
+        cache.load()
+        assert cache.cabinets == {}
+
+
+def test_incremental_application(tmp_path):
+    source = tmp_path / 'data.txt'
+    target = tmp_path / 'result.txt'
+    source.write_text(DATA, encoding='utf-8')
+
+    app = Application(str(source), str(target), incremental=True)
+    app.run()
+    first = target.read_text(encoding='utf-8')
+    assert (app.merger.cache.hits, app.merger.cache.misses) == (0, 2)
+
+    app = Application(str(source), str(target), incremental=True)
+    app.run()
+    assert target.read_text(encoding='utf-8') == first
+    assert (app.merger.cache.hits, app.merger.cache.misses) == (2, 0)
+
+    source.write_text(DATA + "1HV2\t2\tXT2-a1\tXT3-a1\n", encoding='utf-8')
+    app = Application(str(source), str(target), incremental=True)
+    app.run()
+    assert (app.merger.cache.hits, app.merger.cache.misses) == (1, 1)
+    assert '\tXT1-a1\tXT2-a1\tXT3-a1\n' in target.read_text(encoding='utf-8')
@@ -0,0 +1,102 @@
+import threading
+from collections import defaultdict
+
+import pytest
+
+from core.provenance import ProvenanceStore, pack_ref, render_ref
+
+
+def test_pack_render():
+    assert render_ref(pack_ref(3, 3514)) == '3_3514'
+    assert render_ref(pack_ref(0, 1)) == '0_1'
+
+
+class TestProvenanceStore:
+
+    def test_refs_in_order(self):
+        store = ProvenanceStore()
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        store.add('Cab1', 'XT2-b1', 1, 1)
+        store.add('Cab1', 'XT1-b1', 1, 2)
+        store.add('Cab1', 'XT1-b1', 2, 7)
+
+        assert store['Cab1']['XT1-b1'] == ['1_1', '1_2', '2_7']
+        assert store['Cab1']['XT2-b1'] == ['1_1']
+        assert store['Cab1'].count('XT1-b1') == 3
+        assert store['Cab1'].count('XT9-b9') == 0
+        assert list(store['Cab1']) == ['XT1-b1', 'XT2-b1']
+
+    def test_mapping_equality(self):
+        store = ProvenanceStore()
+        assert store == defaultdict(lambda: defaultdict(list))
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        assert store == {'Cab1': {'XT1-b1': ['1_1']}}
+        assert len(store) == 1 and 'Cab1' in store
+
+    def test_index_kept_for_one_cabinet(self):
+        store = ProvenanceStore()
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        store.add('Cab2', 'XT1-b1', 1, 2)
+        assert store['Cab1']['XT1-b1'] == ['1_1']
+        assert store['Cab2']['XT1-b1'] == ['1_2']
+        assert store['Cab1']._index is None
+        # имена клемм общие для всех шкафов
+        assert store.terms.names == ['XT1-b1']
+
+    def test_missing_term(self):
+        store = ProvenanceStore()
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        assert 'XT2-b1' not in store['Cab1']
+        with pytest.raises(KeyError):
+            store['Cab1']['XT2-b1']
+
+    def test_release(self):
+        store = ProvenanceStore()
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        store.add('Cab2', 'XT2-b1', 1, 2)
+        store.release('Cab1')
+        assert list(store) == ['Cab2']
+        store.release('Cab2')
+        store.release('Cab3')
+        # без шкафов таблица имен начинается заново
+        assert len(store) == 0 and store.terms.names == []
+
+    def test_concurrent_readers(self):
+        # потоки читают разные шкафы - каждый сбрасывает индекс другого
+        store = ProvenanceStore()
+        for cabinet in range(8):
+            for line in range(200):
+                store.add(f'Cab{cabinet}', f'XT{line % 20}-b1', cabinet, line)
+        expected = {f'Cab{cabinet}': {term: list(store[f'Cab{cabinet}'][term]) for term in store[f'Cab{cabinet}']}
+                    for cabinet in range(8)}
+        errors = []
+
+        def read(cabinet: str):
+            try:
+                for _ in range(200):
+                    for term, refs in expected[cabinet].items():
+                        assert store[cabinet][term] == refs
+                        assert store[cabinet].count(term) == len(refs)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=read, args=(cabinet,)) for cabinet in expected]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+    def test_index_dropped_during_read(self):
+        # другой поток сбрасывает индекс сразу после построения - чтение его не теряет
+        store = ProvenanceStore()
+        store.add('Cab1', 'XT1-b1', 1, 1)
+        indexed = store._indexed
+
+        def indexed_then_dropped(cabinet):
+            indexed(cabinet)
+            cabinet.drop_index()
+
+        store._indexed = indexed_then_dropped
+        assert store['Cab1']['XT1-b1'] == ['1_1']
+        assert store['Cab1'].count('XT1-b1') == 1
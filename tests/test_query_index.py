@@ -0,0 +1,100 @@
+import json
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from core.application import Application
+from core.query_index import GroupRecord, QueryIndex, QueryServer
+
+DATA = (
+    'Шкаф\tСигнал\tОткуда\tКуда\n'
+    '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    '2HV2\t7\tXTN1-b1\n'
+)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text(DATA, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_application_builds_index(tmp_path, source, stream):
+    app = Application(source, str(tmp_path / 'result.txt'), index=True, stream=stream)
+    app.run()
+    index = app.query_index
+    assert 'index' in app.timings
+    assert index.summary() == {'groups': 3, 'cabinets': 2, 'lines': 4}
+    # группы в порядке result.txt
+    assert [group.cabinet for group in index.groups] == ['1HV1', '2HV2', '2HV2']
+    group_id = index.group_id('2HV2', 'XT2-b1')
+    assert index.group(group_id) == GroupRecord(
+        '2HV2', ('XT1-b1', 'XT2-b1', 'XT3-b1'), (('1_1',), ('1_1', '1_2'), ('1_2',)), '')
+    assert index.lines_of(group_id) == ['1_1', '1_2']
+    assert index.group_for_line('1_2') == index.group(group_id)
+    assert index.group_for_line('1_4').terms == ('XTN1-b1',)
+    assert index.group_of('1HV1', 'XT1-b1') is None
+    assert index.group_for_line('9_9') is None
+
+
+def test_snapshot_roundtrip(tmp_path, source):
+    snapshot = str(tmp_path / 'result.txt.index')
+    app = Application(source, str(tmp_path / 'result.txt'), snapshot=snapshot)
+    app.run()
+    loaded = QueryIndex.load(snapshot)
+    assert loaded.groups == app.query_index.groups
+    assert loaded.group_of('1HV1', 'XT2-a1') == app.query_index.group_of('1HV1', 'XT2-a1')
+
+
+def test_snapshot_permissions_follow_umask(tmp_path):
+    path = tmp_path / 'result.txt.index'
+    umask = os.umask(0o022)
+    try:
+        QueryIndex([]).save(str(path))
+    finally:
+        os.umask(umask)
+    assert path.stat().st_mode & 0o777 == 0o644
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_snapshot_version_mismatch(tmp_path):
+    path = tmp_path / 'old.index'
+    path.write_bytes(pickle.dumps({'version': -1, 'groups': []}))
+    with pytest.raises(ValueError):
+        QueryIndex.load(str(path))
+
+
+def test_server_concurrent_requests(tmp_path, source):
+    app = Application(source, str(tmp_path / 'result.txt'), index=True)
+    app.run()
+    server = QueryServer(app.query_index, ('127.0.0.1', 0), workers=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def get(path):
+        with urlopen(base + path, timeout=5) as response:
+            return json.load(response)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(get, ['/term?cabinet=2HV2&term=XT3-b1', '/line?ref=1_1'] * 20))
+        assert all(result['terms'] == ['XT1-b1', 'XT2-b1', 'XT3-b1'] for result in results)
+        assert get('/stats') == {'groups': 3, 'cabinets': 2, 'lines': 4}
+        assert get('/group?id=0')['cabinet'] == '1HV1'
+        for path, status in (('/term?cabinet=2HV2&term=XT9-b1', 404), ('/term?cabinet=2HV2', 400), ('/nope', 404)):
+            with pytest.raises(HTTPError) as error:
+                get(path)
+            assert error.value.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
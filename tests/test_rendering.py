@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+
+from core.rendering import (SINKS, CsvSink, JsonLinesSink, Sink, TextSink, XlsxSink, format_of, open_target,
+                            register_sink, render)
+
+CABINETS = [
+    ('1HV1', [(('XT1-a1', 'XT2-a1'), (('1_2', '2_1'), ('1_2',)), '')]),
+    ('2HV2', [
+        (('XTK1-a1',), (('1_5',),), ''),
+        (('XT1-b1', 'XT2-b1'), (('1_3',), ('1_1', '1_3', '1_4')), 'Замечание 3 на 2'),
+    ]),
+]
+TEXT = (
+    '1HV1\n'
+    '\tXT1-a1\tXT2-a1\n'
+    '\t1_2, 2_1\t1_2\n'
+    '2HV2\n'
+    '\tXTK1-a1\n'
+    '\t1_5\n'
+    '\tXT1-b1\tXT2-b1\n'
+    '\t1_3\t1_1, 1_3, 1_4\tЗамечание 3 на 2\n'
+)
+
+
+class CountingCabinets:
+    """шкафы, которые можно пройти только один раз"""
+
+    def __init__(self):
+        self.passes = 0
+
+    def __iter__(self):
+        self.passes += 1
+        assert self.passes == 1
+        for cabinet, groups in CABINETS:
+            yield cabinet, iter(groups)
+
+
+def test_format_of():
+    assert format_of('out/result.txt') == 'txt'
+    assert format_of('out/RESULT.XLSX') == 'xlsx'
+    assert format_of('out/result.csv') == 'csv'
+    assert format_of('out/result.jsonl') == 'jsonl'
+    assert format_of('out/result') == 'txt'
+    assert format_of(io.StringIO()) == 'txt'
+
+
+def test_render_all_sinks_in_one_pass():
+    text, table, lines, book = io.StringIO(), io.StringIO(), io.StringIO(), io.BytesIO()
+    cabinets = CountingCabinets()
+    assert render(cabinets, [TextSink(text), CsvSink(table), JsonLinesSink(lines), XlsxSink(book)]) == 3
+    assert cabinets.passes == 1
+    assert text.getvalue() == TEXT
+
+    rows = list(csv.reader(io.StringIO(table.getvalue())))
+    assert rows[0] == list(CsvSink.HEADER)
+    assert rows[1:] == [
+        ['1HV1', '0', 'XT1-a1', '1_2, 2_1', ''],
+        ['1HV1', '0', 'XT2-a1', '1_2', ''],
+        ['2HV2', '1', 'XTK1-a1', '1_5', ''],
+        ['2HV2', '2', 'XT1-b1', '1_3', 'Замечание 3 на 2'],
+        ['2HV2', '2', 'XT2-b1', '1_1, 1_3, 1_4', 'Замечание 3 на 2'],
+    ]
+
+    groups = [json.loads(line) for line in lines.getvalue().splitlines()]
+    assert [group['id'] for group in groups] == [0, 1, 2]
+    assert groups[2] == {
+        'id': 2,
+        'cabinet': '2HV2',
+        'terms': ['XT1-b1', 'XT2-b1'],
+        'refs': {'XT1-b1': ['1_3'], 'XT2-b1': ['1_1', '1_3', '1_4']},
+        'remark': 'Замечание 3 на 2',
+    }
+
+    assert 'xl/worksheets/sheet1.xml' in zipfile.ZipFile(book).namelist()
+
+
+def test_register_sink():
+    @register_sink('cabinets')
+    class CabinetListSink(Sink):
+        def write_cabinet(self, cabinet, groups, first_id):
+            self.handle.write(f'{cabinet}\t{len(groups)}\n')
+
+    try:
+        assert SINKS['cabinets'] is CabinetListSink
+        assert format_of('x.cabinets') == 'cabinets'
+        out = io.StringIO()
+        render(CABINETS, [CabinetListSink(out)])
+        assert out.getvalue() == '1HV1\t1\n2HV2\t2\n'
+    finally:
+        del SINKS['cabinets']
+
+
+def test_sink_requires_write_cabinet():
+    class NoWriteSink(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        NoWriteSink(io.StringIO())
+
+
+def test_open_target_atomic_failure(tmp_path):
+    target = tmp_path / 'result.csv'
+    target.write_text('old\n', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with open_target(str(target), atomic=True) as f:
+            f.write('new\n')
+            raise RuntimeError
+    assert target.read_text(encoding='utf-8') == 'old\n'
+    assert [path.name for path in tmp_path.iterdir()] == ['result.csv']
@@ -0,0 +1,142 @@
+import json
+import os
+
+import pytest
+
+from core.application import Application
+from core.sharding import MANIFEST, ShardManifest, ShardReport, ShardedResult, ShardedWriter
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+DATA = (
+    HEADER
+    + '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '3HV3\t1\tXT1-c1\tXT2-c1\n'
+    + '2HV2\t3\tXTK1-a1\n'
+)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text(DATA, encoding='utf-8')
+    return str(path)
+
+
+def cabinets(groups_2hv2=None):
+    return [
+        ('1HV1', [(('XT1-a1', 'XT2-a1'), (['1_2'], ['1_2']), '')]),
+        ('2HV2', groups_2hv2 or [(('XTK1-a1',), (['1_5'],), '')]),
+        ('3HV3', [(('XT1-c1', 'XT2-c1'), (['1_4'], ['1_4']), '')]),
+    ]
+
+
+def mtimes(directory):
+    return {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory)}
+
+
+def test_shard_per_cabinet(tmp_path):
+    directory = str(tmp_path / 'shards')
+    report = ShardedWriter(directory).write(cabinets())
+    assert report == ShardReport(shards=3, written=3, skipped=0, removed=0)
+    assert sorted(os.listdir(directory)) == ['1HV1.txt', '2HV2.txt', '3HV3.txt', MANIFEST]
+    result = ShardedResult(directory)
+    assert result.cabinets() == ['1HV1', '2HV2', '3HV3']
+    assert result.read('2HV2') == '2HV2\n\tXTK1-a1\n\t1_5\n'
+    assert result.path('2HV2') == os.path.join(directory, '2HV2.txt')
+    entry = ShardManifest.read(directory).cabinets['1HV1']
+    assert entry['shard'] == '1HV1.txt' and entry['groups'] == 1 and len(entry['hash']) == 32
+
+
+def test_unchanged_cabinets_are_not_rewritten(tmp_path):
+    directory = str(tmp_path / 'shards')
+    ShardedWriter(directory).write(cabinets())
+    before = mtimes(directory)
+    os.utime(os.path.join(directory, '1HV1.txt'), ns=(1, 1))
+    os.utime(os.path.join(directory, '2HV2.txt'), ns=(1, 1))
+    changed = [(('XTK1-a1', 'XTK2-a1'), (['1_5'], ['1_6']), '')]
+    report = ShardedWriter(directory).write(cabinets(changed))
+    assert report == ShardReport(shards=3, written=1, skipped=2, removed=0)
+    after = mtimes(directory)
+    assert after['1HV1.txt'] == 1
+    assert after['2HV2.txt'] != 1
+    assert after['3HV3.txt'] == before['3HV3.txt']
+    assert ShardedResult(directory).read('2HV2') == '2HV2\n\tXTK1-a1\tXTK2-a1\n\t1_5\t1_6\n'
+
+
+def test_removed_cabinet_and_format_change(tmp_path):
+    directory = str(tmp_path / 'shards')
+    ShardedWriter(directory).write(cabinets())
+    assert ShardedWriter(directory).write(cabinets()[:2]).removed == 1
+    assert not os.path.exists(os.path.join(directory, '3HV3.txt'))
+    report = ShardedWriter(directory, fmt='jsonl', batch=2).write(cabinets())
+    assert report == ShardReport(shards=2, written=2, skipped=0, removed=2)
+    assert sorted(os.listdir(directory)) == [MANIFEST, 'shard-00000.jsonl', 'shard-00001.jsonl']
+    result = ShardedResult(directory)
+    assert json.loads(result.read('2HV2')) == {
+        'id': 1, 'cabinet': '2HV2', 'terms': ['XTK1-a1'], 'refs': {'XTK1-a1': ['1_5']}, 'remark': ''}
+    assert json.loads(result.read('3HV3'))['id'] == 0
+
+
+def test_batch_membership_change_rewrites_shard(tmp_path):
+    directory = str(tmp_path / 'shards')
+    ShardedWriter(directory, batch=2).write(cabinets())
+    report = ShardedWriter(directory, batch=2).write(cabinets()[:2])
+    # 1HV1 и 2HV2 в том же шарде без изменений; шард 3HV3 больше не нужен
+    assert report == ShardReport(shards=1, written=0, skipped=1, removed=1)
+
+
+def test_xlsx_shards(tmp_path):
+    directory = str(tmp_path / 'shards')
+    ShardedWriter(directory, fmt='xlsx').write(cabinets())
+    result = ShardedResult(directory)
+    assert os.path.getsize(result.path('1HV1')) > 0
+    with pytest.raises(ValueError):
+        result.read('1HV1')
+
+
+def test_invalid_options(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedWriter(str(tmp_path), batch=0)
+    with pytest.raises(ValueError):
+        ShardedWriter(str(tmp_path), fmt='pdf')
+    with pytest.raises(ValueError):
+        ShardedResult(str(tmp_path))
+
+
+@pytest.mark.parametrize('mode', [{}, {'stream': True}, {'columnar': True}, {'sqlite': True}])
+def test_application_shards_match_result(tmp_path, source, mode):
+    target = tmp_path / 'result.txt'
+    Application(source, str(target)).run()
+    directory = tmp_path / 'result'
+    app = Application(source, str(directory), shards=1, **mode)
+    app.run()
+    assert app.shard_report.written == app.stats.cabinets
+    result = ShardedResult(str(directory))
+    assert ''.join(result.read(cabinet) for cabinet in result.cabinets()) == target.read_text(encoding='utf-8')
+    app = Application(source, str(directory), shards=1, **mode)
+    app.run()
+    assert app.stats.shards_skipped == app.stats.cabinets
+
+
+def test_application_shards_reject_outputs(tmp_path, source):
+    with pytest.raises(ValueError):
+        Application(source, str(tmp_path / 'result'), shards=1, outputs=[str(tmp_path / 'r.csv')])
+
+
+def test_colliding_cabinet_names(tmp_path):
+    directory = str(tmp_path / 'shards')
+    groups = [(('XT1-a1',), (['1_1'],), '')]
+    colliding = [('1HV 1', groups), ('1HV_1', [(('XT2-a1',), (['1_2'],), '')]), ('1hv1', groups), ('1HV1', groups)]
+    assert ShardedWriter(directory).write(colliding).written == 4
+    manifest = ShardManifest.read(directory).cabinets
+    names = [entry['shard'] for entry in manifest.values()]
+    assert len({name.casefold() for name in names}) == 4
+    assert manifest['1HV_1']['shard'] == '1HV_1.txt'
+    assert manifest['1hv1']['shard'] == '1hv1.txt'
+    result = ShardedResult(directory)
+    assert result.read('1HV 1') == '1HV 1\n\tXT1-a1\n\t1_1\n'
+    assert result.read('1HV_1') == '1HV_1\n\tXT2-a1\n\t1_2\n'
+    # имена устойчивы: повторный запуск ничего не переписывает
+    assert ShardedWriter(directory).write(colliding).skipped == 4
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from core.application import Application
+from core.data_parser import DataParser
+from core.query_index import QueryIndex
+from core.sqlite_store import SqliteStore
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+# шкафы не по порядку и двумя секциями, "3 на 2", строка из 3 колонок и повтор строки
+DATA = (
+    HEADER
+    + '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '2HV2\t2\tXT2-b1\tXTN1-b1\n'
+    + '2HV2\t3\tXTK1-a1\n'
+    + HEADER
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+)
+REAL_EXPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'data.txt')
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text(DATA, encoding='utf-8')
+    return str(path)
+
+
+def run(source, target, **options):
+    app = Application(source, str(target), **options)
+    app.run()
+    return app, target.read_bytes()
+
+
+def test_store(tmp_path, source):
+    store = SqliteStore(str(tmp_path / 'rows.sqlite'))
+    assert store.load(DataParser(source).iter_rows()) == 7
+    assert [name for _, name in store.cabinets()] == ['1HV1', '2HV2']
+    assert store.duplicates() == 2
+    merged, terms_lines = store.merge_cabinet(2, '1HV1')
+    assert [group.sorted_terms() for group in merged] == [('XT1-a1', 'XT2-a1')]
+    assert terms_lines == {'XT1-a1': ['1_2', '2_1'], 'XT2-a1': ['1_2', '2_1']}
+    store.close()
+    # база по явному пути остается
+    assert os.path.exists(tmp_path / 'rows.sqlite')
+
+
+def test_temporary_store_removed(source):
+    store = SqliteStore()
+    store.load(DataParser(source).iter_rows())
+    store.close()
+    assert not os.path.exists(store.path)
+
+
+@pytest.mark.parametrize('fmt', ['txt', 'xlsx'])
+def test_same_result_as_in_memory(tmp_path, source, fmt):
+    staged, expected = run(source, tmp_path / f'staged.{fmt}', dedup=True)
+    app, result = run(source, tmp_path / f'sqlite.{fmt}', sqlite=True, dedup=True)
+    if fmt == 'txt':
+        assert result == expected
+    assert 'merge+write' in app.timings
+    for field in ('rows', 'cabinets', 'groups', 'duplicates'):
+        assert getattr(app.stats, field) == getattr(staged.stats, field)
+    assert set(app.stats.cabinet_merge_times) == {'1HV1', '2HV2'}
+
+
+def test_index_built_while_writing(tmp_path, source, monkeypatch):
+    staged, _ = run(source, tmp_path / 'staged.txt', index=True)
+    merged = []
+    merge_cabinet = SqliteStore.merge_cabinet
+
+    def counting(store, cabinet_id, cabinet):
+        merged.append(cabinet)
+        return merge_cabinet(store, cabinet_id, cabinet)
+
+    monkeypatch.setattr(SqliteStore, 'merge_cabinet', counting)
+    app, result = run(source, tmp_path / 'sqlite.txt', sqlite=True, snapshot=str(tmp_path / 'sqlite.index'))
+    # каждый шкаф сливается один раз - и для результата, и для индекса
+    assert merged == ['1HV1', '2HV2']
+    assert app.query_index.groups == staged.query_index.groups
+    assert QueryIndex.load(str(tmp_path / 'sqlite.index')).groups == staged.query_index.groups
+
+
+def test_sqlite_options_conflict(tmp_path, source):
+    with pytest.raises(ValueError):
+        Application(source, str(tmp_path / 'result.txt'), sqlite=True, incremental=True)
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_EXPORT), reason='нет выгрузки data/data.txt')
+def test_real_export(tmp_path):
+    _, expected = run(REAL_EXPORT, tmp_path / 'staged.txt')
+    _, result = run(REAL_EXPORT, tmp_path / 'sqlite.txt', sqlite=True)
+    assert result == expected
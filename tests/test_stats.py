@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core import stats as stats_module
+from core.application import Application
+from core.stats import RunStats, max_rss, profiling
+
+DATA = "1HV1\t1\tXT1-b1\tXT2-b1\n1HV1\t1\tXT2-b1\tXT3-b1\n1HV2\t2\tXT1-a1\tXT2-a1\n"
+
+
+class TestRunStats:
+
+    def test_stage(self):
+        stats = RunStats()
+        with stats.stage('parse'):
+            pass
+        assert list(stats.timings) == ['parse']
+        assert stats.stages['parse'].wall >= 0
+        # без tracemalloc пика этапа нет - только пик всего процесса
+        assert stats.stages['parse'].peak_memory is None
+        assert stats.stages['parse'].process_max_rss >= 0
+
+    def test_tracemalloc_peak(self):
+        stats = RunStats()
+        with profiling('tracemalloc', stats):
+            with stats.stage('alloc'):
+                data = [0] * 1_000_000
+                del data
+        assert stats.stages['alloc'].peak_memory >= 8_000_000
+
+    def test_cprofile(self):
+        stats = RunStats()
+        with profiling('cprofile', stats):
+            sorted(range(1000))
+        assert 'function calls' in stats.profile
+
+    def test_slowest_cabinets(self):
+        stats = RunStats(cabinet_merge_times={'a': 0.1, 'b': 0.3, 'c': 0.2})
+        assert stats.slowest_cabinets(2) == [('b', 0.3), ('c', 0.2)]
+
+
+@pytest.mark.parametrize('platform, expected', [('linux', 2048 * 1024), ('darwin', 2048)])
+def test_max_rss_units(monkeypatch, platform, expected):
+    usage = SimpleNamespace(ru_maxrss=2048)
+    fake = SimpleNamespace(RUSAGE_SELF=0, getrusage=lambda who: usage)
+    monkeypatch.setattr(stats_module, 'resource', fake)
+    monkeypatch.setattr(stats_module.sys, 'platform', platform)
+    assert max_rss() == expected
+
+
+def test_application_stats_and_report(tmp_path):
+    source = tmp_path / 'data.txt'
+    source.write_text(DATA, encoding='utf-8')
+    calls = []
+    app = Application(str(source), str(tmp_path / 'result.txt'),
+                      progress=lambda *args: calls.append(args), report=str(tmp_path / 'stats.json'))
+    app.run()
+
+    assert calls == [('1HV1', 1, 2), ('1HV2', 2, 2)]
+    assert (app.stats.rows, app.stats.cabinets, app.stats.groups) == (3, 2, 2)
+    assert list(app.timings) == ['parse', 'merge', 'write']
+
+    report = json.loads((tmp_path / 'stats.json').read_text(encoding='utf-8'))
+    assert report['rows'] == 3
+    assert set(report['stages']) == {'parse', 'merge', 'write'}
+    assert [c['cabinet'] for c in report['slowest_cabinets']] == sorted(['1HV1', '1HV2'], key=lambda c: -app.stats.cabinet_merge_times[c])
@@ -0,0 +1,86 @@
+import pytest
+
+from core.application import Application
+from core.data_parser import DataParser
+from core.data_writer import REMARK_3_ON_2
+from core.streaming import SpillStore, StreamingPipeline
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+# 2HV2 встречается двумя секциями, вторая - после 1HV1
+DATA = (
+    HEADER
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '2HV2\t1\tXT2-b1\tXT3-b1\n'
+    + '1HV1\t5\tXT1-a1\tXT2-a1\n'
+    + HEADER
+    + '2HV2\t2\tXT3-b1\tXT4-b1\n'
+    + '2HV2\t1\tXT1-b1\tXT2-b1\n'
+    + '2HV2\t7\tXTN1-b1\n'
+)
+
+
+def test_spill_store():
+    store = SpillStore()
+    store.append('a', [1, 2])
+    store.append('b', 'x')
+    store.append('a', [3])
+    assert list(store.load('a')) == [[1, 2], [3]]
+    store.replace('a', [4])
+    assert list(store.load('a')) == [[4]]
+    assert list(store.load('c')) == []
+    assert 'b' in store and sorted(store.keys()) == ['a', 'b']
+    store.close()
+
+
+@pytest.mark.parametrize('dedup', [False, True])
+def test_stream_matches_staged(tmp_path, dedup):
+    source = tmp_path / 'data.txt'
+    source.write_text(DATA, encoding='utf-8')
+    staged = Application(str(source), str(tmp_path / 'staged.txt'), dedup=dedup)
+    staged.run()
+    stream = Application(str(source), str(tmp_path / 'stream.txt'), dedup=dedup, stream=True)
+    stream.run()
+
+    assert (tmp_path / 'stream.txt').read_text(encoding='utf-8') == \
+        (tmp_path / 'staged.txt').read_text(encoding='utf-8')
+    for field in ('rows', 'cabinets', 'groups', 'duplicates'):
+        assert getattr(stream.stats, field) == getattr(staged.stats, field)
+    assert stream.stats.reappeared == 1
+
+
+def test_cabinets_released(tmp_path):
+    source = tmp_path / 'data.txt'
+    source.write_text(DATA, encoding='utf-8')
+    parser = DataParser(str(source))
+    pipeline = StreamingPipeline(parser, str(tmp_path / 'result.txt'))
+    pipeline.process()
+    # в парсере ничего не осталось - все шкафы во временном файле
+    assert not parser.cabinets_connections
+    assert len(parser.jumpers_to_lines) == 0
+    assert pipeline.rows == 6 and pipeline.cabinets == 2
+    pipeline.write()
+    assert (tmp_path / 'result.txt').read_text(encoding='utf-8').startswith(
+        '1HV1\n\tXT1-a1\tXT2-a1\n\t1_3\t1_3\n2HV2\n\tXT1-b1\tXT2-b1\tXT3-b1\tXT4-b1\n')
+
+
+def test_stream_rejects_validate(tmp_path):
+    with pytest.raises(ValueError):
+        Application('data.txt', str(tmp_path / 'result.txt'), stream=True, validate=True)
+
+
+def test_reappearing_cabinet_restored_from_groups(tmp_path):
+    # XT2-b1 получает третью ссылку в третьей секции - замечание "3 на 2" через восстановление
+    source = tmp_path / 'data.txt'
+    source.write_text(DATA + '1HV1\t5\tXT2-a1\tXT3-a1\n' + '2HV2\t8\tXT2-b1\tXT9-b1\n', encoding='utf-8')
+    staged = Application(str(source), str(tmp_path / 'staged.txt'))
+    staged.run()
+    parser = DataParser(str(source))
+    pipeline = StreamingPipeline(parser, str(tmp_path / 'stream.txt'))
+    pipeline.process()
+    # строки шкафов во временный файл не пишутся - только группы
+    assert pipeline._unique_rows is None
+    assert pipeline.reappeared == 3
+    pipeline.write()
+    result = (tmp_path / 'stream.txt').read_text(encoding='utf-8')
+    assert result == (tmp_path / 'staged.txt').read_text(encoding='utf-8')
+    assert REMARK_3_ON_2 in result
@@ -0,0 +1,98 @@
+import io
+import os
+
+import pytest
+
+from core.svo import NetIndex, SvoParser, pin_key, split_device, split_pin
+
+REAL_EXPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'data svo.txt')
+
+
+@pytest.fixture
+def index():
+    # цепь с циклом, провод на себя и отдельная пара
+    index = NetIndex()
+    for number, (fr, to) in enumerate([
+        ('XA1:A', 'XM1-001.XT2:4'),
+        ('XM1-001.XT2:4', 'XM1-002.XT2:4'),
+        ('XM1-002.XT2:4', 'XA1:A'),
+        ('XA1:A', 'XA1:A'),
+        ('XA1:B', 'XM1-002.XT2:3'),
+    ], 1):
+        index.add(fr, to, number)
+    return index
+
+
+@pytest.mark.parametrize('text, pin', [
+    ('XM1-001.XT2:4', ('XM1-001', 'XT2', '4')),
+    ('XA009:A', ('XA009', '', 'A')),
+    # разъем - после последней точки, как и в запросе --trace
+    ('XM1.5.XT2:4', ('XM1.5', 'XT2', '4')),
+])
+def test_split_pin(text, pin):
+    assert split_pin(text) == pin
+    assert split_device(text.rpartition(':')[0]) == pin[:2]
+
+
+@pytest.mark.parametrize('text', ['XA009', ':A', 'XA009:'])
+def test_split_pin_rejects(text):
+    with pytest.raises(ValueError):
+        split_pin(text)
+
+
+def test_pin_key_orders_numbers():
+    pins = ['XM1-001.XT2:10', 'XM1-001.XT2:4', 'XM1-001.XT10:1', 'XM1-001.XT2:3']
+    assert sorted(pins, key=pin_key) == ['XM1-001.XT2:3', 'XM1-001.XT2:4', 'XM1-001.XT2:10', 'XM1-001.XT10:1']
+
+
+def test_parser(tmp_path):
+    path = tmp_path / 'svo.txt'
+    path.write_text('Откуда идет\tКуда поступает\nXA1:A\tXM1-001.XT2:4\n\n'
+                    'Откуда идет\tКуда поступает\nXA1:B\tXM1-002.XT2:3\n', encoding='utf-8')
+    links = list(SvoParser(str(path)).iter_links())
+    assert [(link.fr, link.to, link.num_file, link.num_line) for link in links] == [
+        ('XA1:A', 'XM1-001.XT2:4', 1, 1),
+        ('XA1:B', 'XM1-002.XT2:3', 2, 1),
+    ]
+
+
+def test_parser_rejects_cabinet_format(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text('Шкаф\tСигнал\tОткуда\tКуда\n1HV1\t1\tXT1-b1\tXT2-b1\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='2 колонки'):
+        list(SvoParser(str(path)).iter_links())
+
+
+def test_trace(index):
+    assert index.trace('XA1:A') == ['XM1-001.XT2:4', 'XM1-002.XT2:4']
+    assert index.trace('XM1-002.XT2:3') == ['XA1:B']
+    with pytest.raises(KeyError):
+        index.trace('XA2:A')
+
+
+def test_net_keeps_every_link(index):
+    net = index.net('XM1-001.XT2:4')
+    assert net.pins == ('XA1:A', 'XM1-001.XT2:4', 'XM1-002.XT2:4')
+    assert [ref for _, _, ref in net.links] == ['0_1', '0_2', '0_3', '0_4']
+
+
+def test_nets_and_device_pins(index):
+    nets = index.nets()
+    assert [net.pins for net in nets] == [('XA1:A', 'XM1-001.XT2:4', 'XM1-002.XT2:4'), ('XA1:B', 'XM1-002.XT2:3')]
+    assert nets[0] == index.net('XA1:A')
+    assert index.device_pins('XA1') == ['XA1:A', 'XA1:B']
+    assert index.device_pins('XM1-002', 'XT2') == ['XM1-002.XT2:3', 'XM1-002.XT2:4']
+    out = io.StringIO()
+    assert index.write_nets(out) == 2
+    assert out.getvalue().splitlines()[-2:] == ['2\tXA1:B\tXM1-002.XT2:3', '\tXA1:B\tXM1-002.XT2:3\t0_5']
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_EXPORT), reason='нет выгрузки data/data svo.txt')
+def test_real_export():
+    index = NetIndex.from_source(REAL_EXPORT)
+    assert len(index) == 736
+    nets = index.nets()
+    assert sum(len(net.links) for net in nets) == 736
+    assert sum(len(net.pins) for net in nets) == len(index.pins.names)
+    for net in nets[:50]:
+        assert index.net(net.pins[-1]) == net
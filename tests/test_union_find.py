@@ -0,0 +1,34 @@
+from core.union_find import UnionFind
+
+
+class TestUnionFind:
+
+    def test_find_adds_singleton(self):
+        uf = UnionFind()
+        assert uf.find('XT1-b1') == 'XT1-b1'
+        assert 'XT1-b1' in uf
+        assert len(uf) == 1
+
+    def test_union_and_connected(self):
+        uf = UnionFind()
+        uf.union('a', 'b')
+        uf.union('c', 'd')
+        assert uf.connected('a', 'b')
+        assert not uf.connected('a', 'c')
+        uf.union('b', 'c')
+        assert uf.connected('a', 'd')
+
+    def test_groups_keep_insertion_order(self):
+        uf = UnionFind()
+        uf.union('a', 'b')
+        uf.add('x')
+        uf.union('c', 'a')
+        groups = sorted(uf.groups().values())
+        assert groups == [['a', 'b', 'c'], ['x']]
+
+    def test_path_compression(self):
+        uf = UnionFind()
+        for i in range(1000):
+            uf.union(i, i + 1)
+        root = uf.find(0)
+        assert all(uf.parent[i] == root for i in range(1001))
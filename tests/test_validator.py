@@ -0,0 +1,91 @@
+import json
+from unittest.mock import mock_open, patch
+
+from core.application import Application
+from core.data_parser import DataParser
+from core.validator import WiringValidator
+
+DATA = (
+    "Шкаф\tСигнал\tОткуда\tКуда\n"
+    "Cab1\t1\tXT1-b1\tXT2-b1\n"
+    "Cab1\t1\tXT2-b1\tXT3-b1\n"
+    "Cab1\t2\tXT2-b1\tXT4-b1\n"
+    "Cab1\t3\tXT5-b1\tXT5-b1\n"
+    "Cab1\t4\tXТ6-b1\tXT7-b1\n"
+    "Cab1\t5\n"
+    "Cab1\tout\tXT8-b1\n"
+)
+
+
+def parse(data):
+    validator = WiringValidator()
+    with patch('builtins.open', mock_open(read_data=data)):
+        parser = DataParser('data.txt', validator=validator)
+        parser.parse_data()
+    findings = validator.finish(parser.jumpers_to_lines)
+    return parser, validator, findings
+
+
+def by_check(findings, check):
+    return [finding for finding in findings if finding.check == check]
+
+
+class TestWiringValidator:
+
+    def test_summary(self):
+        _, validator, _ = parse(DATA)
+        assert validator.summary() == {
+            'malformed': 2, 'self_loop': 1, 'cyrillic': 1, 'fan_out': 1, 'mixed_signals': 1,
+        }
+
+    def test_malformed_rows_skipped_or_flagged(self):
+        parser, _, findings = parse(DATA)
+        malformed = by_check(findings, 'malformed')
+        assert [finding.refs for finding in malformed] == [('1_6',), ('1_7',)]
+        # 2 колонки - строка пропущена, 3 колонки под заголовком из 4 - разобрана
+        assert len(parser.cabinets_connections['Cab1']) == 6
+
+    def test_fan_out_refs(self):
+        _, _, findings = parse(DATA)
+        fan_out, = by_check(findings, 'fan_out')
+        assert fan_out.terminals == ('XT2-b1',)
+        assert fan_out.refs == ('1_1', '1_2', '1_3')
+
+    def test_fan_out_ignores_repeated_rows(self):
+        data = "Cab1\t1\tXT1-b1\tXT2-b1\nCab1\t1\tXT2-b1\tXT3-b1\nCab1\t1\tXT1-b1\tXT2-b1\n"
+        _, validator, _ = parse(data)
+        assert validator.summary()['fan_out'] == 0
+
+    def test_cyrillic_suggestion(self):
+        _, _, findings = parse(DATA)
+        cyrillic, = by_check(findings, 'cyrillic')
+        assert cyrillic.terminals == ('XТ6-b1',)
+        assert cyrillic.detail == 'кириллица: Т, вероятно XT6-b1'
+
+    def test_mixed_signals(self):
+        _, _, findings = parse(DATA)
+        mixed, = by_check(findings, 'mixed_signals')
+        assert mixed.terminals == ('XT1-b1', 'XT2-b1', 'XT3-b1', 'XT4-b1')
+        assert mixed.detail == 'сигналы: 1, 2'
+
+    def test_self_loop(self):
+        _, _, findings = parse(DATA)
+        loop, = by_check(findings, 'self_loop')
+        assert loop.terminals == ('XT5-b1',)
+
+    def test_no_header_no_column_check(self):
+        _, validator, _ = parse("Cab1\t1\tXT1-b1\tXT2-b1\nCab1\tout\tXT3-b1\n")
+        assert validator.summary()['malformed'] == 0
+
+
+def test_application_writes_findings(tmp_path):
+    source = tmp_path / 'data.txt'
+    target = tmp_path / 'result.txt'
+    source.write_text(DATA, encoding='utf-8')
+    app = Application(str(source), str(target), validate=True)
+    app.run()
+
+    report = json.loads((tmp_path / 'result.txt.findings.json').read_text(encoding='utf-8'))
+    assert report['summary'] == app.stats.findings
+    assert len(report['findings']) == 6
+    assert 'validate' in app.timings
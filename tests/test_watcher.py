@@ -0,0 +1,177 @@
+import random
+
+import pytest
+
+from core.application import Application
+from core.connection import Connection
+from core.data_merger import DataMerging
+from core.watcher import ConnectivityGraph, ExportWatcher
+
+HEADER = 'Шкаф\tСигнал\tОткуда\tКуда\n'
+ROWS = [
+    '2HV2\t1\tXT1-b1\tXT2-b1\n',
+    '2HV2\t1\tXT2-b1\tXT3-b1\n',
+    '2HV2\t1\tXT3-b1\tXT4-b1\n',
+    '1HV1\t5\tXT1-a1\tXT2-a1\n',
+    '1HV1\t6\tXTK1-a1\n',
+]
+
+
+def groups(graph):
+    return sorted(sorted(terms) for terms in graph.term_groups())
+
+
+def full_merge(edges):
+    jumpers = [Connection('1HV1', '', fr, to) for fr, to in edges]
+    return sorted(sorted(group.terms) for group in DataMerging.merge_cabinet(jumpers) if group)
+
+
+def test_graph_split_and_join():
+    graph = ConnectivityGraph()
+    for fr, to in [('a', 'b'), ('b', 'c'), ('c', 'd'), ('a', 'b')]:
+        graph.add(fr, to)
+    assert groups(graph) == [['a', 'b', 'c', 'd']]
+    graph.remove('b', 'c')
+    assert groups(graph) == [['a', 'b'], ['c', 'd']]
+    # одна копия a-b осталась - группа цела
+    graph.remove('a', 'b')
+    assert groups(graph) == [['a', 'b'], ['c', 'd']]
+    graph.add('d', 'a')
+    assert groups(graph) == [['a', 'b', 'c', 'd']]
+    graph.remove('a', 'b')
+    graph.remove('d', 'a')
+    assert groups(graph) == [['c', 'd']]
+
+
+def test_graph_matches_full_merge():
+    rnd = random.Random(7)
+    terms = [f'XT{i}-b1' for i in range(30)]
+    graph, edges = ConnectivityGraph(), []
+    for _ in range(2000):
+        if edges and rnd.random() < 0.45:
+            fr, to = edges.pop(rnd.randrange(len(edges)))
+            graph.remove(fr, to)
+        else:
+            edge = (rnd.choice(terms), rnd.choice(terms + [None]))
+            edges.append(edge)
+            graph.add(*edge)
+        assert groups(graph) == full_merge(edges)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    source, target = tmp_path / 'data.txt', tmp_path / 'result.txt'
+    source.write_text(HEADER + ''.join(ROWS), encoding='utf-8')
+    return source, target
+
+
+def expected(source, tmp_path):
+    target = tmp_path / 'full.txt'
+    Application(str(source), str(target)).run()
+    return target.read_text(encoding='utf-8')
+
+
+def test_watcher_updates_only_changed_cabinets(tmp_path, paths):
+    source, target = paths
+    watcher = ExportWatcher(str(source), str(target))
+    first = watcher.update()
+    assert sorted(first.cabinets) == ['1HV1', '2HV2']
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
+
+    # новая строка в конце - пересчитывается только ее шкаф
+    source.write_text(HEADER + ''.join(ROWS) + '1HV1\t7\tXT2-a1\tXT3-a1\n', encoding='utf-8')
+    update = watcher.update()
+    assert update.cabinets == ('1HV1',) and (update.added, update.removed) == (1, 0)
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
+
+    # правка на месте: средняя перемычка 2HV2 ушла в другую клемму - группа делится
+    rows = ROWS[:1] + ['2HV2\t1\tXT2-b1\tXT9-b1\n'] + ROWS[2:]
+    source.write_text(HEADER + ''.join(rows), encoding='utf-8')
+    update = watcher.update()
+    assert sorted(update.cabinets) == ['1HV1', '2HV2']
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
+    assert watcher.update().cabinets == ()
+
+
+def test_watcher_removed_cabinet(tmp_path, paths):
+    source, target = paths
+    watcher = ExportWatcher(str(source), str(target))
+    watcher.update()
+    source.write_text(HEADER + ''.join(ROWS[:3]), encoding='utf-8')
+    update = watcher.update()
+    assert update.cabinets == ('1HV1',) and update.removed == 2
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
+
+
+def test_watcher_rewrites_stale_target(tmp_path, paths):
+    source, target = paths
+    source.write_text(HEADER, encoding='utf-8')
+    target.write_text('результат прежнего запуска\n', encoding='utf-8')
+    ExportWatcher(str(source), str(target)).update()
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path) == ''
+
+
+def test_watch_polls(tmp_path, paths):
+    source, target = paths
+    watcher = ExportWatcher(str(source), str(target), interval=0)
+    updates = []
+    watcher.watch(updates.append, polls=3)
+    # первый расчет; источник не менялся - опросы ничего не пересчитывают
+    assert len(updates) == 1
+    assert not watcher.changed()
+
+
+def test_watcher_rejects_xlsx(tmp_path, paths):
+    with pytest.raises(ValueError):
+        ExportWatcher(str(paths[0]), str(tmp_path / 'result.xlsx'))
+
+
+def test_watcher_shifted_cabinets_keep_groups(tmp_path, paths):
+    source, target = paths
+    watcher = ExportWatcher(str(source), str(target))
+    watcher.update()
+    groups = watcher.cabinets['1HV1'].groups
+    untouched = watcher.files[0].sections[-1]
+    # строка в середине 2HV2 сдвигает номера строк 1HV1 ниже нее
+    rows = ROWS[:1] + ['2HV2\t1\tXT7-b1\tXT8-b1\n'] + ROWS[1:]
+    source.write_text(HEADER + ''.join(rows), encoding='utf-8')
+    update = watcher.update()
+    assert update.cabinets == ('2HV2',) and update.shifted == ('1HV1',)
+    # куски ниже правки не разбираются заново, группы шкафа не пересобираются
+    assert watcher.files[0].sections[-1] is untouched
+    assert watcher.cabinets['1HV1'].groups is groups
+    assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
+
+
+def test_watcher_random_edits_match_full_run(tmp_path):
+    rnd = random.Random(3)
+    source, target = tmp_path / 'data.txt', tmp_path / 'result.txt'
+
+    def random_line():
+        kind = rnd.random()
+        if kind < 0.05:
+            return HEADER
+        if kind < 0.1:
+            return '\n'
+        cabinet = f'{rnd.randint(1, 3)}HV{rnd.randint(1, 2)}'
+        fr = f'XT{rnd.randint(1, 6)}-a{rnd.randint(1, 2)}'
+        if kind < 0.2:
+            return f'{cabinet}\t1\t{fr}\n'
+        return f'{cabinet}\t1\t{fr}\tXT{rnd.randint(1, 6)}-b1\n'
+
+    lines = [HEADER] + [random_line() for _ in range(40)]
+    source.write_text(''.join(lines), encoding='utf-8')
+    watcher = ExportWatcher(str(source), str(target))
+    watcher.update()
+    for _ in range(60):
+        edit = rnd.random()
+        position = rnd.randrange(1, len(lines) + 1)
+        if edit < 0.4:
+            lines.insert(position, random_line())
+        elif edit < 0.7 and len(lines) > 2:
+            del lines[min(position, len(lines) - 1)]
+        else:
+            lines[min(position, len(lines) - 1)] = random_line()
+        source.write_text(''.join(lines), encoding='utf-8')
+        watcher.update()
+        assert target.read_text(encoding='utf-8') == expected(source, tmp_path)
@@ -0,0 +1,112 @@
+import os
+import zipfile
+
+import pytest
+
+from core.application import Application
+from core.data_parser import DataParser, Row
+import core.xlsx_reader
+from core.xlsx_reader import column_index, header_columns, iter_xlsx_lines
+
+MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+REAL_EXPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'XT перемычки.xlsx')
+
+SHARED = ['Куда поступает', 'Шкаф', 'Откуда идет', 'Обозначение провода', '1HV1', 'XT1-b1', 'XT2-b1']
+# заголовок не в первой строке, колонки в другом порядке, лишняя колонка,
+# inline-строка, число, пустая ячейка и форматированный (rich) текст
+SHEET = (
+    '<x:row r="1"><x:c r="A1" t="inlineStr"><x:is><x:t>Перемычки</x:t></x:is></x:c></x:row>'
+    '<x:row r="2"><x:c r="A2" t="s"><x:v>0</x:v></x:c><x:c r="B2" t="s"><x:v>1</x:v></x:c>'
+    '<x:c r="C2" t="inlineStr"><x:is><x:t>Примечание</x:t></x:is></x:c>'
+    '<x:c r="D2" t="s"><x:v>2</x:v></x:c><x:c r="E2" t="s"><x:v>3</x:v></x:c></x:row>'
+    '<x:row r="3"><x:c r="A3" t="s"><x:v>6</x:v></x:c><x:c r="B3" t="s"><x:v>4</x:v></x:c>'
+    '<x:c r="D3" t="s"><x:v>5</x:v></x:c><x:c r="E3"><x:v>501</x:v></x:c></x:row>'
+    '<x:row r="5"><x:c r="B5" t="s"><x:v>4</x:v></x:c><x:c r="C5" s="3"/>'
+    '<x:c r="D5" t="inlineStr"><x:is><x:r><x:t>XT3</x:t></x:r><x:r><x:t>-b1</x:t></x:r></x:is></x:c>'
+    '<x:c r="E5" t="str"><x:f>"out"</x:f><x:v>out</x:v></x:c></x:row>'
+)
+
+
+def write_book(path, sheets, prefix='x:'):
+    """книга с листами (имя, содержимое sheetData) и общими строками SHARED"""
+    with zipfile.ZipFile(path, 'w') as book:
+        strings = ''.join(
+            f'<si><r><t>{value[:2]}</t></r><r><t>{value[2:]}</t></r></si>' if i == 1 else f'<si><t>{value}</t></si>'
+            for i, value in enumerate(SHARED)
+        )
+        book.writestr('xl/sharedStrings.xml', f'<sst xmlns="{MAIN}">{strings}</sst>')
+        names = ''.join(f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>' for i, (name, _) in enumerate(sheets, 1))
+        book.writestr('xl/workbook.xml', f'<workbook xmlns="{MAIN}" xmlns:r="{REL}"><sheets>{names}</sheets></workbook>')
+        rels = ''.join(f'<Relationship Id="rId{i}" Target="/xl/worksheets/data{i}.xml" Type="{REL}/worksheet"/>'
+                       for i in range(1, len(sheets) + 1))
+        book.writestr('xl/_rels/workbook.xml.rels',
+                      f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}'
+                      '</Relationships>')
+        for i, (_, data) in enumerate(sheets, 1):
+            namespace = f'xmlns:{prefix[:-1]}' if prefix else 'xmlns'
+            book.writestr(f'xl/worksheets/data{i}.xml', f'<{prefix}worksheet {namespace}="{MAIN}"><{prefix}sheetData>'
+                          f'{data.replace("x:", prefix)}</{prefix}sheetData></{prefix}worksheet>')
+
+
+@pytest.mark.parametrize('reference, index', [('A1', 0), ('C7', 2), ('Z10', 25), ('AA3', 26)])
+def test_column_index(reference, index):
+    assert column_index(reference) == index
+
+
+def test_header_columns():
+    assert header_columns(['Куда поступает', 'Шкаф', '', 'Откуда идет', 'Обозначение провода']) == [1, 4, 3, 0]
+    assert header_columns(['Шкаф', 'Сигнал', 'Откуда']) is None
+
+
+def test_iter_xlsx_lines(tmp_path):
+    path = tmp_path / 'export.xlsx'
+    write_book(path, [('без заголовка', '<x:row r="1"><x:c r="A1"><x:v>1</x:v></x:c></x:row>'), ('XT', SHEET)])
+    assert list(iter_xlsx_lines(str(path))) == [
+        'Шкаф\tОбозначение провода\tОткуда идет\tКуда поступает',
+        '1HV1\t501\tXT1-b1\tXT2-b1',
+        '1HV1\tout\tXT3-b1\t',
+    ]
+
+
+def test_no_header(tmp_path):
+    path = tmp_path / 'export.xlsx'
+    write_book(path, [('пусто', '')])
+    with pytest.raises(ValueError):
+        list(iter_xlsx_lines(str(path)))
+
+
+def test_parser_reads_xlsx(tmp_path):
+    path = tmp_path / 'export.xlsx'
+    write_book(path, [('1', SHEET), ('2', SHEET)])
+    rows = list(DataParser(str(path)).iter_rows())
+    # каждый лист - отдельная выгрузка со своей нумерацией строк
+    assert rows == [
+        Row('1HV1', '501', 'XT1-b1', 'XT2-b1', 1, 1),
+        Row('1HV1', 'out', 'XT3-b1', None, 1, 2),
+        Row('1HV1', '501', 'XT1-b1', 'XT2-b1', 2, 1),
+        Row('1HV1', 'out', 'XT3-b1', None, 2, 2),
+    ]
+
+
+def test_fast_path_falls_back_to_expat(tmp_path, monkeypatch):
+    # без префикса: простые строки идут быстрым разбором, inline-строки
+    # и формулы следующих кусков переключают лист на expat с той же строки
+    monkeypatch.setattr(core.xlsx_reader, 'READ_CHUNK', 64)
+    simple = ''.join(f'<x:row r="{i}"><x:c r="A{i}" t="s"><x:v>4</x:v></x:c><x:c r="C{i}"><x:v>{i}</x:v></x:c></x:row>'
+                     for i in range(10, 20))
+    prefixed, plain = tmp_path / 'prefixed.xlsx', tmp_path / 'plain.xlsx'
+    write_book(prefixed, [('XT', SHEET + simple)])
+    write_book(plain, [('XT', simple + SHEET + simple)], prefix='')
+    lines = list(iter_xlsx_lines(prefixed))
+    assert list(iter_xlsx_lines(plain)) == lines
+    assert lines[-1] == '\t\t\t1HV1'
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_EXPORT), reason='нет выгрузки data/XT перемычки.xlsx')
+def test_real_export(tmp_path):
+    target = tmp_path / 'result.txt'
+    app = Application(REAL_EXPORT, str(target))
+    app.run()
+    assert app.stats.rows == 3566
+    assert target.read_text(encoding='utf-8').startswith('1HV19\n')
@@ -0,0 +1,93 @@
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core.connection import Connection
+from core.data_writer import DataWriter
+from core.xlsx_writer import XlsxWriter, column_letter, related_cells
+
+NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_sheet(book: zipfile.ZipFile, number: int):
+    """адрес ячейки -> (текст, стиль)"""
+    root = ET.fromstring(book.read(f'xl/worksheets/sheet{number}.xml'))
+    return {
+        cell.get('r'): (cell.find('m:is/m:t', NS).text, cell.get('s'))
+        for cell in root.iterfind('m:sheetData/m:row/m:c', NS)
+    }
+
+
+def sheet_names(book: zipfile.ZipFile):
+    root = ET.fromstring(book.read('xl/workbook.xml'))
+    return [(sheet.get('name'), sheet.get('state')) for sheet in root.iterfind('m:sheets/m:sheet', NS)]
+
+
+@pytest.mark.parametrize('index, letters', [(1, 'A'), (26, 'Z'), (27, 'AA'), (702, 'ZZ'), (703, 'AAA')])
+def test_column_letter(index, letters):
+    assert column_letter(index) == letters
+
+
+def test_related_cells():
+    refs = [['1_1'], ['1_1', '1_2'], ['1_2'], ['2_1']]
+    assert list(related_cells(refs, ['B', 'C', 'D', 'E'], 3)) == [
+        (0, 'C3'),
+        (1, 'B3;D3'),
+        (2, 'C3'),
+    ]
+
+
+def test_data_writer_xlsx(tmp_path):
+    jumpers = {
+        'cab2': [Connection('cab2', '1', 'XT1-b1', 'XT2-b2')],
+        'cab1': [Connection('cab1', '2', 'XT3-b3', 'XT4-b4', 'XT<5>')],
+    }
+    lines = {
+        'cab2': {'XT1-b1': ['1_1', '1_2', '2_1'], 'XT2-b2': ['1_1']},
+        'cab1': {'XT3-b3': ['1_3'], 'XT4-b4': ['1_3', '1_4'], 'XT<5>': ['1_4']},
+    }
+    target = tmp_path / 'result.xlsx'
+    DataWriter(str(target), jumpers, lines).process()
+
+    with zipfile.ZipFile(target) as book:
+        assert book.testzip() is None
+        assert sheet_names(book) == [('result', None), ('result_links', 'hidden')]
+        cells = read_sheet(book, 1)
+        assert cells['A1'] == ('cab1', None)
+        assert [cells[f'{c}2'] for c in 'BCD'] == [('XT3-b3', '1'), ('XT4-b4', '1'), ('XT<5>', '1')]
+        assert [cells[f'{c}3'][0] for c in 'BCD'] == ['1_3', '1_3, 1_4', '1_4']
+        assert cells['B3'][1] == '2'
+        assert cells['A4'] == ('cab2', None)
+        assert [cells[f'{c}6'][0] for c in 'BCD'] == ['1_1, 1_2, 2_1', '1_1', 'Замечание 3 на 2']
+
+        links = read_sheet(book, 2)
+        assert {address: text for address, (text, _) in links.items()} == {
+            'B3': 'C3', 'C3': 'B3;D3', 'D3': 'C3',
+            'B6': 'C6;;', 'C6': 'B6',
+        }
+
+
+def test_sheet_rollover():
+    groups = [(('XT1-b1', 'XT1-b2'), [['1_1'], ['1_1']], '')] * 3
+    buffer = io.BytesIO()
+    with XlsxWriter(buffer, max_rows=5) as book:
+        book.write_groups([('1HV1', iter(groups))])
+    assert book.rows_written == 8
+
+    with zipfile.ZipFile(buffer) as book:
+        assert [name for name, _ in sheet_names(book)] == ['result', 'result_links', 'result2', 'result2_links']
+        second = read_sheet(book, 3)
+        # шкаф повторяется на новом листе, группа не разрывается между листами
+        assert second['A1'] == ('1HV1', None)
+        assert second['B2'][0] == 'XT1-b1'
+        assert read_sheet(book, 4) == {'B3': ('C3', None), 'C3': ('B3', None)}
+
+
+def test_empty_workbook():
+    buffer = io.BytesIO()
+    with XlsxWriter(buffer) as book:
+        book.write_groups([])
+    with zipfile.ZipFile(buffer) as book:
+        assert read_sheet(book, 1) == {}